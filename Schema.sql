@@ -19,10 +19,68 @@ SET xmloption = content;
 SET client_min_messages = warning;
 SET row_security = off;
 
+--
+-- Name: bump_dim_version(); Type: FUNCTION; Schema: public; Owner: postgres
+--
+
+CREATE FUNCTION public.bump_dim_version() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    INSERT INTO public.dim_versions AS v (table_name, version, updated_at)
+    VALUES (TG_TABLE_NAME, 1, clock_timestamp())
+    ON CONFLICT (table_name) DO UPDATE
+        SET version = v.version + 1, updated_at = clock_timestamp();
+    RETURN NULL;
+END;
+$$;
+
+
+ALTER FUNCTION public.bump_dim_version() OWNER TO postgres;
+
 SET default_tablespace = '';
 
 SET default_table_access_method = heap;
 
+--
+-- Name: data_quality_log; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.data_quality_log (
+    log_id integer NOT NULL,
+    table_name character varying(50) NOT NULL,
+    total_rows bigint,
+    null_counts bigint,
+    duplicate_counts bigint,
+    status character varying(20),
+    logged_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE public.data_quality_log OWNER TO postgres;
+
+--
+-- Name: data_quality_log_log_id_seq; Type: SEQUENCE; Schema: public; Owner: postgres
+--
+
+CREATE SEQUENCE public.data_quality_log_log_id_seq
+    AS integer
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER SEQUENCE public.data_quality_log_log_id_seq OWNER TO postgres;
+
+--
+-- Name: data_quality_log_log_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: postgres
+--
+
+ALTER SEQUENCE public.data_quality_log_log_id_seq OWNED BY public.data_quality_log.log_id;
+
+
 --
 -- Name: dim_customer; Type: TABLE; Schema: public; Owner: postgres
 --
@@ -35,7 +93,8 @@ CREATE TABLE public.dim_customer (
     join_date date NOT NULL,
     effective_start timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
     effective_end timestamp without time zone DEFAULT 'infinity'::timestamp without time zone NOT NULL,
-    is_current boolean DEFAULT true NOT NULL
+    is_current boolean DEFAULT true NOT NULL,
+    row_hash character(32)
 );
 
 
@@ -77,6 +136,7 @@ CREATE TABLE public.dim_date (
     weekday character varying(10) NOT NULL,
     holiday_flag boolean DEFAULT false,
     holiday_name character varying(50),
+    CONSTRAINT dim_date_date_id_check CHECK ((date_id = ((((EXTRACT(year FROM date) * (10000)::numeric) + (EXTRACT(month FROM date) * (100)::numeric)) + EXTRACT(day FROM date)))::integer)),
     CONSTRAINT dim_date_day_check CHECK (((day >= 1) AND (day <= 31))),
     CONSTRAINT dim_date_month_check CHECK (((month >= 1) AND (month <= 12))),
     CONSTRAINT dim_date_quarter_check CHECK (((quarter >= 1) AND (quarter <= 4)))
@@ -85,28 +145,6 @@ CREATE TABLE public.dim_date (
 
 ALTER TABLE public.dim_date OWNER TO postgres;
 
---
--- Name: dim_date_date_id_seq; Type: SEQUENCE; Schema: public; Owner: postgres
---
-
-CREATE SEQUENCE public.dim_date_date_id_seq
-    AS integer
-    START WITH 1
-    INCREMENT BY 1
-    NO MINVALUE
-    NO MAXVALUE
-    CACHE 1;
-
-
-ALTER SEQUENCE public.dim_date_date_id_seq OWNER TO postgres;
-
---
--- Name: dim_date_date_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: postgres
---
-
-ALTER SEQUENCE public.dim_date_date_id_seq OWNED BY public.dim_date.date_id;
-
-
 --
 -- Name: dim_location; Type: TABLE; Schema: public; Owner: postgres
 --
@@ -158,6 +196,7 @@ CREATE TABLE public.dim_product (
     effective_start timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
     effective_end timestamp without time zone DEFAULT 'infinity'::timestamp without time zone NOT NULL,
     is_current boolean DEFAULT true NOT NULL,
+    row_hash character(32),
     CONSTRAINT dim_product_carbon_footprint_rating_check CHECK (((carbon_footprint_rating >= 1) AND (carbon_footprint_rating <= 10))),
     CONSTRAINT dim_product_price_check CHECK ((price > (0)::numeric))
 );
@@ -187,6 +226,135 @@ ALTER SEQUENCE public.dim_product_product_id_seq OWNER TO postgres;
 ALTER SEQUENCE public.dim_product_product_id_seq OWNED BY public.dim_product.product_id;
 
 
+--
+-- Name: dim_versions; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.dim_versions (
+    table_name character varying(63) NOT NULL,
+    version bigint DEFAULT 1 NOT NULL,
+    updated_at timestamp without time zone DEFAULT clock_timestamp() NOT NULL
+);
+
+
+ALTER TABLE public.dim_versions OWNER TO postgres;
+
+
+--
+-- Name: etl_file_manifest; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.etl_file_manifest (
+    content_hash character(40) NOT NULL,
+    size_bytes bigint NOT NULL,
+    file_name character varying(255) NOT NULL,
+    source character varying(20),
+    status character varying(20) DEFAULT 'LOADING'::character varying NOT NULL,
+    attempts integer DEFAULT 0 NOT NULL,
+    rows_read bigint DEFAULT 0 NOT NULL,
+    rows_loaded bigint DEFAULT 0 NOT NULL,
+    extract_seconds double precision,
+    load_seconds double precision,
+    load_id integer,
+    first_seen_at timestamp without time zone DEFAULT now() NOT NULL,
+    started_at timestamp without time zone,
+    finished_at timestamp without time zone,
+    error_message text,
+    rows_parsed bigint
+);
+
+
+ALTER TABLE public.etl_file_manifest OWNER TO postgres;
+
+--
+-- Name: etl_realtime_batches; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.etl_realtime_batches (
+    batch_id integer NOT NULL,
+    started_at timestamp without time zone NOT NULL,
+    committed_at timestamp without time zone NOT NULL,
+    updates integer NOT NULL,
+    products integer NOT NULL,
+    versions integer NOT NULL,
+    unknown_products integer DEFAULT 0 NOT NULL,
+    rejected integer DEFAULT 0 NOT NULL,
+    queue_depth integer DEFAULT 0 NOT NULL,
+    apply_seconds double precision,
+    latency_p50_seconds double precision,
+    latency_p95_seconds double precision,
+    latency_max_seconds double precision
+);
+
+
+ALTER TABLE public.etl_realtime_batches OWNER TO postgres;
+
+--
+-- Name: etl_realtime_batches_batch_id_seq; Type: SEQUENCE; Schema: public; Owner: postgres
+--
+
+CREATE SEQUENCE public.etl_realtime_batches_batch_id_seq
+    AS integer
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER SEQUENCE public.etl_realtime_batches_batch_id_seq OWNER TO postgres;
+
+--
+-- Name: etl_realtime_batches_batch_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: postgres
+--
+
+ALTER SEQUENCE public.etl_realtime_batches_batch_id_seq OWNED BY public.etl_realtime_batches.batch_id;
+
+
+--
+-- Name: etl_run_metrics; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.etl_run_metrics (
+    metric_id bigint NOT NULL,
+    load_id integer NOT NULL,
+    run_id uuid NOT NULL,
+    span_path character varying(200) NOT NULL,
+    depth smallint NOT NULL,
+    calls integer DEFAULT 1 NOT NULL,
+    started_at timestamp without time zone NOT NULL,
+    wall_seconds double precision NOT NULL,
+    cpu_seconds double precision NOT NULL,
+    peak_rss_mb numeric(10,1),
+    rows_in bigint,
+    rows_out bigint,
+    status character varying(20) DEFAULT 'SUCCESS'::character varying NOT NULL
+);
+
+
+ALTER TABLE public.etl_run_metrics OWNER TO postgres;
+
+--
+-- Name: etl_run_metrics_metric_id_seq; Type: SEQUENCE; Schema: public; Owner: postgres
+--
+
+CREATE SEQUENCE public.etl_run_metrics_metric_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER SEQUENCE public.etl_run_metrics_metric_id_seq OWNER TO postgres;
+
+--
+-- Name: etl_run_metrics_metric_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: postgres
+--
+
+ALTER SEQUENCE public.etl_run_metrics_metric_id_seq OWNED BY public.etl_run_metrics.metric_id;
+
+
 --
 -- Name: fact_sales; Type: TABLE; Schema: public; Owner: postgres
 --
@@ -204,7 +372,8 @@ CREATE TABLE public.fact_sales (
     CONSTRAINT fact_sales_carbon_savings_check CHECK ((carbon_savings >= (0)::numeric)),
     CONSTRAINT fact_sales_quantity_sold_check CHECK ((quantity_sold > 0)),
     CONSTRAINT fact_sales_revenue_check CHECK ((revenue >= (0)::numeric))
-);
+)
+PARTITION BY RANGE (sale_timestamp);
 
 
 ALTER TABLE public.fact_sales OWNER TO postgres;
@@ -231,6 +400,28 @@ ALTER SEQUENCE public.fact_sales_sale_id_seq OWNER TO postgres;
 ALTER SEQUENCE public.fact_sales_sale_id_seq OWNED BY public.fact_sales.sale_id;
 
 
+--
+-- Name: fact_sales_default; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.fact_sales_default (
+    sale_id integer DEFAULT nextval('public.fact_sales_sale_id_seq'::regclass) NOT NULL,
+    date_id integer NOT NULL,
+    product_id integer NOT NULL,
+    customer_id integer NOT NULL,
+    location_id integer NOT NULL,
+    quantity_sold integer NOT NULL,
+    revenue numeric(10,2) NOT NULL,
+    carbon_savings numeric(10,2) NOT NULL,
+    sale_timestamp timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT fact_sales_carbon_savings_check CHECK ((carbon_savings >= (0)::numeric)),
+    CONSTRAINT fact_sales_quantity_sold_check CHECK ((quantity_sold > 0)),
+    CONSTRAINT fact_sales_revenue_check CHECK ((revenue >= (0)::numeric))
+);
+
+
+ALTER TABLE public.fact_sales_default OWNER TO postgres;
+
 --
 -- Name: metadata_loads; Type: TABLE; Schema: public; Owner: postgres
 --
@@ -269,17 +460,112 @@ ALTER SEQUENCE public.metadata_loads_load_id_seq OWNED BY public.metadata_loads.
 
 
 --
--- Name: dim_customer customer_id; Type: DEFAULT; Schema: public; Owner: postgres
+-- Name: rollup_sales_daily; Type: TABLE; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.dim_customer ALTER COLUMN customer_id SET DEFAULT nextval('public.dim_customer_customer_id_seq'::regclass);
+CREATE TABLE public.rollup_sales_daily (
+    sale_date date NOT NULL,
+    sales_count integer DEFAULT 0 NOT NULL,
+    quantity_sold bigint DEFAULT 0 NOT NULL,
+    revenue numeric(14,2) DEFAULT 0 NOT NULL,
+    carbon_savings numeric(14,2) DEFAULT 0 NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
 
+ALTER TABLE public.rollup_sales_daily OWNER TO postgres;
 
 --
--- Name: dim_date date_id; Type: DEFAULT; Schema: public; Owner: postgres
+-- Name: rollup_sales_daily_category; Type: TABLE; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.dim_date ALTER COLUMN date_id SET DEFAULT nextval('public.dim_date_date_id_seq'::regclass);
+CREATE TABLE public.rollup_sales_daily_category (
+    sale_date date NOT NULL,
+    category character varying(50) NOT NULL,
+    sales_count integer DEFAULT 0 NOT NULL,
+    quantity_sold bigint DEFAULT 0 NOT NULL,
+    revenue numeric(14,2) DEFAULT 0 NOT NULL,
+    carbon_savings numeric(14,2) DEFAULT 0 NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE public.rollup_sales_daily_category OWNER TO postgres;
+
+--
+-- Name: rollup_sales_daily_product_location; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.rollup_sales_daily_product_location (
+    date_id integer NOT NULL,
+    product_id integer NOT NULL,
+    location_id integer NOT NULL,
+    sales_count integer DEFAULT 0 NOT NULL,
+    quantity_sold bigint DEFAULT 0 NOT NULL,
+    revenue numeric(14,2) DEFAULT 0 NOT NULL,
+    carbon_savings numeric(14,2) DEFAULT 0 NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE public.rollup_sales_daily_product_location OWNER TO postgres;
+
+--
+-- Name: rollup_sales_daily_region; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.rollup_sales_daily_region (
+    sale_date date NOT NULL,
+    region character varying(50) NOT NULL,
+    sales_count integer DEFAULT 0 NOT NULL,
+    quantity_sold bigint DEFAULT 0 NOT NULL,
+    revenue numeric(14,2) DEFAULT 0 NOT NULL,
+    carbon_savings numeric(14,2) DEFAULT 0 NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE public.rollup_sales_daily_region OWNER TO postgres;
+
+--
+-- Name: stg_fact_sales; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE UNLOGGED TABLE public.stg_fact_sales (
+    sale_id integer NOT NULL,
+    sale_date date,
+    sale_timestamp timestamp without time zone,
+    product_name text,
+    customer_email text,
+    city text,
+    quantity_sold integer,
+    revenue numeric(10,2),
+    carbon_savings numeric(10,2)
+);
+
+
+ALTER TABLE public.stg_fact_sales OWNER TO postgres;
+
+
+--
+-- Name: fact_sales_default; Type: TABLE ATTACH; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.fact_sales ATTACH PARTITION public.fact_sales_default DEFAULT;
+
+
+--
+-- Name: data_quality_log log_id; Type: DEFAULT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.data_quality_log ALTER COLUMN log_id SET DEFAULT nextval('public.data_quality_log_log_id_seq'::regclass);
+
+
+--
+-- Name: dim_customer customer_id; Type: DEFAULT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.dim_customer ALTER COLUMN customer_id SET DEFAULT nextval('public.dim_customer_customer_id_seq'::regclass);
 
 
 --
@@ -296,6 +582,20 @@ ALTER TABLE ONLY public.dim_location ALTER COLUMN location_id SET DEFAULT nextva
 ALTER TABLE ONLY public.dim_product ALTER COLUMN product_id SET DEFAULT nextval('public.dim_product_product_id_seq'::regclass);
 
 
+--
+-- Name: etl_realtime_batches batch_id; Type: DEFAULT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.etl_realtime_batches ALTER COLUMN batch_id SET DEFAULT nextval('public.etl_realtime_batches_batch_id_seq'::regclass);
+
+
+--
+-- Name: etl_run_metrics metric_id; Type: DEFAULT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.etl_run_metrics ALTER COLUMN metric_id SET DEFAULT nextval('public.etl_run_metrics_metric_id_seq'::regclass);
+
+
 --
 -- Name: fact_sales sale_id; Type: DEFAULT; Schema: public; Owner: postgres
 --
@@ -311,11 +611,11 @@ ALTER TABLE ONLY public.metadata_loads ALTER COLUMN load_id SET DEFAULT nextval(
 
 
 --
--- Name: dim_customer dim_customer_email_key; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: data_quality_log data_quality_log_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.dim_customer
-    ADD CONSTRAINT dim_customer_email_key UNIQUE (email);
+ALTER TABLE ONLY public.data_quality_log
+    ADD CONSTRAINT data_quality_log_pkey PRIMARY KEY (log_id);
 
 
 --
@@ -358,12 +658,52 @@ ALTER TABLE ONLY public.dim_product
     ADD CONSTRAINT dim_product_pkey PRIMARY KEY (product_id);
 
 
+--
+-- Name: dim_versions dim_versions_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.dim_versions
+    ADD CONSTRAINT dim_versions_pkey PRIMARY KEY (table_name);
+
+
+--
+-- Name: etl_file_manifest etl_file_manifest_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.etl_file_manifest
+    ADD CONSTRAINT etl_file_manifest_pkey PRIMARY KEY (content_hash, size_bytes);
+
+
+--
+-- Name: etl_realtime_batches etl_realtime_batches_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.etl_realtime_batches
+    ADD CONSTRAINT etl_realtime_batches_pkey PRIMARY KEY (batch_id);
+
+
+--
+-- Name: etl_run_metrics etl_run_metrics_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.etl_run_metrics
+    ADD CONSTRAINT etl_run_metrics_pkey PRIMARY KEY (metric_id);
+
+
 --
 -- Name: fact_sales fact_sales_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
 --
 
 ALTER TABLE ONLY public.fact_sales
-    ADD CONSTRAINT fact_sales_pkey PRIMARY KEY (sale_id);
+    ADD CONSTRAINT fact_sales_pkey PRIMARY KEY (sale_id, sale_timestamp);
+
+
+--
+-- Name: fact_sales_default fact_sales_default_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.fact_sales_default
+    ADD CONSTRAINT fact_sales_default_pkey PRIMARY KEY (sale_id, sale_timestamp);
 
 
 --
@@ -375,11 +715,35 @@ ALTER TABLE ONLY public.metadata_loads
 
 
 --
--- Name: dim_customer unique_email; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: rollup_sales_daily_category rollup_sales_daily_category_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.dim_customer
-    ADD CONSTRAINT unique_email UNIQUE (email);
+ALTER TABLE ONLY public.rollup_sales_daily_category
+    ADD CONSTRAINT rollup_sales_daily_category_pkey PRIMARY KEY (sale_date, category);
+
+
+--
+-- Name: rollup_sales_daily rollup_sales_daily_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.rollup_sales_daily
+    ADD CONSTRAINT rollup_sales_daily_pkey PRIMARY KEY (sale_date);
+
+
+--
+-- Name: rollup_sales_daily_product_location rollup_sales_daily_product_location_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.rollup_sales_daily_product_location
+    ADD CONSTRAINT rollup_sales_daily_product_location_pkey PRIMARY KEY (date_id, product_id, location_id);
+
+
+--
+-- Name: rollup_sales_daily_region rollup_sales_daily_region_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.rollup_sales_daily_region
+    ADD CONSTRAINT rollup_sales_daily_region_pkey PRIMARY KEY (sale_date, region);
 
 
 --
@@ -391,11 +755,10 @@ ALTER TABLE ONLY public.dim_location
 
 
 --
--- Name: dim_product unique_product_name; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: idx_data_quality_log_logged_at; Type: INDEX; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.dim_product
-    ADD CONSTRAINT unique_product_name UNIQUE (product_name);
+CREATE INDEX idx_data_quality_log_logged_at ON public.data_quality_log USING btree (logged_at);
 
 
 --
@@ -405,6 +768,13 @@ ALTER TABLE ONLY public.dim_product
 CREATE INDEX idx_dim_customer_effective ON public.dim_customer USING btree (effective_start, effective_end);
 
 
+--
+-- Name: uq_dim_customer_current_email; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE UNIQUE INDEX uq_dim_customer_current_email ON public.dim_customer USING btree (email) WHERE (is_current = true);
+
+
 --
 -- Name: idx_dim_customer_email; Type: INDEX; Schema: public; Owner: postgres
 --
@@ -426,6 +796,13 @@ CREATE INDEX idx_dim_date_year ON public.dim_date USING btree (year);
 CREATE INDEX idx_dim_product_current ON public.dim_product USING btree (product_name) WHERE (is_current = true);
 
 
+--
+-- Name: uq_dim_product_current_name; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE UNIQUE INDEX uq_dim_product_current_name ON public.dim_product USING btree (product_name) WHERE (is_current = true);
+
+
 --
 -- Name: idx_dim_product_effective; Type: INDEX; Schema: public; Owner: postgres
 --
@@ -440,60 +817,251 @@ CREATE INDEX idx_dim_product_effective ON public.dim_product USING btree (effect
 CREATE INDEX idx_dim_product_name ON public.dim_product USING btree (product_name);
 
 
+--
+-- Name: idx_dim_customer_current_email_norm; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX idx_dim_customer_current_email_norm ON public.dim_customer USING btree (lower(btrim((email)::text))) WHERE (is_current = true);
+
+
+--
+-- Name: idx_dim_location_city_norm; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX idx_dim_location_city_norm ON public.dim_location USING btree (lower(btrim((city)::text)));
+
+
+--
+-- Name: idx_dim_product_current_name_norm; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX idx_dim_product_current_name_norm ON public.dim_product USING btree (lower(btrim((product_name)::text))) WHERE (is_current = true);
+
+
+--
+-- Name: idx_etl_file_manifest_load_id; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX idx_etl_file_manifest_load_id ON public.etl_file_manifest USING btree (load_id);
+
+
+--
+-- Name: idx_etl_realtime_batches_committed_at; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX idx_etl_realtime_batches_committed_at ON public.etl_realtime_batches USING btree (committed_at);
+
+
+--
+-- Name: idx_etl_run_metrics_load_id; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX idx_etl_run_metrics_load_id ON public.etl_run_metrics USING btree (load_id);
+
+
 --
 -- Name: idx_fact_sales_customer_id; Type: INDEX; Schema: public; Owner: postgres
 --
 
-CREATE INDEX idx_fact_sales_customer_id ON public.fact_sales USING btree (customer_id);
+CREATE INDEX idx_fact_sales_customer_id ON ONLY public.fact_sales USING btree (customer_id);
+
+
+--
+-- Name: fact_sales_default_customer_id_idx; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX fact_sales_default_customer_id_idx ON public.fact_sales_default USING btree (customer_id);
 
 
 --
 -- Name: idx_fact_sales_date; Type: INDEX; Schema: public; Owner: postgres
 --
 
-CREATE INDEX idx_fact_sales_date ON public.fact_sales USING btree (date_id);
+CREATE INDEX idx_fact_sales_date ON ONLY public.fact_sales USING btree (date_id);
+
+
+--
+-- Name: fact_sales_default_date_id_idx; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX fact_sales_default_date_id_idx ON public.fact_sales_default USING btree (date_id);
 
 
 --
 -- Name: idx_fact_sales_date_id; Type: INDEX; Schema: public; Owner: postgres
 --
 
-CREATE INDEX idx_fact_sales_date_id ON public.fact_sales USING btree (date_id);
+CREATE INDEX idx_fact_sales_date_id ON ONLY public.fact_sales USING btree (date_id);
+
+
+--
+-- Name: fact_sales_default_date_id_idx1; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX fact_sales_default_date_id_idx1 ON public.fact_sales_default USING btree (date_id);
 
 
 --
 -- Name: idx_fact_sales_date_product; Type: INDEX; Schema: public; Owner: postgres
 --
 
-CREATE INDEX idx_fact_sales_date_product ON public.fact_sales USING btree (date_id, product_id);
+CREATE INDEX idx_fact_sales_date_product ON ONLY public.fact_sales USING btree (date_id, product_id);
+
+
+--
+-- Name: fact_sales_default_date_id_product_id_idx; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX fact_sales_default_date_id_product_id_idx ON public.fact_sales_default USING btree (date_id, product_id);
 
 
 --
 -- Name: idx_fact_sales_location_id; Type: INDEX; Schema: public; Owner: postgres
 --
 
-CREATE INDEX idx_fact_sales_location_id ON public.fact_sales USING btree (location_id);
+CREATE INDEX idx_fact_sales_location_id ON ONLY public.fact_sales USING btree (location_id);
+
+
+--
+-- Name: fact_sales_default_location_id_idx; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX fact_sales_default_location_id_idx ON public.fact_sales_default USING btree (location_id);
 
 
 --
 -- Name: idx_fact_sales_product; Type: INDEX; Schema: public; Owner: postgres
 --
 
-CREATE INDEX idx_fact_sales_product ON public.fact_sales USING btree (product_id);
+CREATE INDEX idx_fact_sales_product ON ONLY public.fact_sales USING btree (product_id);
+
+
+--
+-- Name: fact_sales_default_product_id_idx; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX fact_sales_default_product_id_idx ON public.fact_sales_default USING btree (product_id);
 
 
 --
 -- Name: idx_fact_sales_product_id; Type: INDEX; Schema: public; Owner: postgres
 --
 
-CREATE INDEX idx_fact_sales_product_id ON public.fact_sales USING btree (product_id);
+CREATE INDEX idx_fact_sales_product_id ON ONLY public.fact_sales USING btree (product_id);
+
+
+--
+-- Name: fact_sales_default_product_id_idx1; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX fact_sales_default_product_id_idx1 ON public.fact_sales_default USING btree (product_id);
+
+
+--
+-- Name: fact_sales_default_customer_id_idx; Type: INDEX ATTACH; Schema: public; Owner: postgres
+--
+
+ALTER INDEX public.idx_fact_sales_customer_id ATTACH PARTITION public.fact_sales_default_customer_id_idx;
+
+
+--
+-- Name: fact_sales_default_date_id_idx; Type: INDEX ATTACH; Schema: public; Owner: postgres
+--
+
+ALTER INDEX public.idx_fact_sales_date ATTACH PARTITION public.fact_sales_default_date_id_idx;
+
+
+--
+-- Name: fact_sales_default_date_id_idx1; Type: INDEX ATTACH; Schema: public; Owner: postgres
+--
+
+ALTER INDEX public.idx_fact_sales_date_id ATTACH PARTITION public.fact_sales_default_date_id_idx1;
+
+
+--
+-- Name: fact_sales_default_date_id_product_id_idx; Type: INDEX ATTACH; Schema: public; Owner: postgres
+--
+
+ALTER INDEX public.idx_fact_sales_date_product ATTACH PARTITION public.fact_sales_default_date_id_product_id_idx;
+
+
+--
+-- Name: fact_sales_default_location_id_idx; Type: INDEX ATTACH; Schema: public; Owner: postgres
+--
+
+ALTER INDEX public.idx_fact_sales_location_id ATTACH PARTITION public.fact_sales_default_location_id_idx;
+
+
+--
+-- Name: fact_sales_default_pkey; Type: INDEX ATTACH; Schema: public; Owner: postgres
+--
+
+ALTER INDEX public.fact_sales_pkey ATTACH PARTITION public.fact_sales_default_pkey;
+
+
+--
+-- Name: fact_sales_default_product_id_idx; Type: INDEX ATTACH; Schema: public; Owner: postgres
+--
+
+ALTER INDEX public.idx_fact_sales_product ATTACH PARTITION public.fact_sales_default_product_id_idx;
+
+
+--
+-- Name: fact_sales_default_product_id_idx1; Type: INDEX ATTACH; Schema: public; Owner: postgres
+--
+
+ALTER INDEX public.idx_fact_sales_product_id ATTACH PARTITION public.fact_sales_default_product_id_idx1;
+
+
+--
+-- Name: dim_customer trg_dim_customer_version; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER trg_dim_customer_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.dim_customer FOR EACH STATEMENT EXECUTE FUNCTION public.bump_dim_version();
+
+
+--
+-- Name: dim_date trg_dim_date_version; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER trg_dim_date_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.dim_date FOR EACH STATEMENT EXECUTE FUNCTION public.bump_dim_version();
+
+
+--
+-- Name: dim_location trg_dim_location_version; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER trg_dim_location_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.dim_location FOR EACH STATEMENT EXECUTE FUNCTION public.bump_dim_version();
+
+
+--
+-- Name: dim_product trg_dim_product_version; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER trg_dim_product_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.dim_product FOR EACH STATEMENT EXECUTE FUNCTION public.bump_dim_version();
+
+
+--
+-- Name: etl_file_manifest etl_file_manifest_load_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.etl_file_manifest
+    ADD CONSTRAINT etl_file_manifest_load_id_fkey FOREIGN KEY (load_id) REFERENCES public.metadata_loads(load_id) ON DELETE SET NULL;
+
+
+--
+-- Name: etl_run_metrics etl_run_metrics_load_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.etl_run_metrics
+    ADD CONSTRAINT etl_run_metrics_load_id_fkey FOREIGN KEY (load_id) REFERENCES public.metadata_loads(load_id) ON DELETE CASCADE;
 
 
 --
 -- Name: fact_sales fact_sales_customer_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.fact_sales
+ALTER TABLE public.fact_sales
     ADD CONSTRAINT fact_sales_customer_id_fkey FOREIGN KEY (customer_id) REFERENCES public.dim_customer(customer_id) ON DELETE RESTRICT;
 
 
@@ -501,7 +1069,7 @@ ALTER TABLE ONLY public.fact_sales
 -- Name: fact_sales fact_sales_date_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.fact_sales
+ALTER TABLE public.fact_sales
     ADD CONSTRAINT fact_sales_date_id_fkey FOREIGN KEY (date_id) REFERENCES public.dim_date(date_id) ON DELETE RESTRICT;
 
 
@@ -509,7 +1077,7 @@ ALTER TABLE ONLY public.fact_sales
 -- Name: fact_sales fact_sales_location_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.fact_sales
+ALTER TABLE public.fact_sales
     ADD CONSTRAINT fact_sales_location_id_fkey FOREIGN KEY (location_id) REFERENCES public.dim_location(location_id) ON DELETE RESTRICT;
 
 
@@ -517,10 +1085,15 @@ ALTER TABLE ONLY public.fact_sales
 -- Name: fact_sales fact_sales_product_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.fact_sales
+ALTER TABLE public.fact_sales
     ADD CONSTRAINT fact_sales_product_id_fkey FOREIGN KEY (product_id) REFERENCES public.dim_product(product_id) ON DELETE RESTRICT;
 
 
+--
+-- PostgreSQL database dump complete
+--
+
+
 --
 -- PostgreSQL database dump complete
 --
@@ -0,0 +1,104 @@
+# benchmarks/bench_product_matcher.py
+"""Compare the indexed carbon-rating matcher in enrich_sales with the original per-row scan.
+
+    python benchmarks/bench_product_matcher.py --products 10000 --sales 1000000
+
+The original loop is O(sales x catalog), so it is timed on a sample of sales
+and extrapolated; the indexed matcher always runs on the full set. Results of
+both are compared on the sample and must be identical.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from etl.transform import build_product_index, lookup_carbon_ratings
+
+BASE_NAMES = [
+    "Portable Solar Charger 20W", "Bamboo Toothbrush Set (4-pack)", "Reusable Beeswax Food Wraps",
+    "Eco-Friendly Laundry Detergent", "Stainless Steel Straw Set", "Recycled Cotton Tote Bag",
+    "Solar Garden Lights (6-pack)",
+]
+
+
+def legacy_carbon_ratings(product_names: pd.Series, df_products: pd.DataFrame) -> pd.Series:
+    """The pre-index enrich_sales lookup: one substring scan of the catalog per sale row."""
+    products_map = df_products.set_index('product_name')[['carbon_footprint_rating']].to_dict('index')
+
+    def get_carbon_rating(product_name):
+        if pd.isna(product_name):
+            return 5
+        norm_name = str(product_name).strip().lower()
+        for p_name, info in products_map.items():
+            if norm_name in str(p_name).strip().lower():
+                return info['carbon_footprint_rating']
+        return 5
+
+    return product_names.apply(get_carbon_rating)
+
+
+def make_data(n_products: int, n_sales: int, seed: int):
+    rng = np.random.default_rng(seed)
+    names = [f"{BASE_NAMES[i % len(BASE_NAMES)]} Model {i:05d}" for i in range(n_products)]
+    df_products = pd.DataFrame({
+        'product_name': names,
+        'carbon_footprint_rating': rng.integers(1, 11, n_products),
+    })
+
+    picks = rng.integers(0, n_products, n_sales)
+    sale_names = np.array(names, dtype=object)[picks]
+    # Mix in the shapes the substring scan has to handle: case/whitespace noise,
+    # partial names, unknown products, short fragments and missing names
+    kind = rng.random(n_sales)
+    sale_names = np.where(kind < 0.10, np.char.upper(sale_names.astype(str)).astype(object), sale_names)
+    sale_names = np.where((kind >= 0.10) & (kind < 0.15),
+                          np.array([n.split(' Model')[0] for n in sale_names], dtype=object), sale_names)
+    sale_names = np.where((kind >= 0.15) & (kind < 0.17), 'Plastic Water Bottle', sale_names)
+    sale_names = np.where((kind >= 0.17) & (kind < 0.18), 'so', sale_names)
+    sale_names = np.where(kind >= 0.99, None, sale_names)
+    return df_products, pd.Series(sale_names, dtype=object)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the enrich_sales product matcher")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--sales", type=int, default=1_000_000)
+    parser.add_argument("--legacy-sample", type=int, default=2_000,
+                        help="Sales rows timed with the original loop (extrapolated to --sales)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    df_products, sale_names = make_data(args.products, args.sales, args.seed)
+    sample = sale_names.sample(n=min(args.legacy_sample, len(sale_names)), random_state=args.seed)
+
+    start = time.perf_counter()
+    legacy = legacy_carbon_ratings(sample, df_products)
+    legacy_s = (time.perf_counter() - start) * len(sale_names) / len(sample)
+
+    start = time.perf_counter()
+    index = build_product_index(df_products)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = lookup_carbon_ratings(sale_names, index)
+    lookup_s = time.perf_counter() - start
+
+    mismatches = int((indexed.loc[sample.index].to_numpy() != legacy.to_numpy()).sum())
+
+    print(f"catalog={args.products:,} sales={args.sales:,}")
+    print(f"legacy loop (extrapolated from {len(sample):,} rows): {legacy_s:,.1f}s")
+    print(f"indexed matcher: build {build_s:.2f}s + lookup {lookup_s:.2f}s")
+    print(f"speedup: {legacy_s / (build_s + lookup_s):,.0f}x")
+    print(f"mismatches on sample: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+# benchmarks/bench_stages.py
+"""Stage-level benchmarks for the ETL package, on fixed synthetic datasets.
+
+    python benchmarks/bench_stages.py --sizes 10000,100000
+    python benchmarks/bench_stages.py --compare benchmarks/results/<old>.json --threshold 0.15
+    python benchmarks/bench_stages.py --compare old.json --against new.json
+
+Datasets are generated from a fixed seed with generate_data.py's load-test
+generator, so runs on two commits time the same input. Database benchmarks
+(map_fact_foreign_keys, upsert_df, handle_scd_type2) need ECO_BENCH_DSN (or
+--dsn) pointing at a local Postgres server: a throwaway database is created
+from Schema.sql for the run and dropped afterwards. They are skipped when no
+DSN is given.
+
+Results are written as JSON (median/min seconds and rows/s per size and
+stage). --compare reports every stage's change against a baseline file and
+exits 1 when one is slower by more than --threshold.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Keep the run away from the developer's caches and trained models
+_scratch = tempfile.mkdtemp(prefix="eco_bench_")
+os.environ.setdefault("ECO_DIM_CACHE_DIR", os.path.join(_scratch, "dim_keys"))
+os.environ["ECO_OUTLIER_MODEL_DIR"] = os.path.join(_scratch, "models")
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extensions import make_dsn
+
+import generate_data
+from etl import dim_cache, outliers
+from etl.extract import extract_file
+from etl.load import FACT_COLUMNS, FACT_KEY, handle_scd_type2, map_fact_foreign_keys, upsert_df
+from etl.transform import clean_sales, detect_outliers, enrich_sales, rename_to_schema_columns
+
+RESULTS_DIR = os.path.join(project_root, "benchmarks", "results")
+DEFAULT_SIZES = "10000,100000"
+DEFAULT_THRESHOLD = 0.15
+# Stages faster than this are too noisy to flag as regressions
+MIN_COMPARE_SECONDS = 0.01
+
+PRODUCT_COLUMNS = ['category', 'price', 'carbon_footprint_rating']
+CUSTOMER_COLUMNS = ['customer_name', 'loyalty_level', 'join_date']
+# Share of customers changed per handle_scd_type2 update run
+SCD_CHANGE_RATE = 0.10
+
+
+# -------------------------------
+# Datasets
+# -------------------------------
+def write_dataset(rows: int, seed: int, directory: str) -> dict:
+    """Sales CSV, products JSON and customers xlsx for one size; returns source -> path."""
+    rng = np.random.default_rng(seed)
+    day = datetime(2026, 1, 15)
+    catalog = generate_data.build_catalog(max(len(generate_data.PRODUCTS), rows // 200), rng)
+    customers = generate_data.build_customers(max(100, rows // 10), day, rng)
+    emails = customers["email"].fillna("").to_numpy(dtype=object)
+    sales = generate_data.sales_chunk(rows, day, 1, catalog, emails, rng)
+
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        'sales': os.path.join(directory, "sales_bench.csv"),
+        'products': os.path.join(directory, "products_bench.json"),
+        'customers': os.path.join(directory, "customers_bench.xlsx"),
+    }
+    sales.to_csv(paths['sales'], index=False)
+    with open(paths['products'], "w", encoding="utf-8") as f:
+        json.dump(catalog.to_dict(orient="records"), f, default=float)
+    customers.to_excel(paths['customers'], index=False, sheet_name="Customers")
+    return paths
+
+
+# -------------------------------
+# Timing
+# -------------------------------
+def measure(run, setup=None, repeat: int = 3, rows: int = None) -> dict:
+    """Median/min wall time of run(*setup()) over repeat runs; setup is not timed."""
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        started = time.perf_counter()
+        run(*args)
+        timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    result = {'seconds': median, 'min_seconds': min(timings), 'runs': timings}
+    if rows is not None:
+        result['rows'] = rows
+        result['rows_per_s'] = rows / median if median > 0 else None
+    return result
+
+
+def _report(name: str, result: dict):
+    rate = f" ({result['rows_per_s']:,.0f} rows/s)" if result.get('rows_per_s') else ""
+    print(f"  {name:<36} {result['seconds'] * 1000:>10.1f} ms{rate}", flush=True)
+
+
+# -------------------------------
+# Stages
+# -------------------------------
+def bench_transform(paths: dict, repeat: int) -> dict:
+    """extract_file per format, then clean_sales → enrich_sales → detect_outliers."""
+    results = {}
+    raw = {}
+    for source, fmt in (('sales', 'csv'), ('products', 'json'), ('customers', 'xlsx')):
+        name = f"extract_file[{fmt}]"
+        results[name] = measure(lambda p=paths[source]: raw.__setitem__(source, extract_file(p, use_cache=False)),
+                                repeat=repeat)
+        results[name]['rows'] = len(raw[source])
+        results[name]['rows_per_s'] = len(raw[source]) / results[name]['seconds']
+        _report(name, results[name])
+
+    products = rename_to_schema_columns(raw['products'].copy(), 'products')
+    customers = rename_to_schema_columns(raw['customers'].copy(), 'customers')
+    sales = raw['sales']
+
+    results['clean_sales'] = measure(clean_sales, lambda: (sales.copy(),), repeat, rows=len(sales))
+    _report('clean_sales', results['clean_sales'])
+    cleaned = clean_sales(sales.copy())
+
+    results['enrich_sales'] = measure(enrich_sales, lambda: (cleaned.copy(), products), repeat, rows=len(cleaned))
+    _report('enrich_sales', results['enrich_sales'])
+    enriched = enrich_sales(cleaned.copy(), products)
+
+    results['detect_outliers[isolation_forest]'] = measure(
+        lambda df: detect_outliers(df, df_products=products), lambda: (enriched.copy(),), repeat, rows=len(enriched)
+    )
+    _report('detect_outliers[isolation_forest]', results['detect_outliers[isolation_forest]'])
+
+    history = enriched.merge(products[['product_name', 'category']], on='product_name', how='left')
+    baselines = outliers.fit_baselines(history)
+    results['detect_outliers[baselines]'] = measure(
+        lambda df: detect_outliers(df, baselines=baselines, df_products=products),
+        lambda: (enriched.copy(),), repeat, rows=len(enriched)
+    )
+    _report('detect_outliers[baselines]', results['detect_outliers[baselines]'])
+
+    return results, {
+        'sales': detect_outliers(enriched.copy(), baselines=baselines, df_products=products),
+        'products': products,
+        'customers': customers,
+    }
+
+
+def _reset_warehouse(conn):
+    cursor = conn.cursor()
+    cursor.execute("TRUNCATE fact_sales, dim_product, dim_customer RESTART IDENTITY CASCADE")
+    conn.commit()
+
+
+def _seed_static_dimensions(conn):
+    """dim_date and dim_location rows the generated sales reference."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO dim_date (date_id, date, year, quarter, month, day, weekday)
+        SELECT to_char(d, 'YYYYMMDD')::integer, d::date, extract(year FROM d), extract(quarter FROM d), extract(month FROM d),
+               extract(day FROM d), to_char(d, 'FMDay')
+        FROM generate_series('2025-01-01'::date, '2027-12-31'::date, '1 day') d
+    """)
+    cities = ['unknown'] + [c for c in generate_data.CITIES if c]
+    cursor.executemany("INSERT INTO dim_location (city, region) VALUES (%s, 'Unknown')", [(c,) for c in cities])
+    conn.commit()
+
+
+def _fact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """The frame load_fact_sales hands to upsert_df."""
+    fact_df = df[[c for c in FACT_COLUMNS if c in df.columns]].drop_duplicates(subset=['sale_id'], keep='last')
+    return fact_df.assign(revenue=fact_df['revenue'].fillna(0.00), carbon_savings=fact_df['carbon_savings'].fillna(0.00))
+
+
+def _clear_dim_cache():
+    dim_cache._memory.clear()
+    shutil.rmtree(dim_cache.DIM_CACHE_DIR, ignore_errors=True)
+
+
+def bench_load(data: dict, conn, repeat: int) -> dict:
+    """handle_scd_type2 (first load and updates), map_fact_foreign_keys (cold / warm) and upsert_df."""
+    results = {}
+    products, customers, sales = data['products'], data['customers'], data['sales']
+
+    def first_load():
+        handle_scd_type2(products, 'dim_product', 'product_name', PRODUCT_COLUMNS, conn)
+        handle_scd_type2(customers, 'dim_customer', 'email', CUSTOMER_COLUMNS, conn)
+
+    results['handle_scd_type2[first_load]'] = measure(
+        first_load, lambda: _reset_warehouse(conn) or (), repeat, rows=len(products) + len(customers)
+    )
+    _report('handle_scd_type2[first_load]', results['handle_scd_type2[first_load]'])
+
+    # Each run changes the same customers again, so every run expires and re-inserts them
+    changed_rows = customers.sample(frac=SCD_CHANGE_RATE, random_state=0).index
+    version = iter(range(1, repeat + 1))
+
+    def changed_customers():
+        updated = customers.copy()
+        updated.loc[changed_rows, 'customer_name'] = updated.loc[changed_rows, 'customer_name'] + f" v{next(version)}"
+        return (updated,)
+
+    results['handle_scd_type2[updates]'] = measure(
+        lambda df: handle_scd_type2(df, 'dim_customer', 'email', CUSTOMER_COLUMNS, conn),
+        changed_customers, repeat, rows=len(customers)
+    )
+    _report('handle_scd_type2[updates]', results['handle_scd_type2[updates]'])
+
+    results['map_fact_foreign_keys[cold]'] = measure(
+        map_fact_foreign_keys, lambda: _clear_dim_cache() or (sales, conn), repeat, rows=len(sales)
+    )
+    _report('map_fact_foreign_keys[cold]', results['map_fact_foreign_keys[cold]'])
+    results['map_fact_foreign_keys[warm]'] = measure(map_fact_foreign_keys, lambda: (sales, conn), repeat, rows=len(sales))
+    _report('map_fact_foreign_keys[warm]', results['map_fact_foreign_keys[warm]'])
+
+    fact_df = _fact_frame(map_fact_foreign_keys(sales, conn))
+
+    def empty_facts():
+        cursor = conn.cursor()
+        cursor.execute("TRUNCATE fact_sales")
+        conn.commit()
+        return (fact_df, 'fact_sales', FACT_KEY, conn)
+
+    results['upsert_df[insert]'] = measure(upsert_df, empty_facts, repeat, rows=len(fact_df))
+    _report('upsert_df[insert]', results['upsert_df[insert]'])
+    # fact_sales now holds every row, so these runs take the ON CONFLICT DO UPDATE path
+    results['upsert_df[update]'] = measure(
+        upsert_df, lambda: (fact_df, 'fact_sales', FACT_KEY, conn), repeat, rows=len(fact_df)
+    )
+    _report('upsert_df[update]', results['upsert_df[update]'])
+    return results
+
+
+def schema_sql() -> str:
+    """Schema.sql without psql meta-commands and settings older servers reject."""
+    with open(os.path.join(project_root, "Schema.sql"), encoding="utf-8") as f:
+        return ''.join(line for line in f if not line.startswith('\\') and 'transaction_timeout' not in line)
+
+
+def create_bench_database(dsn: str):
+    """Create a throwaway database from Schema.sql; returns (connection, database name)."""
+    dbname = f"eco_bench_{os.getpid()}"
+    admin = psycopg2.connect(dsn)
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE DATABASE {dbname}")
+    admin.close()
+
+    conn = psycopg2.connect(make_dsn(dsn, dbname=dbname))
+    conn.autocommit = False
+    cursor = conn.cursor()
+    cursor.execute(schema_sql())
+    # pg_dump clears search_path for the session; restore it for the stages under test
+    cursor.execute("SET search_path TO public")
+    conn.commit()
+    return conn, dbname
+
+
+def drop_bench_database(dsn: str, dbname: str):
+    admin = psycopg2.connect(dsn)
+    admin.autocommit = True
+    admin.cursor().execute(f"DROP DATABASE IF EXISTS {dbname}")
+    admin.close()
+
+
+# -------------------------------
+# Results
+# -------------------------------
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=project_root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Print every shared stage's change; returns the names that regressed past threshold."""
+    regressions = []
+    print(f"\n{'stage':<46} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, new in current['results'].items():
+        old = baseline['results'].get(key)
+        if old is None:
+            continue
+        change = new['seconds'] / old['seconds'] - 1 if old['seconds'] > 0 else 0.0
+        regressed = change > threshold and max(old['seconds'], new['seconds']) >= MIN_COMPARE_SECONDS
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:<46} {old['seconds'] * 1000:>8.1f}ms {new['seconds'] * 1000:>8.1f}ms {change:>+7.1%}{flag}")
+        if regressed:
+            regressions.append(key)
+
+    print(f"\nbaseline {baseline['meta'].get('commit')} vs current {current['meta'].get('commit')}: "
+          f"{len(regressions)} regression(s) over {threshold:.0%}")
+    return regressions
+
+
+def run_suite(sizes: list, repeat: int, seed: int, dsn: str = None) -> dict:
+    results = {}
+    conn = dbname = None
+    if dsn:
+        conn, dbname = create_bench_database(dsn)
+        _seed_static_dimensions(conn)
+    else:
+        print("ECO_BENCH_DSN not set - skipping database benchmarks")
+
+    try:
+        for rows in sizes:
+            print(f"\nsize={rows:,} rows", flush=True)
+            paths = write_dataset(rows, seed, os.path.join(_scratch, f"data_{rows}"))
+            stage_results, data = bench_transform(paths, repeat)
+            if conn is not None:
+                stage_results.update(bench_load(data, conn, repeat))
+            for name, result in stage_results.items():
+                results[f"{rows}/{name}"] = result
+    finally:
+        if conn is not None:
+            conn.close()
+            drop_bench_database(dsn, dbname)
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'sizes': sizes,
+            'repeat': repeat,
+            'seed': seed,
+            'database': bool(dsn),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': f"{platform.machine()} / {os.cpu_count()} CPUs",
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ETL stages on fixed synthetic datasets")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated sales row counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (the median is reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dsn", default=os.getenv("ECO_BENCH_DSN"),
+                        help="libpq DSN of a local Postgres server for the database benchmarks")
+    parser.add_argument("--output", default=None, help="Results JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--against", default=None, help="Compare this results JSON instead of running the suite")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown (fraction of the baseline) that counts as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep the ETL modules' INFO logging")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    try:
+        if args.against:
+            with open(args.against, encoding="utf-8") as f:
+                current = json.load(f)
+        else:
+            sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+            current = run_suite(sizes, args.repeat, args.seed, args.dsn)
+            output = args.output or os.path.join(RESULTS_DIR, f"{current['meta']['commit'] or 'results'}.json")
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump(current, f, indent=2)
+            print(f"\nWrote {output}")
+    finally:
+        shutil.rmtree(_scratch, ignore_errors=True)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, current, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,7 @@ sys.path.insert(0, '/opt/airflow/project')
 from etl.extract import extract_all
 from etl.transform import transform_all
 from etl.load import load_all
+from etl.artifacts import run_dir, write_stage, load_stage, row_counts
 
 # Updated to use environment variables to prevent privacy leaks
 default_args = {
@@ -65,11 +66,17 @@ with DAG(
         dag=dag,
     )
 
+    # Stage outputs are written as Parquet under a run-scoped directory; XCom only
+    # carries the manifest (paths + row counts), never the DataFrames themselves
+    def _run_dir(context):
+        return run_dir(context['dag'].dag_id, context['run_id'])
+
     # 4. Extract: Python-based multi-format extraction
     def extract_wrapper(**context):
         data = extract_all('/opt/airflow/project/staging')
-        context['task_instance'].xcom_push(key='extracted_data', value=data)
-        return data
+        manifest = write_stage(data, _run_dir(context), 'extract')
+        context['task_instance'].xcom_push(key='extracted_data', value=manifest)
+        return row_counts(manifest)
 
     extract = PythonOperator(
         task_id='extract',
@@ -81,10 +88,11 @@ with DAG(
 
     # 5. Transform: Cleans data and calculates "Green" metrics
     def transform_wrapper(**context):
-        data = context['task_instance'].xcom_pull(key='extracted_data', task_ids='extract')
-        transformed = transform_all(data)
-        context['task_instance'].xcom_push(key='transformed_data', value=transformed)
-        return transformed
+        manifest = context['task_instance'].xcom_pull(key='extracted_data', task_ids='extract')
+        transformed = transform_all(load_stage(manifest))
+        manifest = write_stage(transformed, _run_dir(context), 'transform')
+        context['task_instance'].xcom_push(key='transformed_data', value=manifest)
+        return row_counts(manifest)
 
     transform = PythonOperator(
         task_id='transform',
@@ -96,8 +104,8 @@ with DAG(
 
     # 6. Validate: Basic threshold checks before loading
     def validate_wrapper(**context):
-        transformed = context['task_instance'].xcom_pull(key='transformed_data', task_ids='transform')
-        row_count = len(transformed) if transformed is not None else 0
+        manifest = context['task_instance'].xcom_pull(key='transformed_data', task_ids='transform')
+        row_count = row_counts(manifest).get('sales', 0)
         if row_count < 10:
             print(f"Warning: only {row_count} rows after transform")
         else:
@@ -113,9 +121,9 @@ with DAG(
 
     # 7. Load: SCD Type 2 and Fact table ingestion
     def load_wrapper(**context):
-        data = context['task_instance'].xcom_pull(key='transformed_data', task_ids='transform')
-        load_all(data)
-        row_count = len(data.get('sales', [])) if data else 0
+        manifest = context['task_instance'].xcom_pull(key='transformed_data', task_ids='transform')
+        load_all(load_stage(manifest))
+        row_count = row_counts(manifest).get('sales', 0)
         context['task_instance'].xcom_push(key='row_count', value=row_count)
 
     load = PythonOperator(
@@ -140,10 +148,15 @@ with DAG(
         dag=dag,
     )
 
-    # 9. Cleanup: Purges staging area after success
+    # 9. Cleanup: Purges this run's artifacts and the staging area after success
+    # (a failed run keeps its artifacts for inspection; `python -m etl.artifacts prune` clears old ones)
     cleanup = BashOperator(
         task_id='cleanup',
-        bash_command='rm -f /opt/airflow/project/staging/* && echo "Staging cleaned"',
+        bash_command=(
+            'cd /opt/airflow/project && '
+            'python -m etl.artifacts clean --dag-id "{{ dag.dag_id }}" --run-id "{{ run_id }}" && '
+            'rm -f /opt/airflow/project/staging/* && echo "Staging cleaned"'
+        ),
         trigger_rule='none_failed',
         dag=dag,
     )
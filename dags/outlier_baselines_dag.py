@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+import os
+
+from airflow import DAG
+from airflow.operators.bash import BashOperator
+
+default_args = {
+    'owner': 'Lesego',
+    'depends_on_past': False,
+    'retries': 1,
+    'retry_delay': timedelta(minutes=10),
+    'email_on_failure': False,
+    'email_on_retry': False,
+    'email': [os.getenv('ALERT_EMAIL', 'your_email@example.com')],
+}
+
+with DAG(
+    dag_id='eco_outlier_baselines',
+    default_args=default_args,
+    description='Weekly refit of the per-product / per-category outlier baselines used by transform',
+    schedule='@weekly',
+    start_date=datetime(2026, 1, 1),
+    catchup=False,
+    tags=['eco', 'etl', 'ml'],
+    max_active_runs=1,
+) as dag:
+
+    # Refit from the last ECO_OUTLIER_TRAIN_DAYS of fact_sales; the daily ETL picks up the new file
+    train_baselines = BashOperator(
+        task_id='train_outlier_baselines',
+        bash_command='cd /opt/airflow/project && python -m etl.outliers train',
+        dag=dag,
+    )
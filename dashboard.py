@@ -1,55 +1,143 @@
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine
-import os
-
-# --- Pull credentials from environment variables securely ---
-db_user = os.getenv("ECO_DB_USER", "postgres")
-db_password = os.getenv("ECO_DB_PASSWORD", "") # No hardcoded fallback!
-db_host = os.getenv("ECO_DB_HOST", "127.0.0.1")
-db_port = os.getenv("ECO_DB_PORT", "6432")
-db_name = os.getenv("ECO_DB_NAME", "eco_warehouse")
-
-# Database Connection
-engine = create_engine(f'postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}')
-
-st.set_page_config(page_title="Pipeline Monitor", layout="wide")
-st.title("🚀 Eco-Warehouse Pipeline Monitor")
-
-# Load Data from our Phase 8 View
-try:
-    df = pd.read_sql("SELECT * FROM v_pipeline_health", engine)
-except Exception as e:
-    st.error(f"Database Error: {e}")
-    df = pd.DataFrame()
-
-if df.empty:
-    st.warning("No pipeline data found. Please run ingest.sh to generate logs.")
-else:
-    # Top Level Metrics with Null Safety
-    col1, col2, col3 = st.columns(3)
-    
-    latest_status = df['ingestion_status'].iloc[0]
-    # Use 0 if the value is None (happens during active 'RUNNING' status)
-    files_moved = df['files_moved'].iloc[0] if pd.notna(df['files_moved'].iloc[0]) else 0
-    total_rows = df['total_rows'].iloc[0] if pd.notna(df['total_rows'].iloc[0]) else 0
-
-    col1.metric("Latest Status", latest_status)
-    col2.metric("Files Processed", int(files_moved))
-    col3.metric("Total Rows", int(total_rows))
-
-    # Charts - Filter out incomplete runs for cleaner visuals
-    chart_df = df[df['ingestion_status'] != 'RUNNING'].copy()
-    
-    if not chart_df.empty:
-        st.subheader("Data Volume Trends")
-        st.line_chart(chart_df.set_index('start_time')['total_rows'])
-
-        st.subheader("Data Quality Issues (Nulls/Duplicates)")
-        st.bar_chart(chart_df.set_index('start_time')[['null_counts', 'duplicate_counts']])
+from datetime import timedelta
+
+# Database Connection: the etl package's pool (credentials from ECO_DB_* environment variables)
+from etl.db import read_frame
+
+st.set_page_config(page_title="Eco-Warehouse", layout="wide")
+
+
+def pipeline_monitor():
+    st.title("🚀 Eco-Warehouse Pipeline Monitor")
+
+    # Load Data from our Phase 8 View
+    try:
+        df = read_frame("SELECT * FROM v_pipeline_health")
+    except Exception as e:
+        st.error(f"Database Error: {e}")
+        df = pd.DataFrame()
+
+    if df.empty:
+        st.warning("No pipeline data found. Please run ingest.sh to generate logs.")
     else:
-        st.info("Charts will populate once the first run completes.")
+        # Top Level Metrics with Null Safety
+        col1, col2, col3 = st.columns(3)
+
+        latest_status = df['ingestion_status'].iloc[0]
+        # Use 0 if the value is None (happens during active 'RUNNING' status)
+        files_moved = df['files_moved'].iloc[0] if pd.notna(df['files_moved'].iloc[0]) else 0
+        total_rows = df['total_rows'].iloc[0] if pd.notna(df['total_rows'].iloc[0]) else 0
+
+        col1.metric("Latest Status", latest_status)
+        col2.metric("Files Processed", int(files_moved))
+        col3.metric("Total Rows", int(total_rows))
+
+        # Charts - Filter out incomplete runs for cleaner visuals
+        chart_df = df[df['ingestion_status'] != 'RUNNING'].copy()
+
+        if not chart_df.empty:
+            st.subheader("Data Volume Trends")
+            st.line_chart(chart_df.set_index('start_time')['total_rows'])
+
+            st.subheader("Data Quality Issues (Nulls/Duplicates)")
+            st.bar_chart(chart_df.set_index('start_time')[['null_counts', 'duplicate_counts']])
+        else:
+            st.info("Charts will populate once the first run completes.")
+
+        # Detailed Log Table
+        st.subheader("Recent Run Details")
+        st.dataframe(df)
+
+
+# Sales analytics reads only the rollup tables (migrations/0006), never fact_sales
+@st.cache_data(ttl=300)
+def rollup_frame(sql: str, params=None) -> pd.DataFrame:
+    return read_frame(sql, params)
+
+
+def sales_analytics():
+    st.title("📈 Sales Analytics")
+
+    try:
+        bounds = rollup_frame("SELECT min(sale_date) AS first_day, max(sale_date) AS last_day FROM rollup_sales_daily")
+    except Exception as e:
+        st.error(f"Database Error: {e}")
+        return
+    first_day, last_day = bounds['first_day'].iloc[0], bounds['last_day'].iloc[0]
+    if pd.isna(first_day):
+        st.warning("No sales rollups yet. Run the pipeline, or `python -m etl.rollups rebuild` after a backfill.")
+        return
+
+    default_start = max(first_day, last_day - timedelta(days=89))
+    picked = st.date_input("Sale dates", (default_start, last_day), min_value=first_day, max_value=last_day)
+    if not isinstance(picked, (tuple, list)) or len(picked) != 2:
+        st.info("Pick a start and an end date.")
+        return
+    start, end = picked
+
+    daily = rollup_frame(
+        """
+        SELECT sale_date, sales_count, quantity_sold, revenue, carbon_savings
+        FROM rollup_sales_daily WHERE sale_date BETWEEN %s AND %s ORDER BY sale_date
+        """,
+        (start, end)
+    )
+    if daily.empty:
+        st.info("No sales in the selected range.")
+        return
+    daily[['revenue', 'carbon_savings']] = daily[['revenue', 'carbon_savings']].astype(float)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Revenue", f"R{daily['revenue'].sum():,.2f}")
+    col2.metric("Sales", f"{int(daily['sales_count'].sum()):,}")
+    col3.metric("Units Sold", f"{int(daily['quantity_sold'].sum()):,}")
+    col4.metric("Carbon Savings", f"{daily['carbon_savings'].sum():,.2f}")
+
+    st.subheader("Daily Revenue")
+    st.line_chart(daily.set_index('sale_date')['revenue'])
+
+    left, right = st.columns(2)
+    by_category = rollup_frame(
+        """
+        SELECT category, sum(revenue)::float AS revenue, sum(quantity_sold) AS quantity_sold
+        FROM rollup_sales_daily_category WHERE sale_date BETWEEN %s AND %s
+        GROUP BY category ORDER BY revenue DESC
+        """,
+        (start, end)
+    )
+    left.subheader("Revenue by Category")
+    left.bar_chart(by_category.set_index('category')['revenue'])
+
+    by_region = rollup_frame(
+        """
+        SELECT region, sum(revenue)::float AS revenue, sum(carbon_savings)::float AS carbon_savings
+        FROM rollup_sales_daily_region WHERE sale_date BETWEEN %s AND %s
+        GROUP BY region ORDER BY revenue DESC
+        """,
+        (start, end)
+    )
+    right.subheader("Revenue by Region")
+    right.bar_chart(by_region.set_index('region')['revenue'])
+
+    # Product names come from the dimension; the figures from the finest rollup,
+    # whose YYYYMMDD date_id range-scans straight off its primary key
+    st.subheader("Top Products")
+    top_products = rollup_frame(
+        """
+        SELECT p.product_name, p.category, sum(r.sales_count) AS sales,
+               sum(r.quantity_sold) AS units, sum(r.revenue)::float AS revenue
+        FROM rollup_sales_daily_product_location r
+        JOIN dim_product p ON p.product_id = r.product_id
+        WHERE r.date_id BETWEEN %s AND %s
+        GROUP BY p.product_name, p.category
+        ORDER BY revenue DESC
+        LIMIT 20
+        """,
+        (int(f"{start:%Y%m%d}"), int(f"{end:%Y%m%d}"))
+    )
+    st.dataframe(top_products)
+
 
-    # Detailed Log Table
-    st.subheader("Recent Run Details")
-    st.dataframe(df)
\ No newline at end of file
+PAGES = {"Pipeline Monitor": pipeline_monitor, "Sales Analytics": sales_analytics}
+PAGES[st.sidebar.radio("Page", list(PAGES))]()
@@ -0,0 +1,188 @@
+# etl/artifacts.py
+"""Run-scoped Parquet artifacts for handing stage outputs between DAG tasks.
+
+Instead of pushing dicts of DataFrames through XCom (serialized into the
+Airflow metadata database on every push and pull), each task writes its
+frames under <ARTIFACT_ROOT>/<dag_id>/<run_id>/<stage>/ and pushes only a
+small manifest of paths and row counts. The consumer wraps the manifest in
+LazyFrames, which reads a table the first time it is used.
+
+    python -m etl.artifacts clean --dag-id <dag> --run-id <run>
+    python -m etl.artifacts prune --older-than-days 7
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import logging
+import argparse
+from collections.abc import MutableMapping
+
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ARTIFACT_ROOT = os.getenv("ECO_ARTIFACT_DIR", os.path.join(project_root, "artifacts"))
+
+
+def _safe(part: str) -> str:
+    """Run ids look like 'scheduled__2026-01-01T00:00:00+00:00'; keep them filesystem-safe."""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(part))
+
+
+def run_dir(dag_id: str, run_id: str, root: str = None) -> str:
+    """Directory holding every artifact of one DAG run."""
+    return os.path.join(root or ARTIFACT_ROOT, _safe(dag_id), _safe(run_id))
+
+
+def write_stage(data: dict, directory: str, stage: str) -> dict:
+    """Write each DataFrame in data under directory/stage; returns the XCom manifest."""
+    stage_dir = os.path.join(directory, stage)
+    os.makedirs(stage_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    tables = {}
+    for name, df in data.items():
+        if not isinstance(df, pd.DataFrame):
+            continue
+        path = os.path.join(stage_dir, f"{_safe(name)}.parquet")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fmt = 'parquet'
+        try:
+            df.to_parquet(tmp_path, index=False)
+        except Exception as e:
+            # Raw extracts can hold object columns mixing numbers and strings,
+            # which Parquet cannot type; keep those frames exactly as they are
+            logger.warning(f"{stage}/{name} is not Parquet-typable ({e}) - writing a pickle instead")
+            path = os.path.join(stage_dir, f"{_safe(name)}.pkl")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            df.to_pickle(tmp_path)
+            fmt = 'pickle'
+        os.replace(tmp_path, path)
+        tables[name] = {'path': path, 'format': fmt, 'rows': len(df)}
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(t['rows'] for t in tables.values())
+    logger.info(f"Wrote {stage} artifacts: {len(tables)} tables, {total_rows} rows in {elapsed:.2f}s ({stage_dir})")
+    return {'stage': stage, 'run_dir': directory, 'tables': tables}
+
+
+def row_counts(manifest: dict) -> dict:
+    """table -> row count, straight from the manifest (no data is read)."""
+    if not manifest:
+        return {}
+    return {name: table['rows'] for name, table in manifest.get('tables', {}).items()}
+
+
+def _read_table(table: dict) -> pd.DataFrame:
+    if table.get('format') == 'pickle':
+        return pd.read_pickle(table['path'])
+    return pd.read_parquet(table['path'])
+
+
+class LazyFrames(MutableMapping):
+    """dict of DataFrames backed by a stage manifest; each table is read on first access.
+
+    Assigned frames shadow the artifact, and copy() shares what has already been
+    read, so transform_all/load_all can use it wherever they expect a plain dict.
+    """
+
+    def __init__(self, manifest: dict = None, _tables: dict = None, _loaded: dict = None):
+        self._tables = dict(_tables if _tables is not None else (manifest or {}).get('tables', {}))
+        self._loaded = dict(_loaded or {})
+
+    def __getitem__(self, name):
+        if name not in self._loaded:
+            if name not in self._tables:
+                raise KeyError(name)
+            started = time.perf_counter()
+            self._loaded[name] = _read_table(self._tables[name])
+            logger.info(f"Read artifact {name} ({self._tables[name]['rows']} rows) "
+                        f"in {time.perf_counter() - started:.2f}s")
+        return self._loaded[name]
+
+    def __setitem__(self, name, df):
+        self._loaded[name] = df
+
+    def __delitem__(self, name):
+        if name not in self._loaded and name not in self._tables:
+            raise KeyError(name)
+        self._loaded.pop(name, None)
+        self._tables.pop(name, None)
+
+    def __iter__(self):
+        yield from self._tables
+        yield from (name for name in self._loaded if name not in self._tables)
+
+    def __len__(self):
+        return len(self._tables.keys() | self._loaded.keys())
+
+    def __contains__(self, name):
+        return name in self._loaded or name in self._tables
+
+    def copy(self):
+        return LazyFrames(_tables=self._tables, _loaded=self._loaded)
+
+    def __repr__(self):
+        loaded = [name for name in self if name in self._loaded]
+        return f"LazyFrames(tables={list(self)}, loaded={loaded})"
+
+
+def load_stage(manifest: dict) -> LazyFrames:
+    """Lazy view of the frames a stage wrote."""
+    return LazyFrames(manifest)
+
+
+def clean_run(dag_id: str, run_id: str, root: str = None) -> bool:
+    """Remove every artifact of one DAG run; returns whether anything was removed."""
+    directory = run_dir(dag_id, run_id, root)
+    if not os.path.isdir(directory):
+        return False
+    shutil.rmtree(directory)
+    logger.info(f"Removed artifacts {directory}")
+    return True
+
+
+def prune(older_than_days: float, root: str = None) -> int:
+    """Remove run directories left behind (e.g. by failed runs) older than the cutoff."""
+    root = root or ARTIFACT_ROOT
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - older_than_days * 86400
+    removed = 0
+    for dag_id in os.listdir(root):
+        dag_dir = os.path.join(root, dag_id)
+        if not os.path.isdir(dag_dir):
+            continue
+        for run in os.listdir(dag_dir):
+            directory = os.path.join(dag_dir, run)
+            if os.path.isdir(directory) and os.path.getmtime(directory) < cutoff:
+                shutil.rmtree(directory)
+                removed += 1
+    logger.info(f"Pruned {removed} artifact run directories older than {older_than_days:g} days")
+    return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage run-scoped ETL artifacts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    clean = sub.add_parser("clean", help="Remove one run's artifacts")
+    clean.add_argument("--dag-id", required=True)
+    clean.add_argument("--run-id", required=True)
+    old = sub.add_parser("prune", help="Remove run directories older than a cutoff")
+    old.add_argument("--older-than-days", type=float, default=7)
+    args = parser.parse_args(argv)
+
+    if args.command == "clean":
+        clean_run(args.dag_id, args.run_id)
+    else:
+        prune(args.older_than_days)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
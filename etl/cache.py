@@ -0,0 +1,166 @@
+# etl/cache.py
+"""Content-addressed Parquet cache of parsed staging files.
+
+Entries are keyed by a hash of the file bytes, so DAG retries and manual
+reruns over the same staging folder load columnar data instead of re-parsing
+Excel/JSON/CSV. The cache is size-bounded: least recently used entries are
+evicted first.
+
+    python -m etl.cache stats
+    python -m etl.cache clear
+"""
+import os
+import sys
+import hashlib
+import logging
+import argparse
+
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MB = 1024 * 1024
+
+CACHE_DIR = os.getenv("ECO_EXTRACT_CACHE_DIR", os.path.join(project_root, ".cache", "extract"))
+CACHE_MAX_BYTES = int(float(os.getenv("ECO_EXTRACT_CACHE_MAX_MB", 1024)) * MB)
+CACHE_ENABLED = os.getenv("ECO_EXTRACT_CACHE", "1") != "0"
+
+# Bump when a parser change would make existing entries stale
+CACHE_FORMAT = 2
+
+# Hit/miss counters for this process (extract_all folds in its workers' counts)
+CACHE_STATS = {'hits': 0, 'misses': 0, 'stores': 0, 'store_errors': 0, 'evictions': 0}
+
+
+def file_digest(file_path: str, block_size: int = 1 << 20) -> str:
+    """blake2b of the file contents."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(file_path: str) -> str:
+    """Cache key: content hash + extension (the same bytes parse differently per format)."""
+    ext = os.path.splitext(file_path)[1].lower().lstrip('.')
+    return f"{file_digest(file_path)}-{ext}-v{CACHE_FORMAT}"
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.parquet")
+
+
+def load(key: str):
+    """Cached DataFrame for key, or None on a miss."""
+    path = _entry_path(key)
+    if not os.path.exists(path):
+        CACHE_STATS['misses'] += 1
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception as e:
+        logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+        _remove(path)
+        CACHE_STATS['misses'] += 1
+        return None
+    os.utime(path)  # LRU: eviction removes the least recently read entries
+    CACHE_STATS['hits'] += 1
+    return df
+
+
+def store(key: str, df: pd.DataFrame):
+    """Write df under key (atomically, so parallel extract workers never see a partial file)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        CACHE_STATS['stores'] += 1
+    except Exception as e:
+        # e.g. object columns mixing numbers and strings that Parquet cannot type
+        logger.warning(f"Could not cache {key}: {e}")
+        _remove(tmp_path)
+        CACHE_STATS['store_errors'] += 1
+        return
+    evict()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _entries() -> list:
+    """(path, size, mtime) of every cache entry, oldest first."""
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith('.parquet'):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((path, st.st_size, st.st_mtime))
+    return sorted(entries, key=lambda e: e[2])
+
+
+def evict(max_bytes: int = None) -> int:
+    """Remove least recently used entries until the cache fits max_bytes; returns entries removed."""
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for path, size, _ in entries:
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+        removed += 1
+    if removed:
+        CACHE_STATS['evictions'] += removed
+        logger.info(f"Evicted {removed} extract cache entries (cache now {total / MB:.1f} MB)")
+    return removed
+
+
+def clear() -> int:
+    """Delete every cache entry; returns entries removed."""
+    entries = _entries()
+    for path, _, _ in entries:
+        _remove(path)
+    logger.info(f"Cleared {len(entries)} extract cache entries from {CACHE_DIR}")
+    return len(entries)
+
+
+def record(delta: dict):
+    """Fold counters reported by a worker process into this process's CACHE_STATS."""
+    for name, value in delta.items():
+        CACHE_STATS[name] = CACHE_STATS.get(name, 0) + value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the extract Parquet cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    args = parser.parse_args(argv)
+
+    if args.command == "clear":
+        clear()
+    else:
+        entries = _entries()
+        total = sum(size for _, size, _ in entries)
+        print(f"{CACHE_DIR}: {len(entries)} entries, {total / MB:.1f} MB "
+              f"(limit {CACHE_MAX_BYTES / MB:.0f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
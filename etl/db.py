@@ -0,0 +1,314 @@
+# etl/db.py
+"""Shared PostgreSQL connections for the etl package, the populate scripts and the dashboard.
+
+get_conn() checks a connection out of a bounded, thread-safe pool (one per
+process) instead of opening a new one per call; close() on it hands it
+back. Connections are health-checked on checkout after sitting idle, and
+(re)connecting retries with exponential backoff. Pool counters (checkout
+latency, connections in use) are available from pool_stats().
+
+Repeated dimension/metadata statements go through execute_prepared(),
+which PREPAREs them once per server session and EXECUTEs them afterwards.
+Prepared statements are session state: behind PgBouncer they need
+pool_mode=session (the default) or max_prepared_statements (PgBouncer
+1.21+) in transaction mode; otherwise set ECO_DB_PREPARED=0.
+"""
+import os
+import re
+import time
+import random
+import logging
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+import psycopg2.extensions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DB_PARAMS = {
+    'dbname': os.getenv("ECO_DB_NAME", "eco_warehouse"),
+    'user': os.getenv("ECO_DB_USER", "postgres"),
+    'password': os.getenv("ECO_DB_PASSWORD", ""),
+    'host': os.getenv("ECO_DB_HOST", "127.0.0.1"),   # Localhost instead of Docker host
+    'port': int(os.getenv("ECO_DB_PORT", 6432)),     # PgBouncer port
+}
+
+POOL_MAX = int(os.getenv("ECO_DB_POOL_MAX", 8))
+# Seconds a checkout waits for a free connection before giving up
+POOL_TIMEOUT = float(os.getenv("ECO_DB_POOL_TIMEOUT", 30))
+# Idle seconds after which a connection is pinged before being handed out
+HEALTH_CHECK_IDLE = float(os.getenv("ECO_DB_HEALTH_CHECK_IDLE", 30))
+CONNECT_ATTEMPTS = int(os.getenv("ECO_DB_CONNECT_ATTEMPTS", 5))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+PREPARED = os.getenv("ECO_DB_PREPARED", "1") == "1"
+
+# Checkout latencies kept for the percentile in pool_stats()
+LATENCY_WINDOW = 1000
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became free within POOL_TIMEOUT."""
+
+
+def connect(**overrides):
+    """Open one raw connection, retrying with exponential backoff (and jitter)."""
+    params = {**DB_PARAMS, **overrides}
+    for attempt in range(1, CONNECT_ATTEMPTS + 1):
+        try:
+            conn = psycopg2.connect(**params)
+            conn.autocommit = False
+            return conn
+        except psycopg2.OperationalError as e:
+            if attempt == CONNECT_ATTEMPTS:
+                logger.error(f"DB connection failed after {attempt} attempts: {e}")
+                raise
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            logger.warning(f"DB connection failed (attempt {attempt}/{CONNECT_ATTEMPTS}), retrying in {delay:.1f}s: {e}")
+            time.sleep(delay)
+
+
+class PooledConnection:
+    """A pooled psycopg2 connection; close() returns it to the pool instead of closing it."""
+
+    def __init__(self, raw, pool):
+        self._raw = raw
+        self._pool = pool
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    @property
+    def closed(self):
+        return 1 if self._raw is None else self._raw.closed
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.putconn(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._raw is not None:
+            if exc_type is None:
+                self._raw.commit()
+            else:
+                self._raw.rollback()
+        self.close()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool; callers block (up to POOL_TIMEOUT) while all connections are in use."""
+
+    def __init__(self, maxconn: int = None, timeout: float = None, **params):
+        self.maxconn = max(1, maxconn or POOL_MAX)
+        self.timeout = POOL_TIMEOUT if timeout is None else timeout
+        self.params = params
+        self._idle = []            # (raw connection, returned at)
+        self._in_use = 0
+        self._opening = 0
+        self._cond = threading.Condition()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {'checkouts': 0, 'waits': 0, 'timeouts': 0, 'connects': 0,
+                       'health_check_failures': 0, 'discarded': 0, 'peak_in_use': 0}
+
+    def _size(self):
+        return len(self._idle) + self._in_use + self._opening
+
+    def getconn(self) -> PooledConnection:
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        with self._cond:
+            waited = False
+            while not self._idle and self._size() >= self.maxconn:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No free database connection after {self.timeout:g}s "
+                                      f"({self._in_use}/{self.maxconn} in use)")
+                waited = True
+                self._cond.wait(remaining)
+            self._stats['waits'] += waited
+            if self._idle:
+                raw, returned_at = self._idle.pop()
+                self._in_use += 1
+            else:
+                raw, returned_at = None, None
+                self._opening += 1
+
+        try:
+            if raw is not None and not self._healthy(raw, returned_at):
+                self._discard(raw)
+                raw = None
+            if raw is None:
+                raw = connect(**self.params)
+                with self._cond:
+                    self._stats['connects'] += 1
+        except BaseException:
+            with self._cond:
+                if returned_at is None:
+                    self._opening -= 1
+                else:
+                    self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            if returned_at is None:
+                self._opening -= 1
+                self._in_use += 1
+            self._stats['checkouts'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._in_use)
+            self._latencies.append(time.perf_counter() - started)
+        return PooledConnection(raw, self)
+
+    def _healthy(self, raw, returned_at) -> bool:
+        if raw.closed:
+            return False
+        if time.monotonic() - returned_at < HEALTH_CHECK_IDLE:
+            return True
+        try:
+            cursor = raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            raw.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Pooled connection failed its health check - reconnecting: {e}")
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+            return False
+
+    def _discard(self, raw):
+        _prepared.pop(raw, None)
+        try:
+            raw.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._stats['discarded'] += 1
+
+    def putconn(self, raw):
+        """Take a connection back; anything left uncommitted is rolled back."""
+        keep = not raw.closed
+        if keep and raw.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                raw.rollback()
+            except psycopg2.Error:
+                keep = False
+        if keep and raw.autocommit:
+            raw.autocommit = False
+        with self._cond:
+            self._in_use -= 1
+            if keep and len(self._idle) + self._in_use < self.maxconn:
+                self._idle.append((raw, time.monotonic()))
+                keep_idle = True
+            else:
+                keep_idle = False
+            self._cond.notify()
+        if not keep_idle:
+            self._discard(raw)
+
+    def closeall(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self) -> dict:
+        with self._cond:
+            latencies = sorted(self._latencies)
+            stats = dict(self._stats, in_use=self._in_use, idle=len(self._idle), max=self.maxconn)
+        if latencies:
+            stats['checkout_ms_avg'] = round(1000 * sum(latencies) / len(latencies), 3)
+            stats['checkout_ms_p95'] = round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 3)
+            stats['checkout_ms_max'] = round(1000 * latencies[-1], 3)
+        return stats
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """This process's pool (a forked worker gets its own rather than sharing the parent's sockets)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool, _pool_pid = ConnectionPool(), os.getpid()
+    return _pool
+
+
+def get_conn() -> PooledConnection:
+    """Connection to local PostgreSQL via PgBouncer, from the shared pool (close() returns it)."""
+    return get_pool().getconn()
+
+
+@contextmanager
+def connection():
+    """with connection() as conn: ... commits on success, rolls back on error, then returns conn."""
+    conn = get_conn()
+    with conn:
+        yield conn
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
+def close_pool():
+    if _pool is not None:
+        _pool.closeall()
+
+
+# Server-side prepared statements: raw connection -> names prepared on it
+_prepared = weakref.WeakKeyDictionary()
+
+
+def execute_prepared(cursor, name: str, sql: str, params=None):
+    """cursor.execute(sql, params), through PREPARE/EXECUTE when ECO_DB_PREPARED is on.
+
+    sql uses %s placeholders; name must be unique per statement text.
+    """
+    if not PREPARED:
+        cursor.execute(sql, params)
+        return
+    names = _prepared.setdefault(cursor.connection, set())
+    if name not in names:
+        # PREPARE is sent without parameters, so %s become $n and %% a literal %
+        placeholders = iter(range(1, sql.count('%s') + 1))
+        server_sql = re.sub(r'%%|%s', lambda m: '%' if m.group() == '%%' else f"${next(placeholders)}", sql)
+        cursor.execute(f"PREPARE {name} AS {server_sql}")
+        names.add(name)
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+
+def read_frame(sql: str, params=None, conn=None) -> pd.DataFrame:
+    """Run a query and return the result as a DataFrame (pooled connection unless one is given)."""
+    own_conn = conn is None
+    conn = conn or get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        df = pd.DataFrame(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+        cursor.close()
+        conn.commit()
+        return df
+    finally:
+        if own_conn:
+            conn.close()
@@ -0,0 +1,173 @@
+# etl/dim_cache.py
+"""Versioned, on-disk cache of dimension business-key → surrogate-key lookups.
+
+map_fact_foreign_keys used to re-read every dimension on every call. Each
+dimension now carries a version in dim_versions, bumped by a statement
+trigger whenever anything writes to it (see migrations/0003). A lookup is
+kept as a small Parquet file per (database, dimension, version) and only
+refetched when the version moves. Keys are stored pre-normalized so fact
+rows resolve through a vectorized Index.get_indexer join.
+
+Dates need no lookup: dim_date.date_id is the YYYYMMDD smart key (see
+migrations/0009), computed from the sale date by date_ids(); only the
+calendar's first / last key is fetched (again per dim_date version) so
+dates outside it can be rejected.
+
+Everything here reads through the caller's connection and leaves its
+transaction open; committing is up to the caller.
+"""
+import os
+import re
+import logging
+
+import numpy as np
+import pandas as pd
+
+from etl.db import execute_prepared
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DIM_CACHE_DIR = os.getenv("ECO_DIM_CACHE_DIR", os.path.join(project_root, ".cache", "dim_keys"))
+
+# Rows per round trip when refreshing a lookup
+FETCH_SIZE = int(os.getenv("ECO_DIM_FETCH_SIZE", 50000))
+
+# dimension -> query returning (business key, surrogate id)
+LOOKUPS = {
+    'dim_product': "SELECT product_name, product_id FROM dim_product WHERE is_current = TRUE",
+    'dim_customer': "SELECT email, customer_id FROM dim_customer WHERE is_current = TRUE",
+    'dim_location': "SELECT city, location_id FROM dim_location",
+}
+
+# Lookups already read in this process: dimension -> (cache tag, DataFrame)
+_memory = {}
+
+
+def normalize_text(series: pd.Series) -> pd.Series:
+    """Business-key normalization shared by both sides of the join (str → strip → lower)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Normalize each category once instead of every row
+        categories = pd.Series(series.cat.categories.astype(str)).str.strip().str.lower()
+        codes = series.cat.codes.to_numpy()
+        values = np.where(codes >= 0, categories.to_numpy()[codes], 'nan')
+        return pd.Series(values, index=series.index, dtype=object)
+    return series.astype(object).astype(str).str.strip().str.lower()
+
+
+def date_ids(series: pd.Series) -> pd.Series:
+    """dim_date keys (YYYYMMDD as float, NaN where unparseable) for dates, timestamps or date strings."""
+    days = pd.to_datetime(series, errors='coerce')
+    return (days.dt.year * 10000 + days.dt.month * 100 + days.dt.day).astype(np.float64)
+
+
+def get_date_range(conn, versions: dict = None) -> tuple:
+    """(first, last) date_id in dim_date, refetched only when its version changed; (None, None) if empty."""
+    versions = dimension_versions(conn) if versions is None else versions
+    tag = versions.get('dim_date')
+    cached = _memory.get('dim_date')
+    if tag is not None and cached is not None and cached[0] == tag:
+        return cached[1]
+
+    cursor = conn.cursor()
+    # Both ends come off the primary key index
+    execute_prepared(cursor, 'eco_dim_date_range', "SELECT min(date_id), max(date_id) FROM dim_date")
+    date_range = cursor.fetchone()
+    cursor.close()
+    if tag is not None:
+        _memory['dim_date'] = (tag, date_range)
+    logger.info(f"dim_date covers {date_range[0]}..{date_range[1]} ({tag or 'unversioned'})")
+    return date_range
+
+
+def dimension_versions(conn) -> dict:
+    """dimension -> cache tag (version + last bump time); empty if dim_versions is missing.
+
+    Runs inside the caller's transaction; a failed probe is undone to a savepoint
+    so the transaction stays usable.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SAVEPOINT dim_versions_probe")
+    try:
+        execute_prepared(cursor, 'eco_dim_versions', "SELECT table_name, version, updated_at FROM dim_versions")
+        rows = cursor.fetchall()
+        cursor.execute("RELEASE SAVEPOINT dim_versions_probe")
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT dim_versions_probe")
+        logger.warning(f"dim_versions unavailable ({e}) - dimension lookups will not be cached")
+        return {}
+    finally:
+        cursor.close()
+    # updated_at guards against a recreated database restarting at the same version
+    return {name: f"v{version}-{updated_at:%Y%m%d%H%M%S%f}" for name, version, updated_at in rows}
+
+
+def _cache_dir(conn) -> str:
+    params = conn.get_dsn_parameters()
+    db_id = f"{params.get('host', 'local')}_{params.get('port', '')}_{params.get('dbname', '')}"
+    return os.path.join(DIM_CACHE_DIR, re.sub(r'[^A-Za-z0-9_.-]', '_', db_id))
+
+
+def _fetch_lookup(dimension: str, conn) -> pd.DataFrame:
+    query = LOOKUPS[dimension]
+    cursor = conn.cursor(name=f"dim_lookup_{dimension}")
+    cursor.itersize = FETCH_SIZE
+    cursor.execute(query)
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        chunks.append(pd.DataFrame(rows, columns=['key', 'id']))
+    # Closes the server-side cursor; the caller's transaction stays open
+    cursor.close()
+
+    lookup = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=['key', 'id'])
+    lookup = lookup[lookup['key'].notna()]
+    lookup['key'] = normalize_text(lookup['key'])
+    # Same precedence as the dict lookups this replaces: the last row for a key wins
+    lookup = lookup.drop_duplicates(subset=['key'], keep='last').reset_index(drop=True)
+    lookup['id'] = lookup['id'].astype(np.int64)
+    return lookup
+
+
+def get_lookup(dimension: str, conn, versions: dict = None) -> pd.DataFrame:
+    """(key, id) lookup for a dimension, refetched only when its version changed."""
+    versions = dimension_versions(conn) if versions is None else versions
+    tag = versions.get(dimension)
+    if tag is None:
+        return _fetch_lookup(dimension, conn)
+
+    cached = _memory.get(dimension)
+    if cached is not None and cached[0] == tag:
+        return cached[1]
+
+    cache_dir = _cache_dir(conn)
+    path = os.path.join(cache_dir, f"{dimension}.{tag}.parquet")
+    if os.path.exists(path):
+        lookup = pd.read_parquet(path)
+        logger.info(f"Dimension cache hit: {dimension} ({tag}, {len(lookup)} keys)")
+    else:
+        lookup = _fetch_lookup(dimension, conn)
+        os.makedirs(cache_dir, exist_ok=True)
+        for old in os.listdir(cache_dir):
+            if old.startswith(f"{dimension}."):
+                os.remove(os.path.join(cache_dir, old))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        lookup.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        logger.info(f"Dimension cache refreshed: {dimension} ({tag}, {len(lookup)} keys)")
+
+    _memory[dimension] = (tag, lookup)
+    return lookup
+
+
+def lookup_ids(keys: pd.Series, lookup: pd.DataFrame) -> pd.Series:
+    """Vectorized join of normalized keys against a lookup; misses are NaN."""
+    if lookup.empty:
+        return pd.Series(np.nan, index=keys.index)
+    positions = pd.Index(lookup['key']).get_indexer(keys.to_numpy())
+    ids = lookup['id'].to_numpy(dtype=np.float64)
+    return pd.Series(np.where(positions >= 0, ids[positions], np.nan), index=keys.index)
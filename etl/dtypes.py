@@ -0,0 +1,128 @@
+# etl/dtypes.py
+"""Schema-driven typing applied to every extracted frame.
+
+Parsers hand back object-dtype strings for almost everything. Each source
+declares how its columns should be held in memory: repeated strings become
+categoricals, integers are downcast (nullable when values are missing),
+and dates/timestamps are parsed once here rather than in every later
+stage. Columns the schema does not list, or that a file lacks, are left as
+they are. Dirty values (e.g. 'R120.00' prices) are left for clean_sales.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from etl import profiling
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# source -> column -> kind ('category', 'int', 'float', 'date', 'timestamp'), keyed on raw column names
+SOURCE_SCHEMAS = {
+    'sales': {
+        'sale_id': 'int',
+        'date': 'date',
+        'sale_timestamp': 'timestamp',
+        'product_name': 'category',
+        'quantity': 'int',
+        # Raw prices repeat per product ('120.0', 'R120.00'); clean_sales parses each category once
+        'price': 'category',
+        'customer_email': 'category',
+        'city': 'category',
+        'source_file': 'category',
+    },
+    'products': {
+        'category': 'category',
+        'price': 'float',
+        'carbon_rating': 'int',
+        'carbon_footprint_rating': 'int',
+    },
+    'customers': {
+        'loyalty_level': 'category',
+        'join_date': 'date',
+        'source_file': 'category',
+    },
+}
+
+# Smallest nullable integer dtype that holds a column's range
+NULLABLE_INTS = ['Int8', 'Int16', 'Int32', 'Int64']
+
+
+def _to_int(series: pd.Series) -> pd.Series:
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().all():
+        return values
+    if not (values.dropna() % 1 == 0).all():
+        # Fractional values are left for the cleaning rules to judge
+        return values
+    if not values.isna().any():
+        return pd.to_numeric(values, downcast='integer')
+    low, high = values.min(), values.max()
+    for dtype in NULLABLE_INTS:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+
+def _to_float(series: pd.Series) -> pd.Series:
+    values = pd.to_numeric(series, errors='coerce')
+    # Keep float64: prices and revenue are written to numeric(10,2) and need the precision
+    return values if values.notna().sum() == series.notna().sum() else series
+
+
+def _to_category(series: pd.Series) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    return series.astype('category')
+
+
+def _to_date(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.normalize()
+    return pd.to_datetime(series, errors='coerce').dt.normalize()
+
+
+def _to_timestamp(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors='coerce')
+
+
+CONVERTERS = {
+    'int': _to_int,
+    'float': _to_float,
+    'category': _to_category,
+    'date': _to_date,
+    'timestamp': _to_timestamp,
+}
+
+
+def csv_dtypes(source: str) -> dict:
+    """dtype= mapping for read_csv, so repeated strings are parsed straight into categoricals."""
+    return {column: 'category' for column, kind in SOURCE_SCHEMAS.get(source, {}).items() if kind == 'category'}
+
+
+def apply_schema(df: pd.DataFrame, source: str, report: bool = False) -> pd.DataFrame:
+    """Convert df's columns in place to the compact dtypes declared for source; returns df.
+
+    report=True logs the frame's footprint before and after (when memory profiling is on).
+    """
+    schema = SOURCE_SCHEMAS.get(source)
+    if df is None or schema is None:
+        return df
+
+    before = profiling.frame_bytes(df) if report and profiling.PROFILE_MEMORY else None
+    for column, kind in schema.items():
+        if column not in df.columns:
+            continue
+        try:
+            df[column] = CONVERTERS[kind](df[column])
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not type {source}.{column} as {kind}: {e}")
+
+    if before is not None:
+        after = profiling.frame_bytes(df)
+        logger.info(f"Typed {source}: {len(df)} rows, {before / profiling.MB:.1f} MB → {after / profiling.MB:.1f} MB")
+    return df
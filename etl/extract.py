@@ -3,18 +3,58 @@ import os
 import pandas as pd
 import json
 import logging
-import glob
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from etl import cache as extract_cache
+from etl.dtypes import apply_schema, csv_dtypes
+from etl.streaming import consume_new_updates, read_latest_updates
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def extract_file(file_path: str):
-    """Extract single file based on extension."""
+# Batch sources recognised in staging file names
+SOURCES = ('sales', 'products', 'customers')
+
+# Lineage column added to every extracted batch frame
+SOURCE_FILE_COLUMN = 'source_file'
+
+PARSED_EXTENSIONS = ('.csv', '.json', '.xlsx', '.xls')
+
+# Process pool size for extract_all (Excel/JSON parsing is CPU-bound)
+EXTRACT_WORKERS = int(os.getenv("ECO_EXTRACT_WORKERS", os.cpu_count() or 1))
+
+
+def extract_file(file_path: str, use_cache: bool = None):
+    """Extract single file based on extension (served from the Parquet cache when unchanged)."""
     ext = os.path.splitext(file_path)[1].lower()
-    
+    if ext not in PARSED_EXTENSIONS:
+        logger.warning(f"Unsupported file type: {file_path}")
+        return None
+
+    use_cache = extract_cache.CACHE_ENABLED if use_cache is None else use_cache
+    key = None
+    if use_cache:
+        try:
+            key = extract_cache.cache_key(file_path)
+            df = extract_cache.load(key)
+        except OSError as e:
+            logger.warning(f"Extract cache unavailable for {file_path}: {e}")
+            key, df = None, None
+        if df is not None:
+            logger.info(f"Extracted from cache: {file_path} ({len(df)} rows)")
+            return df
+
+    df = apply_schema(_parse_file(file_path, ext), source_of(os.path.basename(file_path)))
+    if df is not None and key is not None:
+        extract_cache.store(key, df)
+    return df
+
+
+def _parse_file(file_path: str, ext: str):
     try:
         if ext == '.csv':
-            df = pd.read_csv(file_path)
+            df = pd.read_csv(file_path, dtype=csv_dtypes(source_of(os.path.basename(file_path))))
             logger.info(f"Extracted CSV: {file_path} ({len(df)} rows)")
             return df
         
@@ -25,82 +65,194 @@ def extract_file(file_path: str):
             logger.info(f"Extracted JSON: {file_path} ({len(df)} rows)")
             return df
         
-        elif ext in ['.xlsx', '.xls']:
+        else:
             df = pd.read_excel(file_path)
             logger.info(f"Extracted Excel: {file_path} ({len(df)} rows)")
             return df
-        
-        else:
-            logger.warning(f"Unsupported file type: {file_path}")
-            return None
             
     except Exception as e:
         logger.error(f"Failed to extract {file_path}: {str(e)}")
         return None
 
 
+# Rough multiple of a chunk's in-memory size held at once while it moves through
+# clean → enrich → FK mapping → load (copies, derived columns, COPY buffer)
+STREAM_MEMORY_FACTOR = 4
+
+
+def estimate_chunk_rows(file_path: str, memory_limit_mb: float, sample_rows: int = 1000) -> int:
+    """Rows per chunk that keep one chunk's working set under the memory ceiling."""
+    sample = pd.read_csv(file_path, nrows=sample_rows)
+    if sample.empty:
+        return sample_rows
+    bytes_per_row = sample.memory_usage(index=False, deep=True).sum() / len(sample)
+    chunk_rows = int(memory_limit_mb * 1024 * 1024 / (bytes_per_row * STREAM_MEMORY_FACTOR))
+    return max(chunk_rows, sample_rows)
+
+
+def iter_file_chunks(file_path: str, chunk_rows: int = None, memory_limit_mb: float = 256, skip_rows: int = 0):
+    """Yield a staged file as DataFrames of at most chunk_rows rows (CSV is never fully loaded).
+
+    skip_rows data rows are passed over first (resuming a partially loaded file).
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+
+    if ext != '.csv':
+        # JSON/Excel parsers need the whole document - load once, then slice
+        df = extract_file(file_path)
+        if df is None:
+            return
+        df[SOURCE_FILE_COLUMN] = os.path.basename(file_path)
+        apply_schema(df, source_of(os.path.basename(file_path)))
+        step = chunk_rows or len(df) or 1
+        for start in range(skip_rows, len(df), step):
+            yield df.iloc[start:start + step]
+        return
+
+    chunk_rows = chunk_rows or estimate_chunk_rows(file_path, memory_limit_mb)
+    logger.info(f"Streaming {file_path} in chunks of {chunk_rows} rows")
+    try:
+        dtypes = csv_dtypes(source_of(os.path.basename(file_path)))
+        # Row 0 is the header; skipped rows are tokenised but never converted
+        skip = (lambda row: 0 < row <= skip_rows) if skip_rows else None
+        for i, chunk in enumerate(pd.read_csv(file_path, chunksize=chunk_rows, dtype=dtypes, skiprows=skip)):
+            logger.info(f"Extracted chunk {i} of {file_path} ({len(chunk)} rows)")
+            chunk[SOURCE_FILE_COLUMN] = os.path.basename(file_path)
+            yield apply_schema(chunk, source_of(os.path.basename(file_path)))
+    except Exception as e:
+        logger.error(f"Failed to stream {file_path}: {str(e)}")
+        raise
+
+
+def staged_files(staging_dir: str, source: str) -> list:
+    """Staged files whose name contains the source name (e.g. 'sales'), in name order."""
+    return sorted(
+        os.path.join(staging_dir, f) for f in os.listdir(staging_dir)
+        if source_of(f) == source and os.path.isfile(os.path.join(staging_dir, f))
+    )
+
+
 def extract_streaming_updates(streaming_dir: str = "staging/streaming_updates"):
-    """Load all recent real-time product updates from Kafka consumer files."""
+    """Latest real-time update per product from Kafka consumer files.
+
+    Only files that landed since the last call are parsed; they are folded into a
+    compacted log (see etl.streaming), so repeated calls are cheap and idempotent.
+    """
     if not os.path.isdir(streaming_dir):
         logger.info(f"Streaming directory not found: {streaming_dir} - skipping")
         return pd.DataFrame()
 
-    updates = []
-    json_files = glob.glob(os.path.join(streaming_dir, "*.json"))
-    
-    if not json_files:
+    consume_new_updates(streaming_dir)
+    df_updates = read_latest_updates(streaming_dir)
+
+    if df_updates.empty:
         logger.info("No streaming update files found")
         return pd.DataFrame()
 
-    for file_path in json_files:
+    logger.info(f"Loaded {len(df_updates)} real-time product updates from streaming")
+    return df_updates
+
+
+def apply_streaming_updates(products: pd.DataFrame, streaming_df: pd.DataFrame) -> pd.DataFrame:
+    """Overlay the latest streamed price on the batch products (raw 'name' or renamed 'product_name')."""
+    key = 'product_name' if 'product_name' in products.columns else 'name'
+    prices = streaming_df.set_index('product_name')['new_price']
+    products = products.copy()
+    # Use streamed price if available, else keep original
+    products['price'] = products[key].map(prices).combine_first(products['price'])
+    return products
+
+
+def source_of(filename: str):
+    """Batch source a staged file belongs to, from its name (None if unrecognised)."""
+    name = filename.lower()
+    return next((source for source in SOURCES if source in name), None)
+
+
+def _extract_timed(file_path: str):
+    """Process-pool worker: parse one file, report how long it took and its cache counters."""
+    before = dict(extract_cache.CACHE_STATS)
+    start = time.perf_counter()
+    df = extract_file(file_path)
+    elapsed = time.perf_counter() - start
+    delta = {k: v - before.get(k, 0) for k, v in extract_cache.CACHE_STATS.items()}
+    return file_path, df, elapsed, delta
+
+
+def extract_files(file_paths: list, workers: int = None) -> list:
+    """Parse files in parallel; returns (path, DataFrame or None, seconds) in input order."""
+    workers = min(workers or EXTRACT_WORKERS, len(file_paths))
+    if workers > 1:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    updates.append(data)
-                else:
-                    logger.warning(f"Invalid JSON structure in {file_path}")
-        except Exception as e:
-            logger.error(f"Error reading streaming file {file_path}: {e}")
-
-    if updates:
-        df_updates = pd.DataFrame(updates)
-        logger.info(f"Loaded {len(df_updates)} real-time product updates from streaming")
-        return df_updates
-    
-    return pd.DataFrame()
-
-
-def extract_all(staging_dir: str = "staging", apply_streaming: bool = True) -> dict:
-    """Extract all relevant files from staging directory + apply real-time streaming updates."""
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_extract_timed, file_paths))
+            # Counters were incremented in the workers - fold them into this process
+            for _, _, _, delta in results:
+                extract_cache.record(delta)
+            return [(path, df, elapsed) for path, df, elapsed, _ in results]
+        except (OSError, AssertionError) as e:
+            # e.g. inside a daemonic worker that may not fork children
+            logger.warning(f"Process pool unavailable ({e}) - extracting sequentially")
+
+    return [(path, df, elapsed) for path, df, elapsed, _ in map(_extract_timed, file_paths)]
+
+
+def extract_all(staging_dir: str = "staging", apply_streaming: bool = True, include_sales: bool = True,
+                workers: int = None, manifest=None) -> dict:
+    """Extract all relevant files from staging directory + apply real-time streaming updates.
+
+    Every file matching a source is read (in parallel, in name order) and frames of
+    the same source are concatenated with a source_file column.
+    include_sales=False leaves sales files for the chunked streaming mode to read.
+    With a file_manifest.FileManifest, files already loaded are dropped before
+    any parsing, and each file's rows and parse time are recorded on it.
+    """
     if not os.path.isdir(staging_dir):
         raise FileNotFoundError(f"Staging directory not found: {staging_dir}")
 
-    data = {
-        'sales': None,
-        'products': None,
-        'customers': None
-    }
-
-    # Extract batch files
-    for filename in os.listdir(staging_dir):
+    file_paths = []
+    for filename in sorted(os.listdir(staging_dir)):
         full_path = os.path.join(staging_dir, filename)
-        if not os.path.isfile(full_path):
+        source = source_of(filename)
+        if not os.path.isfile(full_path) or source is None:
             continue
+        file_paths.append(full_path)
+    if manifest is not None:
+        # Sales are checked even when streamed, so products are kept for new sales to enrich against
+        file_paths = manifest.select(file_paths)
+    if not include_sales:
+        file_paths = [p for p in file_paths if source_of(os.path.basename(p)) != 'sales']
 
-        df = extract_file(full_path)
+    frames = {source: [] for source in SOURCES}
+    started = time.perf_counter()
+    for path, df, elapsed in extract_files(file_paths, workers):
+        logger.info(f"Extract timing: {os.path.basename(path)} in {elapsed:.2f}s")
+        if manifest is not None:
+            manifest.record_extract(path, None if df is None else len(df), elapsed)
         if df is None:
             continue
+        df[SOURCE_FILE_COLUMN] = os.path.basename(path)
+        frames[source_of(os.path.basename(path))].append(df)
+    if file_paths:
+        stats = extract_cache.CACHE_STATS
+        logger.info(
+            f"Extracted {len(file_paths)} files in {time.perf_counter() - started:.2f}s "
+            f"(cache: {stats['hits']} hits, {stats['misses']} misses)"
+        )
 
-        # Assign based on filename pattern
-        if 'sales' in filename.lower():
-            data['sales'] = df
-        elif 'products' in filename.lower():
-            data['products'] = df
-        elif 'customers' in filename.lower():
-            data['customers'] = df
+    data = {
+        source: pd.concat(dfs, ignore_index=True) if len(dfs) > 1 else (dfs[0] if dfs else None)
+        for source, dfs in frames.items()
+    }
+    for source, dfs in frames.items():
+        if len(dfs) > 1:
+            logger.info(f"Concatenated {len(dfs)} {source} files ({len(data[source])} rows)")
+        # Concatenating differing categoricals falls back to object - re-type the combined frame
+        apply_schema(data[source], source, report=True)
 
     # Basic validation
+    if not include_sales:
+        data.pop('sales')
     missing = [k for k, v in data.items() if v is None]
     if missing:
         logger.warning(f"Missing batch data sources: {missing}")
@@ -111,19 +263,7 @@ def extract_all(staging_dir: str = "staging", apply_streaming: bool = True) -> d
         if not streaming_df.empty:
             if 'products' in data and data['products'] is not None and not data['products'].empty:
                 logger.info("Merging real-time streaming updates into products dimension")
-                products = data['products']
-
-                # Merge on product_name - update price if streamed value exists
-                merged = products.merge(
-                    streaming_df[['product_name', 'new_price']],
-                    on='product_name',
-                    how='left'
-                )
-                # Use streamed price if available, else keep original
-                merged['price'] = merged['new_price'].combine_first(merged['price'])
-                merged = merged.drop(columns=['new_price'], errors='ignore')
-
-                data['products'] = merged
+                data['products'] = apply_streaming_updates(data['products'], streaming_df)
                 logger.info(f"Applied {len(streaming_df)} streaming updates to products")
             else:
                 logger.warning("No batch products found - cannot apply streaming updates")
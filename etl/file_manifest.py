@@ -0,0 +1,306 @@
+# etl/file_manifest.py
+"""Content-hash manifest of the staged files a run loads (see migrations/0008).
+
+A staged file is identified by the blake2b of its bytes plus its size, so a
+file that lands again under any name, or a run retried after ingest.sh has
+archived staging, is recognised before anything is parsed:
+
+    LOADING   a run is loading it (rows_read: source rows committed so far)
+    LOADED    committed by a successful run - skipped from then on
+    FAILED    the last run on it failed - read again, resuming at rows_read
+
+extract_all looks the run's files up in one query and drops the LOADED ones;
+products files are kept while the run has new sales, which are enriched from
+them. rows_read is only ever a resume offset: the streaming loader records it
+after every committed chunk, so a retried run skips the chunks already in
+fact_sales; a batch load, which commits a file whole or not at all, sets it
+to the file's rows or to 0. Rows parsed by extract (rows_parsed) and loaded,
+and extract / load seconds are kept per file for audit (see migrations/0011).
+
+    python -m etl.file_manifest list [--limit 50]
+    python -m etl.file_manifest forget staging/sales_2026-03-01.csv [...]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from etl.cache import file_digest
+from etl.db import connection, read_frame
+from etl.extract import source_of, SOURCE_FILE_COLUMN
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Off reads and loads every staged file, as before the manifest existed
+ENABLED = os.getenv("ECO_FILE_MANIFEST", "1") == "1"
+
+LOADED = 'LOADED'
+
+# Dimension sources later sources are enriched from (read again while new sales need them)
+REFERENCE_SOURCES = ('products',)
+
+START_SQL = """
+INSERT INTO etl_file_manifest AS m (content_hash, size_bytes, file_name, source, status, attempts, started_at)
+VALUES %s
+ON CONFLICT (content_hash, size_bytes) DO UPDATE SET
+    file_name = EXCLUDED.file_name, status = 'LOADING', attempts = m.attempts + 1,
+    started_at = EXCLUDED.started_at, finished_at = NULL, error_message = NULL
+"""
+
+FINISH_SQL = """
+UPDATE etl_file_manifest m SET
+    status = v.status, rows_read = v.rows_read, rows_parsed = v.rows_parsed, rows_loaded = v.rows_loaded,
+    extract_seconds = v.extract_seconds, load_seconds = v.load_seconds,
+    load_id = v.load_id, error_message = v.error_message, finished_at = now()
+FROM (VALUES %s) AS v (content_hash, size_bytes, status, rows_read, rows_parsed, rows_loaded,
+                      extract_seconds, load_seconds, load_id, error_message)
+WHERE m.content_hash = v.content_hash AND m.size_bytes = v.size_bytes
+"""
+
+
+def fingerprint(file_path: str) -> tuple:
+    """(content hash, size in bytes) identifying a file in the manifest."""
+    return file_digest(file_path), os.path.getsize(file_path)
+
+
+class FileManifest:
+    """The manifest entries of one run's staged files, keyed by path.
+
+    Each entry holds the file's key and what the manifest knew of it when the
+    run began (status, rows_read, rows_loaded), plus this run's counters.
+    """
+
+    def __init__(self):
+        self.files = {}
+
+    def _check(self, paths: list):
+        """Fingerprint unseen paths and fetch their manifest rows in one query."""
+        paths = [p for p in paths if p not in self.files]
+        if not paths:
+            return
+        started = time.perf_counter()
+        for path in paths:
+            content_hash, size_bytes = fingerprint(path)
+            self.files[path] = {
+                'file_name': os.path.basename(path), 'source': source_of(os.path.basename(path)),
+                'content_hash': content_hash, 'size_bytes': size_bytes,
+                'status': None, 'rows_read': 0, 'rows_parsed': None, 'rows_loaded': 0, 'duplicate_of': None,
+                'extract_seconds': None, 'load_seconds': None, 'selected': False, 'started': False,
+                'streamed': False, 'error': None,
+            }
+        keys = sorted({(e['content_hash'], e['size_bytes']) for e in self.files.values()})
+        known = read_frame(
+            """
+            SELECT content_hash, size_bytes, status, rows_read, rows_loaded, load_id, finished_at
+            FROM etl_file_manifest
+            WHERE (content_hash, size_bytes) IN (SELECT * FROM unnest(%s::char(40)[], %s::bigint[]))
+            """,
+            ([k[0] for k in keys], [k[1] for k in keys])
+        )
+        rows = {(r.content_hash, r.size_bytes): r for r in known.itertuples(index=False)}
+
+        first_path = {}
+        for path, entry in self.files.items():
+            key = (entry['content_hash'], entry['size_bytes'])
+            # The same bytes staged twice under different names are read once
+            first = first_path.setdefault(key, path)
+            entry['duplicate_of'] = first if first != path else None
+            row = rows.get(key)
+            if row is not None:
+                entry.update(status=row.status, finished_at=row.finished_at,
+                             load_id=None if pd.isna(row.load_id) else int(row.load_id),
+                             rows_read=0 if row.status == LOADED else int(row.rows_read),
+                             rows_loaded=0 if row.status == LOADED else int(row.rows_loaded))
+        logger.info(f"Checked {len(paths)} staged files against the file manifest in "
+                    f"{time.perf_counter() - started:.3f}s ({len(rows)} known)")
+
+    def select(self, paths: list) -> list:
+        """The paths (in order) this run should read; already loaded files are logged and dropped."""
+        self._check(paths)
+        entries = [(path, self.files[path]) for path in paths]
+        new_sales = any(e['source'] == 'sales' and e['status'] != LOADED and not e['duplicate_of']
+                        for _, e in entries)
+        selected = []
+        for path, entry in entries:
+            if entry['duplicate_of']:
+                logger.info(f"Skipping {entry['file_name']}: same content as "
+                            f"{os.path.basename(entry['duplicate_of'])}")
+            elif entry['status'] != LOADED:
+                selected.append(path)
+            elif new_sales and entry['source'] in REFERENCE_SOURCES:
+                # Re-read for enrichment; its unchanged rows are no-ops for the SCD load
+                selected.append(path)
+            else:
+                logger.info(f"Skipping {entry['file_name']}: already loaded "
+                            f"(load {entry['load_id']}, {entry['finished_at']})")
+        for path in selected:
+            self.files[path]['selected'] = True
+        return selected
+
+    def resume_offset(self, path: str) -> int:
+        """Source rows of path committed by earlier, unfinished runs."""
+        entry = self.files.get(path)
+        offset = entry['rows_read'] if entry else 0
+        if offset:
+            logger.info(f"Resuming {entry['file_name']} after row {offset} (status {entry['status']})")
+        return offset
+
+    def record_extract(self, path: str, rows, seconds: float):
+        """Rows parsed from path (None: the file could not be parsed) and how long that took."""
+        entry = self.files.get(path)
+        if entry is None:
+            return
+        entry['extract_seconds'] = seconds
+        if rows is None:
+            entry['error'] = 'File could not be parsed'
+        else:
+            entry['rows_parsed'] = rows
+
+    def record_rows(self, data: dict):
+        """Rows each file contributes to the transformed frames (by their source_file column)."""
+        by_name = {e['file_name']: e for e in self.files.values() if not e['duplicate_of']}
+        for df in data.values():
+            if df is None or SOURCE_FILE_COLUMN not in df.columns:
+                continue
+            for name, rows in df[SOURCE_FILE_COLUMN].value_counts().items():
+                if name in by_name:
+                    by_name[name]['rows_loaded'] = int(rows)
+
+    def start(self, conn):
+        """Mark the selected files the run is about to load LOADING (attempts + 1)."""
+        entries = [e for e in self.files.values() if e['selected'] and e['error'] is None]
+        if not entries:
+            return
+        cursor = conn.cursor()
+        try:
+            execute_values(
+                cursor, START_SQL,
+                [(e['content_hash'], e['size_bytes'], e['file_name'], e['source']) for e in entries],
+                template="(%s, %s, %s, %s, 'LOADING', 1, now())"
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+        for entry in entries:
+            entry['started'] = True
+
+    def progress(self, path: str, rows_read: int, rows_loaded: int, seconds: float, conn):
+        """After a committed chunk: path's source rows read so far, plus the chunk's loaded rows and time."""
+        entry = self.files.get(path)
+        if entry is None or not entry['started']:
+            return
+        entry['rows_read'] = rows_read
+        entry['streamed'] = True
+        entry['rows_loaded'] += rows_loaded
+        entry['load_seconds'] = (entry['load_seconds'] or 0) + seconds
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE etl_file_manifest SET rows_read = %s, rows_loaded = %s, load_seconds = %s "
+                "WHERE content_hash = %s AND size_bytes = %s",
+                (rows_read, entry['rows_loaded'], entry['load_seconds'], entry['content_hash'], entry['size_bytes'])
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _committed_rows(entry: dict, failed: bool) -> tuple:
+        """(resume offset, rows loaded) to store: streamed files keep their last committed chunk's."""
+        if entry['streamed']:
+            return entry['rows_read'], entry['rows_loaded']
+        # A batch load commits all of a file or none of it
+        if failed:
+            return 0, 0
+        return entry['rows_parsed'] or 0, entry['rows_loaded']
+
+    def finish(self, conn, load_id=None, load_seconds: float = None, error=None):
+        """Close the run's started files: LOADED under load_id, or FAILED with the error.
+
+        Files without their own load time (everything but streamed sales) get the run's.
+        """
+        entries = [e for e in self.files.values() if e['started']]
+        if not entries:
+            return
+        failed = error is not None
+        values = []
+        for e in entries:
+            rows_read, rows_loaded = self._committed_rows(e, failed)
+            values.append((
+                e['content_hash'], e['size_bytes'], 'FAILED' if failed else LOADED,
+                rows_read, e['rows_parsed'], rows_loaded, e['extract_seconds'],
+                e['load_seconds'] if e['load_seconds'] is not None else load_seconds,
+                load_id, str(error)[:1000] if failed else None
+            ))
+        cursor = conn.cursor()
+        try:
+            execute_values(
+                cursor, FINISH_SQL, values,
+                template="(%s, %s::bigint, %s, %s::bigint, %s::bigint, %s::bigint, "
+                         "%s::float8, %s::float8, %s::integer, %s)"
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+        for entry in entries:
+            entry['started'] = False
+        logger.info(f"File manifest: {len(entries)} files {'FAILED' if failed else LOADED}")
+
+
+def forget(paths: list) -> int:
+    """Drop the manifest rows of these files' contents, so the next run loads them again."""
+    keys = [fingerprint(path) for path in paths]
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM etl_file_manifest "
+            "WHERE (content_hash, size_bytes) IN (SELECT * FROM unnest(%s::char(40)[], %s::bigint[]))",
+            ([k[0] for k in keys], [k[1] for k in keys])
+        )
+        removed = cursor.rowcount
+        cursor.close()
+    return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or reset the staged file manifest")
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_cmd = sub.add_parser("list", help="Most recently started files")
+    list_cmd.add_argument("--limit", type=int, default=50)
+    forget_cmd = sub.add_parser("forget", help="Load these files again on the next run")
+    forget_cmd.add_argument("files", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        df = read_frame(
+            """
+            SELECT file_name, source, status, attempts, rows_parsed, rows_read, rows_loaded,
+                   round(extract_seconds::numeric, 2) AS extract_s, round(load_seconds::numeric, 2) AS load_s,
+                   load_id, finished_at, left(content_hash, 12) AS hash
+            FROM etl_file_manifest
+            ORDER BY coalesce(started_at, first_seen_at) DESC
+            LIMIT %s
+            """,
+            (args.limit,)
+        )
+        if not df.empty:
+            df['load_id'] = df['load_id'].astype('Int64')
+        print(df.to_string(index=False) if not df.empty else "File manifest is empty")
+        return 0
+
+    removed = forget(args.files)
+    print(f"Forgot {removed} of {len(args.files)} files")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
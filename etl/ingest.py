@@ -0,0 +1,300 @@
+# etl/ingest.py
+"""Ingestion service: raw_data/<day>/ → staging → ETL → archive, in one process.
+
+ingest.sh used to fork echo / tr / grep / head / basename for every file and
+open a psql connection for each ingestion_log write, which dominated drops of
+thousands of small files. Here day folders are scanned and files validated
+(extension, emptiness, CSV header) on a thread pool, accepted files are
+hard-linked into staging and then unlinked from raw_data (atomic on one
+filesystem; never over an existing file), ingestion_log is written through
+the shared connection pool, and run_etl is called directly. Scan / validate /
+move / etl / archive are timed.
+
+    python -m etl.ingest [--raw-dir raw_data] [--staging-dir staging] [--archive-dir archive]
+                         [--workers 8] [--streaming] [--no-etl]
+"""
+import os
+import sys
+import time
+import errno
+import shutil
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from etl.db import connection
+from etl.pipeline import run_etl
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RAW_DIR = os.getenv("ECO_RAW_DIR", os.path.join(project_root, "raw_data"))
+STAGING_DIR = os.getenv("ECO_STAGING_DIR", os.path.join(project_root, "staging"))
+ARCHIVE_DIR = os.getenv("ECO_ARCHIVE_DIR", os.path.join(project_root, "archive"))
+LOG_FILE = os.getenv("ECO_INGEST_LOG", os.path.join(project_root, "logs", "ingest.log"))
+
+ALLOWED_EXTENSIONS = ('.csv', '.json', '.xlsx')
+
+# Threads for scanning and validating (file system bound, not CPU bound)
+INGEST_WORKERS = int(os.getenv("ECO_INGEST_WORKERS", 8))
+
+PROCESS_NAME = 'Python_Ingest'
+
+# Bytes read from a CSV to check its header line
+HEADER_PEEK_BYTES = 64 * 1024
+
+
+def _scan_day(day_dir: str) -> list:
+    """(path, name, size) of the regular files directly in one day folder."""
+    with os.scandir(day_dir) as entries:
+        return [(e.path, e.name, e.stat().st_size) for e in entries if e.is_file()]
+
+
+def scan(raw_dir: str, workers: int = None) -> dict:
+    """Day folder -> its files, all folders listed concurrently (in name order)."""
+    if not os.path.isdir(raw_dir):
+        return {}
+    with os.scandir(raw_dir) as entries:
+        day_dirs = sorted(e.path for e in entries if e.is_dir())
+    if not day_dirs:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(workers or INGEST_WORKERS, len(day_dirs))) as pool:
+        return dict(zip(day_dirs, pool.map(_scan_day, day_dirs)))
+
+
+def validate_file(path: str, name: str, size: int) -> tuple:
+    """(ok, message) for one raw file; CSVs without a comma in their header only warn."""
+    ext = os.path.splitext(name)[1].lower()
+    if size == 0:
+        return False, f"Empty file skipped: {name}"
+    if ext not in ALLOWED_EXTENSIONS:
+        return False, f"Invalid extension skipped: {name}"
+    if ext == '.csv':
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(HEADER_PEEK_BYTES).split(b'\n', 1)[0]
+        except OSError as e:
+            return False, f"Unreadable file skipped: {name} ({e})"
+        if b',' not in header:
+            return True, f"CSV may be malformed (no comma): {name}"
+    return True, None
+
+
+# os.link errors meaning the file system has no hard links
+LINK_UNSUPPORTED = {errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+
+def _link(source: str, target: str):
+    """Create target as a hard link to source; raises FileExistsError if target exists."""
+    try:
+        os.link(source, target)
+    except OSError as e:
+        if e.errno not in LINK_UNSUPPORTED:
+            raise
+        # Without hard links an exclusive create still never replaces an existing file
+        with open(source, 'rb') as src, open(target, 'xb') as dst:
+            shutil.copyfileobj(src, dst)
+        shutil.copystat(source, target)
+
+
+def _move(source: str, target: str):
+    """Move source to target, raising FileExistsError instead of replacing an existing target.
+
+    os.rename silently overwrites on POSIX, so the target is claimed with a hard link
+    and the source removed afterwards. Across file systems the copy goes to a temp
+    name next to the target and is linked into place the same way.
+    """
+    try:
+        _link(source, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        partial = f"{target}.{os.getpid()}.part"
+        shutil.copy2(source, partial)
+        try:
+            _link(partial, target)
+        finally:
+            os.remove(partial)
+    os.remove(source)
+
+
+def move_to_staging(files: list, staging_dir: str) -> dict:
+    """Move validated files into staging; files whose name is already staged are left in place."""
+    counts = {'moved': 0, 'skipped': 0, 'invalid': 0}
+    for path, name in files:
+        try:
+            _move(path, os.path.join(staging_dir, name))
+            counts['moved'] += 1
+        except FileExistsError:
+            logger.warning(f"Already in staging, skipping: {name}")
+            counts['skipped'] += 1
+        except OSError as e:
+            logger.error(f"Failed to move {name}: {e}")
+            counts['invalid'] += 1
+    return counts
+
+
+def archive_staging(staging_dir: str, archive_dir: str) -> int:
+    """Move everything in staging under archive/<YYYYmmdd_HHMMSS>/; returns files archived."""
+    names = [e.name for e in os.scandir(staging_dir) if e.is_file()]
+    if not names:
+        logger.warning("Nothing in staging to archive (ETL may have cleared it)")
+        return 0
+    target_dir = os.path.join(archive_dir, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    os.makedirs(target_dir, exist_ok=True)
+    archived = 0
+    for name in names:
+        try:
+            _move(os.path.join(staging_dir, name), os.path.join(target_dir, name))
+            archived += 1
+        except FileExistsError:
+            logger.warning(f"Already archived in {os.path.basename(target_dir)}, left in staging: {name}")
+    logger.info(f"Archived to: {os.path.basename(target_dir)} ({archived} files)")
+    return archived
+
+
+def _log_start() -> int:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO ingestion_log (process_name, status) VALUES (%s, 'RUNNING') RETURNING run_id",
+            (PROCESS_NAME,)
+        )
+        run_id = cursor.fetchone()[0]
+        cursor.close()
+    return run_id
+
+
+def _log_end(run_id: int, status: str, counts: dict, message: str = None):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE ingestion_log
+            SET end_time = CURRENT_TIMESTAMP, status = %s, files_moved = %s, files_invalid = %s, error_message = %s
+            WHERE run_id = %s
+            """,
+            (status, counts['moved'], counts['invalid'], message, run_id)
+        )
+        cursor.close()
+
+
+def _run_pipeline(staging_dir: str, **etl_options) -> bool:
+    """run_etl in this interpreter; it reports failure through sys.exit(1)."""
+    try:
+        run_etl(staging_dir, **etl_options)
+    except SystemExit as e:
+        return e.code in (None, 0)
+    return True
+
+
+def ingest(raw_dir: str = None, staging_dir: str = None, archive_dir: str = None, workers: int = None,
+           run_pipeline: bool = True, **etl_options) -> dict:
+    """One ingestion run; returns its status, file counts and per-phase seconds."""
+    raw_dir, staging_dir, archive_dir = raw_dir or RAW_DIR, staging_dir or STAGING_DIR, archive_dir or ARCHIVE_DIR
+    os.makedirs(staging_dir, exist_ok=True)
+    os.makedirs(archive_dir, exist_ok=True)
+    logger.info("Starting ingestion run ========================================")
+    run_id = _log_start()
+    counts = {'moved': 0, 'skipped': 0, 'invalid': 0}
+    timings = {}
+    result = {'run_id': run_id, 'status': 'SUCCESS', 'counts': counts, 'timings': timings}
+    try:
+        started = time.perf_counter()
+        days = scan(raw_dir, workers)
+        timings['scan'] = time.perf_counter() - started
+        if not days:
+            logger.warning("No dated folders found. Exiting.")
+            _log_end(run_id, 'SUCCESS', counts, "No folders found")
+            return result
+        files = [f for day_files in days.values() for f in day_files]
+        logger.info(f"Found {len(days)} dated folders ({len(files)} files) in {timings['scan']:.3f}s")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers or INGEST_WORKERS) as pool:
+            checks = list(pool.map(lambda f: validate_file(*f), files))
+        accepted = []
+        for (path, name, _), (ok, message) in zip(files, checks):
+            if message:
+                (logger.warning if ok else logger.error)(message)
+            if ok:
+                accepted.append((path, name))
+            else:
+                counts['invalid'] += 1
+        timings['validate'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for key, value in move_to_staging(accepted, staging_dir).items():
+            counts[key] += value
+        for day_dir in days:
+            try:
+                os.rmdir(day_dir)
+            except OSError:
+                pass  # invalid or skipped files are left behind
+        timings['move'] = time.perf_counter() - started
+        logger.info(f"Summary: Moved={counts['moved']} Skipped={counts['skipped']} Invalid={counts['invalid']}")
+
+        if counts['moved'] == 0:
+            logger.info("No new files processed. Exiting.")
+            _log_end(run_id, 'SUCCESS', counts, "No new files")
+            return result
+
+        if run_pipeline:
+            logger.info("Running ETL pipeline on newly moved staging data...")
+            started = time.perf_counter()
+            if not _run_pipeline(staging_dir, **etl_options):
+                logger.error("ETL pipeline failed - see above logs for details")
+                result['status'] = 'FAILED'
+            timings['etl'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            archive_staging(staging_dir, archive_dir)
+            timings['archive'] = time.perf_counter() - started
+
+        _log_end(run_id, result['status'], counts, None if result['status'] == 'SUCCESS' else "ETL pipeline failed")
+        return result
+    except Exception as e:
+        logger.error(f"Ingestion failed: {e}")
+        _log_end(run_id, 'FAILED', counts, str(e))
+        raise
+    finally:
+        _log_timings(timings)
+
+
+def _log_timings(timings: dict):
+    logger.info("Ingest timings: " + ', '.join(f"{phase} {seconds:.3f}s" for phase, seconds in timings.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move raw drops into staging and run the ETL pipeline")
+    parser.add_argument("--raw-dir", default=None, help=f"Dated drop folders (default: {RAW_DIR})")
+    parser.add_argument("--staging-dir", default=None, help=f"Staging folder (default: {STAGING_DIR})")
+    parser.add_argument("--archive-dir", default=None, help=f"Archive root (default: {ARCHIVE_DIR})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"Threads for scanning and validating (default: {INGEST_WORKERS})")
+    parser.add_argument("--streaming", action="store_true", help="Load sales in bounded-memory chunks")
+    parser.add_argument("--no-etl", action="store_true", help="Only move files into staging")
+    args = parser.parse_args(argv)
+
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+    handler = logging.FileHandler(LOG_FILE)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logging.getLogger().addHandler(handler)
+
+    etl_options = {'streaming': True} if args.streaming else {}
+    result = ingest(args.raw_dir, args.staging_dir, args.archive_dir, args.workers,
+                    run_pipeline=not args.no_etl, **etl_options)
+    if result['status'] == 'SUCCESS':
+        logger.info(f"Ingestion + ETL complete. Processed {result['counts']['moved']} files.")
+        return 0
+    logger.error("Process finished with ETL errors.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
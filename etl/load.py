@@ -2,6 +2,8 @@
 import sys
 import os
 import re
+import io
+import time
 from fuzzywuzzy import fuzz, process
 
 # Dynamically add project root to sys.path
@@ -14,35 +16,161 @@ from psycopg2.extras import execute_values
 import logging
 from datetime import datetime
 
+from etl import metrics, partitions, rollups
+from etl.db import execute_prepared, get_conn
+from etl.transform import row_hash
+from etl.dim_cache import dimension_versions, get_date_range, get_lookup, lookup_ids, normalize_text, date_ids
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_conn():
-    """Connection to local PostgreSQL via PgBouncer."""
-    import os
-    try:
-        # UPDATED: Directing connection to PgBouncer port 6432 on localhost
-        conn = psycopg2.connect(
-            dbname=os.getenv("ECO_DB_NAME", "eco_warehouse"),
-            user=os.getenv("ECO_DB_USER", "postgres"),
-            password=os.getenv("ECO_DB_PASSWORD", ""),
-            host=os.getenv("ECO_DB_HOST", "127.0.0.1"),  # Localhost instead of Docker host
-            port=int(os.getenv("ECO_DB_PORT", 6432))     # PgBouncer port
-        )
-        conn.autocommit = False
-        return conn
-    except Exception as e:
-        logger.error(f"DB connection failed: {e}")
-        raise
-
 # ... [rest of the file remains exactly the same to ensure no logic breaks] ...
 
-def upsert_df(df: pd.DataFrame, table_name: str, pk_columns: list, conn):
-    """Bulk upsert using ON CONFLICT if constraint exists, else plain insert."""
+# Upsert engine: 'copy' streams the frame through a staging table, 'values' is the
+# original execute_values path (kept for debugging and very small frames).
+UPSERT_METHOD = os.getenv("ECO_UPSERT_METHOD", "copy")
+
+# Rows per round trip when streaming current dimension hashes
+SCD_FETCH_SIZE = int(os.getenv("ECO_SCD_FETCH_SIZE", 50000))
+
+# Fact FK resolution: 'client' maps keys in pandas via etl.dim_cache, 'server'
+# resolves them in Postgres through the stg_fact_sales staging table
+FK_MODE = os.getenv("ECO_FK_MODE", "client")
+
+FACT_COLUMNS = [
+    'sale_id', 'date_id', 'product_id', 'customer_id',
+    'location_id', 'quantity_sold', 'revenue',
+    'carbon_savings', 'sale_timestamp'
+]
+
+# fact_sales is partitioned by sale_timestamp, which its primary key has to include
+FACT_KEY = ['sale_id', 'sale_timestamp']
+
+# Columns whose change opens a new dim_product version (and feed its row_hash)
+PRODUCT_TRACKED_COLUMNS = ['category', 'price', 'carbon_footprint_rating']
+CUSTOMER_TRACKED_COLUMNS = ['customer_name', 'loyalty_level', 'join_date']
+
+# Transformed table -> tracked columns of the SCD Type 2 dimension it loads
+SCD_TRACKED_COLUMNS = {'products': PRODUCT_TRACKED_COLUMNS, 'customers': CUSTOMER_TRACKED_COLUMNS}
+
+# Dimension order used when reporting unmatched business keys
+UNMATCHED_KEYS = ('date', 'product', 'customer', 'location')
+
+# psycopg2 type OIDs for smallint / integer / bigint columns
+INTEGER_TYPE_OIDS = {20, 21, 23}
+
+
+def _frame_to_copy_buffer(df: pd.DataFrame, int_columns: set) -> io.StringIO:
+    """Serialize a DataFrame as CSV for COPY, keeping integer columns integral."""
+    out = df
+    float_ints = [c for c in df.columns if c in int_columns and pd.api.types.is_float_dtype(df[c])]
+    if float_ints:
+        # fillna(1)-style FK columns arrive as floats; COPY rejects "1.0" for integer columns
+        out = df.astype({c: 'Int64' for c in float_ints})
+
+    buf = io.StringIO()
+    out.to_csv(buf, index=False, header=False, na_rep='\\N')
+    buf.seek(0)
+    return buf
+
+
+def _stage_frame(df: pd.DataFrame, table_name: str, cursor, staging_table: str = None) -> str:
+    """COPY a DataFrame into a temp table shaped like the target columns; returns its name."""
+    cols = list(df.columns)
+    staging_table = staging_table or f"_stg_{table_name}"
+
+    cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+    cursor.execute(
+        f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS "
+        f"SELECT {', '.join(cols)} FROM {table_name} WITH NO DATA"
+    )
+    _copy_frame(df, staging_table, cursor)
+    return staging_table
+
+
+def _copy_frame(df: pd.DataFrame, table_name: str, cursor):
+    """COPY a DataFrame into an existing table, matching columns by name."""
+    cols = list(df.columns)
+    cursor.execute(f"SELECT {', '.join(cols)} FROM {table_name} LIMIT 0")
+    int_columns = {desc[0] for desc in cursor.description if desc[1] in INTEGER_TYPE_OIDS}
+
+    cursor.copy_expert(
+        f"COPY {table_name} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+        _frame_to_copy_buffer(df, int_columns)
+    )
+
+
+def _log_throughput(action: str, rows: int, table_name: str, started: float, method: str):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    logger.info(
+        f"{action} {rows} rows into {table_name} via {method} "
+        f"in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)"
+    )
+
+
+def upsert_df(df: pd.DataFrame, table_name: str, pk_columns: list, conn, method: str = None,
+              before_merge=None):
+    """Bulk upsert using ON CONFLICT if constraint exists, else plain insert.
+
+    before_merge(cursor, staging_table) runs in the same transaction, after the
+    rows are staged and before the target table changes.
+    """
     if df.empty:
         logger.info(f"No rows to upsert into {table_name}")
-        return
+        return 0
 
+    method = method or UPSERT_METHOD
+    if method == 'values':
+        return _upsert_values(df, table_name, pk_columns, conn, before_merge)
+    if method != 'copy':
+        raise ValueError(f"Unknown upsert method '{method}' (expected 'copy' or 'values')")
+
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    cols = list(df.columns)
+    col_list = ', '.join(cols)
+
+    conflict_target = ', '.join(pk_columns)
+    update_cols = [c for c in cols if c not in pk_columns]
+    if update_cols:
+        conflict_action = "DO UPDATE SET " + ', '.join(f"{c} = EXCLUDED.{c}" for c in update_cols)
+    else:
+        conflict_action = "DO NOTHING"
+
+    try:
+        staging_table = _stage_frame(df, table_name, cursor)
+        if before_merge is not None:
+            before_merge(cursor, staging_table)
+
+        # Savepoint so a missing constraint does not throw away the staged rows
+        cursor.execute("SAVEPOINT upsert_merge")
+        try:
+            cursor.execute(
+                f"""
+                INSERT INTO {table_name} ({col_list})
+                SELECT {col_list} FROM {staging_table}
+                ON CONFLICT ({conflict_target}) {conflict_action}
+                """
+            )
+            action = "Upserted"
+        except psycopg2.errors.InvalidColumnReference:
+            cursor.execute("ROLLBACK TO SAVEPOINT upsert_merge")
+            logger.warning(f"No unique constraint on {pk_columns} for {table_name} - falling back to INSERT")
+            cursor.execute(f"INSERT INTO {table_name} ({col_list}) SELECT {col_list} FROM {staging_table}")
+            action = "Inserted"
+
+        conn.commit()
+        _log_throughput(action, len(df), table_name, started, 'COPY')
+        return len(df)
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Upsert/Insert failed for {table_name}: {e}")
+        raise
+
+
+def _upsert_values(df: pd.DataFrame, table_name: str, pk_columns: list, conn, before_merge=None):
+    """Row-tuple upsert through execute_values (original loader)."""
+    started = time.perf_counter()
     cursor = conn.cursor()
     cols = list(df.columns)
     values = [tuple(row) for row in df.itertuples(index=False)]
@@ -57,24 +185,35 @@ def upsert_df(df: pd.DataFrame, table_name: str, pk_columns: list, conn):
         {update_set}
     """
 
+    def run_before_merge():
+        # The hook reads a staged copy of the rows, so they are COPYed as well
+        if before_merge is not None:
+            before_merge(cursor, _stage_frame(df, table_name, cursor))
+
     try:
+        run_before_merge()
         execute_values(cursor, query, values)
         conn.commit()
-        logger.info(f"Upserted {len(values)} rows into {table_name}")
+        _log_throughput("Upserted", len(values), table_name, started, 'execute_values')
     except psycopg2.errors.InvalidColumnReference:
         conn.rollback()
         logger.warning(f"No unique constraint on {pk_columns} for {table_name} - falling back to INSERT")
+        run_before_merge()
         insert_query = f"INSERT INTO {table_name} ({', '.join(cols)}) VALUES %s"
         execute_values(cursor, insert_query, values)
         conn.commit()
-        logger.info(f"Inserted {len(values)} rows into {table_name} (no upsert)")
+        _log_throughput("Inserted", len(values), table_name, started, 'execute_values')
     except Exception as e:
         conn.rollback()
         logger.error(f"Upsert/Insert failed for {table_name}: {e}")
         raise
+    return len(values)
 
 def handle_scd_type2(df_new: pd.DataFrame, table_name: str, business_key: str, tracked_cols: list, conn):
-    """Proper SCD Type 2: expire old versions, insert new/changed."""
+    """Proper SCD Type 2: expire old versions, insert new/changed - all in one transaction.
+
+    A row_hash column already on df_new (see pipeline.log_quality_metrics) is reused.
+    """
     if df_new.empty:
         logger.info(f"No new data for SCD on {table_name}")
         return
@@ -102,158 +241,370 @@ def handle_scd_type2(df_new: pd.DataFrame, table_name: str, business_key: str, t
         logger.info(f"No valid rows left after cleaning {business_key}. Skipping SCD for {table_name}.")
         return
 
-    df_new = df_new.drop_duplicates(subset=[business_key], keep='first')
+    # Batches are concatenated oldest file first, so the latest file wins
+    df_new = df_new.drop_duplicates(subset=[business_key], keep='last')
     df_new['norm_key'] = df_new[business_key].astype(str).str.strip().str.lower()
+    if 'row_hash' not in df_new.columns:
+        df_new['row_hash'] = row_hash(df_new, tracked_cols)
 
-    cursor.execute(f"SELECT * FROM {table_name} WHERE is_current = TRUE")
-    existing_rows = cursor.fetchall()
-    columns = [desc[0] for desc in cursor.description]
-    existing_df = pd.DataFrame(existing_rows, columns=columns)
+    # Only write columns the dimension actually has (drops lineage/helper columns)
+    cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
+    table_cols = {desc[0] for desc in cursor.description}
+    version_cols = [c for c in df_new.columns if c in table_cols]
 
-    existing_df['norm_key'] = existing_df[business_key].astype(str).str.strip().str.lower()
+    existing_df = _fetch_current_hashes(table_name, business_key, conn)
 
-    if existing_df.empty:
-        logger.info(f"First load for {table_name} - inserting all as current")
-        df_new['effective_start'] = datetime.now()
-        df_new['effective_end'] = 'infinity'
-        df_new['is_current'] = True
-        upsert_df(df_new.drop(columns=['norm_key'], errors='ignore'), table_name, [business_key], conn)
-        return
+    # One timestamp closes the old versions and opens the new ones, so history has no gaps
+    now = datetime.now()
 
-    merged = df_new.merge(existing_df, left_on='norm_key', right_on='norm_key', suffixes=('_new', '_old'), how='outer')
+    try:
+        if existing_df.empty:
+            logger.info(f"First load for {table_name} - inserting all as current")
+            _insert_current_versions(df_new[version_cols], table_name, now, cursor)
+            conn.commit()
+            logger.info(f"SCD Type 2 complete for {table_name}: {len(df_new)} new, 0 updates")
+            return
 
-    new_mask = merged['norm_key'].isin(df_new['norm_key']) & merged[business_key + '_old'].isna()
-    new_records = merged[new_mask].copy()
-    new_cols = [c.replace('_new', '') for c in merged.columns if '_new' in c]
-    new_records = new_records[[c + '_new' for c in new_cols]].rename(columns=lambda x: x.replace('_new', ''))
-    new_records['effective_start'] = datetime.now()
-    new_records['effective_end'] = 'infinity'
-    new_records['is_current'] = True
+        merged = df_new.merge(existing_df, on='norm_key', how='left')
 
-    timestamp_cols = ['effective_start', 'effective_end', 'join_date']
-    for col in timestamp_cols:
-        if col in new_records.columns:
-            new_records[col] = new_records[col].apply(lambda x: None if pd.isna(x) else x)
+        new_mask = merged['current_key'].isna()
+        # A missing stored hash (rows written before row_hash existed) counts as changed
+        changed_mask = ~new_mask & merged['current_hash'].ne(merged['row_hash'])
+        unchanged = int((~new_mask & ~changed_mask).sum())
+        if unchanged:
+            logger.info(f"Skipping {unchanged} unchanged records (row hash match)")
 
-    if not new_records.empty:
-        logger.info(f"Inserting {len(new_records)} new records")
-        upsert_df(new_records.drop(columns=['norm_key'], errors='ignore'), table_name, [business_key], conn)
+        new_records = merged.loc[new_mask, version_cols]
+        changed = merged.loc[changed_mask]
 
-    changed_mask = (
-        ~merged[business_key + '_old'].isna() &
-        merged[[f"{c}_new" for c in tracked_cols]].ne(merged[[f"{c}_old" for c in tracked_cols]]).any(axis=1)
-    )
-    changed = merged[changed_mask]
+        if not changed.empty:
+            logger.info(f"Expiring {len(changed)} changed records")
+            _expire_current_versions(changed['current_key'], table_name, business_key, now, cursor)
 
-    if not changed.empty:
-        logger.info(f"Updating {len(changed)} changed records")
-        for idx, row in changed.iterrows():
-            bk_raw = row[business_key + '_new'] if business_key + '_new' in row else row[business_key + '_old']
-            bk = str(bk_raw).strip() if pd.notna(bk_raw) else None
+        versions = pd.concat([new_records, changed[version_cols]], ignore_index=True)
+        if not versions.empty:
+            logger.info(f"Inserting {len(new_records)} new records and {len(changed)} new versions")
+            _insert_current_versions(versions, table_name, now, cursor)
 
-            if bk is None or bk.lower() == 'nan':
-                logger.warning(f"Skipping changed row with invalid business key: {bk_raw}")
-                continue
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"SCD Type 2 failed for {table_name} - dimension left unchanged: {e}")
+        raise
 
-            cursor.execute(
-                f"""
-                UPDATE {table_name}
-                SET is_current = FALSE, effective_end = NOW()
-                WHERE {business_key}::text = %s AND is_current = TRUE
-                """,
-                (bk,)
-            )
-            conn.commit()
+    logger.info(f"SCD Type 2 complete for {table_name}: {len(new_records)} new, {len(changed)} updates")
 
-            new_row = row[[c for c in row.index if '_new' in c]].rename(lambda x: x.replace('_new', ''))
-            
-            for col in timestamp_cols:
-                if col in new_row.index and pd.isna(new_row[col]):
-                    new_row[col] = None
-
-            new_row['effective_start'] = datetime.now() if pd.isna(new_row.get('effective_start')) else new_row['effective_start']
-            new_row['effective_end'] = 'infinity'
-            new_row['is_current'] = True
-
-            cols = ', '.join(new_row.index)
-            placeholders = ', '.join(['%s'] * len(new_row))
-            query = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"
-            try:
-                cursor.execute(query, tuple(new_row.values))
-                conn.commit()
-            except psycopg2.errors.UniqueViolation:
-                logger.warning(f"Duplicate insert attempt for '{bk}' - skipping")
-                conn.rollback()
-            except Exception as e:
-                conn.rollback()
-                logger.error(f"Insert failed for '{bk}': {e}")
-                raise
 
-    logger.info(f"SCD Type 2 complete for {table_name}: {len(new_records)} new, {len(changed)} updates")
+def _fetch_current_hashes(table_name: str, business_key: str, conn) -> pd.DataFrame:
+    """Stream (business_key, row_hash) of current versions through a server-side cursor."""
+    cursor = conn.cursor(name=f"scd_hashes_{table_name}")
+    cursor.itersize = SCD_FETCH_SIZE
+    cursor.execute(f"SELECT {business_key}, row_hash FROM {table_name} WHERE is_current = TRUE")
 
-def load_all(extracted_data: dict, conn=None):
-    """Full load orchestration: dimensions → fact → metadata."""
-    close_conn = False
-    if conn is None:
-        conn = get_conn()
-        close_conn = True
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(SCD_FETCH_SIZE)
+        if not rows:
+            break
+        chunks.append(pd.DataFrame(rows, columns=['current_key', 'current_hash']))
+    cursor.close()
 
-    try:
-        logger.info("Loading dimensions with SCD Type 2...")
-        if 'products' in extracted_data:
+    if not chunks:
+        return pd.DataFrame(columns=['norm_key', 'current_key', 'current_hash'])
+
+    existing_df = pd.concat(chunks, ignore_index=True)
+    existing_df['norm_key'] = existing_df['current_key'].astype(str).str.strip().str.lower()
+    return existing_df.drop_duplicates(subset=['norm_key'], keep='last')
+
+
+def _expire_current_versions(keys: pd.Series, table_name: str, business_key: str, expired_at, cursor):
+    """Close the current version of every staged business key in one UPDATE ... FROM."""
+    staging_table = _stage_frame(
+        keys.rename(business_key).to_frame(), table_name, cursor, staging_table=f"_stg_{table_name}_expire"
+    )
+    cursor.execute(
+        f"""
+        UPDATE {table_name} AS t
+        SET is_current = FALSE, effective_end = %s
+        FROM {staging_table} AS s
+        WHERE t.{business_key} = s.{business_key} AND t.is_current = TRUE
+        """,
+        (expired_at,)
+    )
+
+
+def _insert_current_versions(df: pd.DataFrame, table_name: str, effective_start, cursor):
+    """Bulk insert rows as the open (current) version of their business key."""
+    df = df.assign(effective_start=effective_start, effective_end='infinity', is_current=True)
+    cols = ', '.join(df.columns)
+    staging_table = _stage_frame(df, table_name, cursor)
+    cursor.execute(f"INSERT INTO {table_name} ({cols}) SELECT {cols} FROM {staging_table}")
+
+
+def load_dimensions(extracted_data: dict, conn):
+    """SCD Type 2 load of the product and customer dimensions."""
+    logger.info("Loading dimensions with SCD Type 2...")
+    if 'products' in extracted_data:
+        with metrics.span('scd.dim_product', rows_in=len(extracted_data['products'])):
             handle_scd_type2(
                 extracted_data['products'],
                 'dim_product',
                 'product_name',
-                ['category', 'price', 'carbon_footprint_rating'],
+                PRODUCT_TRACKED_COLUMNS,
                 conn
             )
 
-        if 'customers' in extracted_data:
+    if 'customers' in extracted_data:
+        with metrics.span('scd.dim_customer', rows_in=len(extracted_data['customers'])):
             handle_scd_type2(
                 extracted_data['customers'],
                 'dim_customer',
                 'email',
-                ['customer_name', 'loyalty_level', 'join_date'],
+                CUSTOMER_TRACKED_COLUMNS,
                 conn
             )
 
+
+def load_fact_sales(df_sales: pd.DataFrame, conn, fk_mode: str = None):
+    """Resolve FKs and upsert one batch (or chunk) of sales into fact_sales.
+
+    Returns (rows written, unmatched key counts per dimension).
+    """
+    fk_mode = fk_mode or FK_MODE
+    if fk_mode not in ('client', 'server'):
+        raise ValueError(f"Unknown FK mode '{fk_mode}' (expected 'client' or 'server')")
+
+    # Months the batch lands in (and the next few) get their partitions before the insert
+    if 'sale_timestamp' in df_sales.columns:
+        partitions.ensure_for_sales(df_sales['sale_timestamp'])
+
+    if fk_mode == 'server':
+        with metrics.span('fact.server_fk_upsert', rows_in=len(df_sales)) as span:
+            rows, unmatched = load_fact_sales_server(df_sales, conn)
+            span.rows_out = rows
+        return rows, unmatched
+
+    with metrics.span('fact.fk_mapping', rows_in=len(df_sales)) as span:
+        fact_df = map_fact_foreign_keys(df_sales, conn)
+        span.rows_out = len(fact_df)
+    unmatched = fact_df.attrs.get('unmatched_keys', {})
+    if fact_df.empty:
+        logger.warning("No valid fact rows after FK mapping")
+        return 0, unmatched
+
+    existing_cols = [c for c in FACT_COLUMNS if c in fact_df.columns]
+    fact_df = fact_df[existing_cols]
+
+    logger.info(f"Preparing to upsert {len(fact_df)} rows with columns: {existing_cols}")
+
+    if 'revenue' in fact_df.columns:
+        fact_df['revenue'] = fact_df['revenue'].fillna(0.00)
+    if 'carbon_savings' in fact_df.columns:
+        fact_df['carbon_savings'] = fact_df['carbon_savings'].fillna(0.00)
+
+    with metrics.span('fact.upsert', rows_in=len(fact_df)) as span:
+        span.rows_out = upsert_df(fact_df, 'fact_sales', FACT_KEY, conn, before_merge=_before_fact_merge)
+    return span.rows_out, unmatched
+
+
+def _before_fact_merge(cursor, source: str):
+    """In the fact upsert's transaction: merge rollup deltas (reading the old rows), then drop moved sales."""
+    if rollups.ENABLED:
+        rollups.apply_fact_delta(cursor, source)
+    partitions.remove_moved_sales(cursor, source)
+
+
+def _raw_sales_frame(df_sales: pd.DataFrame) -> pd.DataFrame:
+    """Shape transformed sales like stg_fact_sales (business keys, not surrogate ids)."""
+    raw = pd.DataFrame({
+        'sale_id': df_sales['sale_id'],
+        # Unparseable dates stage as NULL (dated by sale_timestamp, else rejected), as in client mode
+        'sale_date': pd.to_datetime(df_sales['date'], errors='coerce').dt.strftime('%Y-%m-%d'),
+        'sale_timestamp': df_sales['sale_timestamp'],
+        'product_name': df_sales['product_name'],
+        'customer_email': df_sales['customer_email'],
+        'city': df_sales['city'],
+        'quantity_sold': df_sales['quantity'] if 'quantity' in df_sales.columns else df_sales['quantity_sold'],
+        'revenue': df_sales['revenue'].fillna(0.00),
+        'carbon_savings': df_sales['carbon_savings'].fillna(0.00),
+    })
+    return raw[raw['sale_id'].notna()]
+
+
+# Resolve surrogate keys for the staged batch into a session temp table, counting misses.
+# Each distinct key in the batch is joined once against the lower(btrim())
+# expression indexes (the last version wins if normalization collides); date_id is
+# the computed YYYYMMDD key, NULL outside dim_date's first..last range.
+SERVER_FK_RESOLVED_TABLE = """
+CREATE TEMP TABLE IF NOT EXISTS _stg_fact_resolved (
+    sale_id integer, date_id integer, product_id integer, customer_id integer, location_id integer,
+    quantity_sold integer, revenue numeric(10,2), carbon_savings numeric(10,2),
+    sale_timestamp timestamp without time zone
+) ON COMMIT DELETE ROWS
+"""
+
+SERVER_FK_RESOLVE = """
+WITH product_keys AS (
+    SELECT DISTINCT ON (k.norm_key) k.norm_key, p.product_id
+    FROM (SELECT DISTINCT lower(btrim(product_name)) AS norm_key FROM stg_fact_sales) k
+    LEFT JOIN dim_product p ON lower(btrim(p.product_name)) = k.norm_key AND p.is_current
+    ORDER BY k.norm_key, p.product_id DESC
+),
+customer_keys AS (
+    SELECT DISTINCT ON (k.norm_key) k.norm_key, c.customer_id
+    FROM (SELECT DISTINCT lower(btrim(customer_email)) AS norm_key FROM stg_fact_sales) k
+    LEFT JOIN dim_customer c ON lower(btrim(c.email)) = k.norm_key AND c.is_current
+    ORDER BY k.norm_key, c.customer_id DESC
+),
+location_keys AS (
+    SELECT DISTINCT ON (k.norm_key) k.norm_key, l.location_id
+    FROM (SELECT DISTINCT lower(btrim(coalesce(city, 'Unknown'))) AS norm_key FROM stg_fact_sales) k
+    LEFT JOIN dim_location l ON lower(btrim(l.city)) = k.norm_key
+    ORDER BY k.norm_key, l.location_id DESC
+),
+calendar AS (
+    SELECT min(date_id) AS first_id, max(date_id) AS last_id FROM dim_date
+),
+resolved AS (
+    INSERT INTO _stg_fact_resolved (
+        sale_id, date_id, product_id, customer_id, location_id,
+        quantity_sold, revenue, carbon_savings, sale_timestamp
+    )
+    SELECT
+        s.sale_id, CASE WHEN dk.date_id BETWEEN c.first_id AND c.last_id THEN dk.date_id END,
+        pk.product_id, ck.customer_id, lk.location_id,
+        s.quantity_sold, s.revenue, s.carbon_savings, s.sale_timestamp
+    FROM stg_fact_sales s
+    CROSS JOIN calendar c
+    CROSS JOIN LATERAL (
+        SELECT to_char(coalesce(s.sale_date, s.sale_timestamp::date), 'YYYYMMDD')::integer AS date_id
+    ) dk
+    LEFT JOIN product_keys pk ON pk.norm_key = lower(btrim(s.product_name))
+    LEFT JOIN customer_keys ck ON ck.norm_key = lower(btrim(s.customer_email))
+    LEFT JOIN location_keys lk ON lk.norm_key = lower(btrim(coalesce(s.city, 'Unknown')))
+    RETURNING date_id, product_id, customer_id, location_id
+)
+SELECT
+    count(*) FILTER (WHERE date_id IS NULL),
+    count(*) FILTER (WHERE product_id IS NULL),
+    count(*) FILTER (WHERE customer_id IS NULL),
+    count(*) FILTER (WHERE location_id IS NULL)
+FROM resolved
+"""
+
+# Resolved rows without a date_id are rejected; other misses map to the id-1 "unknown" member
+SERVER_FK_ROWS = """(
+    SELECT sale_id, date_id, coalesce(product_id, 1) AS product_id,
+           coalesce(customer_id, 1) AS customer_id, coalesce(location_id, 1) AS location_id,
+           quantity_sold, revenue, carbon_savings, sale_timestamp
+    FROM _stg_fact_resolved
+    WHERE date_id IS NOT NULL
+)"""
+
+SERVER_FK_UPSERT = f"""
+INSERT INTO fact_sales (
+    sale_id, date_id, product_id, customer_id, location_id,
+    quantity_sold, revenue, carbon_savings, sale_timestamp
+)
+SELECT sale_id, date_id, product_id, customer_id, location_id,
+       quantity_sold, revenue, carbon_savings, sale_timestamp
+FROM {SERVER_FK_ROWS} resolved
+ON CONFLICT (sale_id, sale_timestamp) DO UPDATE SET
+    date_id = EXCLUDED.date_id, product_id = EXCLUDED.product_id,
+    customer_id = EXCLUDED.customer_id, location_id = EXCLUDED.location_id,
+    quantity_sold = EXCLUDED.quantity_sold, revenue = EXCLUDED.revenue,
+    carbon_savings = EXCLUDED.carbon_savings
+"""
+
+
+def load_fact_sales_server(df_sales: pd.DataFrame, conn):
+    """Resolve FKs inside Postgres: COPY raw sales into stg_fact_sales, resolve, then INSERT ... SELECT."""
+    raw = _raw_sales_frame(df_sales)
+    if raw.empty:
+        logger.info("No rows to upsert into fact_sales")
+        return 0, dict.fromkeys(UNMATCHED_KEYS, 0)
+
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        # TRUNCATE holds an exclusive lock until commit, so concurrent fact loads queue here
+        cursor.execute("TRUNCATE stg_fact_sales")
+        _copy_frame(raw, 'stg_fact_sales', cursor)
+        cursor.execute("ANALYZE stg_fact_sales")
+
+        # Planned once per session; streaming chunks re-execute the prepared statements
+        cursor.execute(SERVER_FK_RESOLVED_TABLE)
+        execute_prepared(cursor, 'eco_server_fk_resolve', SERVER_FK_RESOLVE)
+        unmatched = dict(zip(UNMATCHED_KEYS, cursor.fetchone()))
+
+        _before_fact_merge(cursor, f"{SERVER_FK_ROWS} resolved")
+        execute_prepared(cursor, 'eco_server_fk_upsert', SERVER_FK_UPSERT)
+        rows = cursor.rowcount
+
+        cursor.execute("TRUNCATE stg_fact_sales")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Server-side fact load failed: {e}")
+        raise
+    finally:
+        cursor.close()
+
+    _log_throughput("Upserted", rows, 'fact_sales', started, 'server-side FK join')
+    _log_unmatched(unmatched)
+    return rows, unmatched
+
+
+def _log_unmatched(unmatched: dict):
+    if unmatched.get('date'):
+        logger.warning(f"Rejected {unmatched['date']} sales dated outside dim_date")
+    summary = ', '.join(f"{name}={count}" for name, count in unmatched.items() if count and name != 'date')
+    if summary:
+        logger.warning(f"Unmatched dimension keys mapped to the unknown member: {summary}")
+
+
+def log_load_metadata(rows_loaded: int, conn, status: str = 'SUCCESS', error_message: str = None) -> int:
+    """Record a load in metadata_loads; returns its load_id."""
+    logger.info("Logging metadata...")
+    cursor = conn.cursor()
+    execute_prepared(
+        cursor,
+        'eco_log_load_metadata',
+        """
+        INSERT INTO metadata_loads (load_timestamp, rows_loaded, status, error_message)
+        VALUES (NOW(), %s, %s, %s)
+        RETURNING load_id
+        """,
+        (rows_loaded, status, error_message)
+    )
+    load_id = cursor.fetchone()[0]
+    conn.commit()
+    return load_id
+
+
+def load_all(extracted_data: dict, conn=None, fk_mode: str = None) -> dict:
+    """Full load orchestration: dimensions → fact → metadata.
+
+    Returns {'fact_rows': n, 'unmatched': {dimension: rows}, 'load_id': metadata_loads id}.
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_conn()
+        close_conn = True
+
+    summary = {'fact_rows': 0, 'unmatched': dict.fromkeys(UNMATCHED_KEYS, 0)}
+    try:
+        load_dimensions(extracted_data, conn)
+
         logger.info("Loading fact table...")
         if 'sales' in extracted_data:
-            fact_df = map_fact_foreign_keys(extracted_data['sales'], conn)
-            if not fact_df.empty:
-                fact_columns = [
-                    'sale_id', 'date_id', 'product_id', 'customer_id',
-                    'location_id', 'quantity_sold', 'revenue',
-                    'carbon_savings', 'sale_timestamp'
-                ]
-
-                existing_cols = [c for c in fact_columns if c in fact_df.columns]
-                fact_df = fact_df[existing_cols]
-
-                logger.info(f"Preparing to upsert {len(fact_df)} rows with columns: {existing_cols}")
-
-                if 'revenue' in fact_df.columns:
-                    fact_df['revenue'] = fact_df['revenue'].fillna(0.00)
-                if 'carbon_savings' in fact_df.columns:
-                    fact_df['carbon_savings'] = fact_df['carbon_savings'].fillna(0.00)
-
-                upsert_df(fact_df, 'fact_sales', ['sale_id'], conn)
-            else:
-                logger.warning("No valid fact rows after FK mapping")
-
-        logger.info("Logging metadata...")
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO metadata_loads (load_timestamp, rows_loaded, status)
-            VALUES (NOW(), %s, 'SUCCESS')
-            """,
-            (len(extracted_data.get('sales', pd.DataFrame())),)
-        )
-        conn.commit()
+            rows, unmatched = load_fact_sales(extracted_data['sales'], conn, fk_mode=fk_mode)
+            summary = {'fact_rows': rows, 'unmatched': unmatched}
+
+        summary['load_id'] = log_load_metadata(len(extracted_data.get('sales', pd.DataFrame())), conn)
 
         logger.info("Load complete - all data committed")
+        return summary
 
     except Exception as e:
         if conn:
@@ -266,38 +617,31 @@ def load_all(extracted_data: dict, conn=None):
 
 def map_fact_foreign_keys(df_sales: pd.DataFrame, conn) -> pd.DataFrame:
     """Map business strings to surrogate IDs from dimension tables."""
-    cursor = conn.cursor()
     df = df_sales.copy()
-
-    cursor.execute("SELECT date, date_id FROM dim_date")
-    date_map = dict(cursor.fetchall())
-    df['date_id'] = df['date'].map(date_map)
-    df['date_id'] = df['date_id'].fillna(1)
-
-    cursor.execute("SELECT product_name, product_id FROM dim_product WHERE is_current = TRUE")
-    product_rows = cursor.fetchall()
-    product_map = {str(name).strip().lower(): pid for name, pid in product_rows if name is not None}
-    df['product_name_clean'] = df['product_name'].astype(str).str.strip().str.lower()
-    df['product_id'] = df['product_name_clean'].map(product_map).fillna(1)
-
-    cursor.execute("SELECT email, customer_id FROM dim_customer WHERE is_current = TRUE")
-    customer_rows = cursor.fetchall()
-    customer_map = {str(row[0]).lower().strip(): row[1] for row in customer_rows}
-    df['customer_email_lower'] = df['customer_email'].astype(str).str.strip().str.lower()
-    df['customer_id'] = df['customer_email_lower'].map(customer_map).fillna(1)
-
-    cursor.execute("SELECT city, location_id FROM dim_location")
-    location_rows = cursor.fetchall()
-    location_map = {str(row[0]).lower().strip(): row[1] for row in location_rows}
-    df['city_lower'] = df['city'].fillna('Unknown').astype(str).str.strip().str.lower()
-    df['location_id'] = df['city_lower'].map(location_map).fillna(1)
-
-    cursor.close()
-
-    fk_cols = ['date_id', 'product_id', 'customer_id', 'location_id']
-    missing = df[fk_cols].isna().any(axis=1)
-
-    drop_cols = ['date', 'product_name', 'customer_email', 'city', 'customer_email_lower', 'city_lower', 'product_name_clean']
+    versions = dimension_versions(conn)
+
+    # Smart YYYYMMDD keys: computed, only checked against the calendar's range
+    df['date_id'] = date_ids(df['date'])
+    if 'sale_timestamp' in df.columns:
+        df['date_id'] = df['date_id'].fillna(date_ids(df['sale_timestamp']))
+    first, last = get_date_range(conn, versions)
+    in_range = df['date_id'].between(first, last) if first is not None else pd.Series(False, index=df.index)
+    df['date_id'] = df['date_id'].where(in_range)
+    df['product_id'] = lookup_ids(normalize_text(df['product_name']), get_lookup('dim_product', conn, versions))
+    df['customer_id'] = lookup_ids(normalize_text(df['customer_email']), get_lookup('dim_customer', conn, versions))
+    cities = normalize_text(df['city']).mask(df['city'].isna(), 'unknown')
+    df['location_id'] = lookup_ids(cities, get_lookup('dim_location', conn, versions))
+
+    # Sales dated outside dim_date are rejected; other unmatched keys fall back to the
+    # id-1 "unknown" member of their dimension
+    id_cols = ['date_id', 'product_id', 'customer_id', 'location_id']
+    unmatched = {name: int(df[col].isna().sum()) for name, col in zip(UNMATCHED_KEYS, id_cols)}
+    df[id_cols[1:]] = df[id_cols[1:]].fillna(1)
+    _log_unmatched(unmatched)
+
+    missing = df['date_id'].isna()
+
+    drop_cols = ['date', 'product_name', 'customer_email', 'city']
     df = df.drop(columns=[c for c in drop_cols if c in df.columns], errors='ignore')
 
     if 'quantity' in df.columns:
@@ -306,5 +650,6 @@ def map_fact_foreign_keys(df_sales: pd.DataFrame, conn) -> pd.DataFrame:
     if missing.any():
         df = df[~missing]
 
+    df.attrs['unmatched_keys'] = unmatched
     logger.info(f"Fact table ready with FKs mapped: {len(df)} rows")
     return df
\ No newline at end of file
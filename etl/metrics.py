@@ -0,0 +1,268 @@
+# etl/metrics.py
+"""Per-span run metrics: wall time, CPU time, peak RSS and rows in/out.
+
+run_etl opens a run, and every stage and sub-step inside it is a span
+(`with metrics.span('transform.clean_sales', rows_in=len(df)) as s: ...;
+s.rows_out = len(out)`). Spans nest; their path records where they ran
+(run/load/scd.dim_product). Repeated spans with the same path (streaming
+chunks) are folded into one row with a call count. At the end of the run
+every span is written in one batch to etl_run_metrics under the run's
+load_id (see migrations/0005), and appended to a JSON-lines file when
+ECO_METRICS_JSONL is set.
+
+Peak RSS comes from the kernel's high-water mark (VmHWM), reset at every
+span start through /proc/self/clear_refs, so each span reports its own
+peak; where that is unavailable the process-wide peak so far is recorded.
+
+Custom spans:
+    @metrics.instrument()                           # decorate your own function
+    metrics.instrument_function('etl.load.upsert_df')   # wrap an existing one
+    metrics.add_hook(callback)                      # called with every finished span
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import logging
+import functools
+import importlib
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from etl import profiling
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Optional JSON-lines sink, one object per span
+METRICS_JSONL = os.getenv("ECO_METRICS_JSONL")
+
+METRIC_COLUMNS = [
+    'load_id', 'run_id', 'span_path', 'depth', 'calls', 'started_at', 'wall_seconds',
+    'cpu_seconds', 'peak_rss_mb', 'rows_in', 'rows_out', 'status'
+]
+
+_run = None      # {'run_id', 'spans'} of the run being recorded, if any
+_open = []       # open spans, innermost last
+_hooks = []
+
+
+def _rss_kb(field: str):
+    try:
+        with open('/proc/self/status') as f:
+            match = re.search(rf'^{field}:\s+(\d+)', f.read(), re.MULTILINE)
+        return int(match.group(1)) if match else None
+    except OSError:
+        return None
+
+
+def _reset_rss_peak() -> bool:
+    """Reset the kernel's RSS high-water mark to the current RSS (Linux 4.0+)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _rss_peak_mb():
+    peak = _rss_kb('VmHWM')
+    if peak is None:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # kB on Linux
+        except (ImportError, OSError):
+            return None
+    return peak / 1024
+
+
+class Span:
+    """One timed block; set rows_in / rows_out on it while it is open."""
+
+    def __init__(self, name: str, rows_in=None, parent=None):
+        self.name = name
+        self.path = f"{parent.path}/{name}" if parent else name
+        self.depth = parent.depth + 1 if parent else 0
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.status = 'SUCCESS'
+        self.peak_rss_mb = None
+
+    def record(self) -> dict:
+        return {
+            'span_path': self.path, 'depth': self.depth, 'calls': 1,
+            'started_at': self.started_at, 'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds, 'peak_rss_mb': self.peak_rss_mb,
+            'rows_in': self.rows_in, 'rows_out': self.rows_out, 'status': self.status,
+        }
+
+
+@contextmanager
+def span(name: str, rows_in=None):
+    """Time the enclosed block as a span (logged through profiling.stage_memory)."""
+    parent = _open[-1] if _open else None
+    s = Span(name, rows_in, parent)
+
+    # The parent's peak so far is folded in before the high-water mark is reset for this span
+    if parent is not None:
+        parent.peak_rss_mb = max(filter(None, [parent.peak_rss_mb, _rss_peak_mb()]), default=None)
+    _reset_rss_peak()
+
+    _open.append(s)
+    s.started_at = datetime.now()
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        with profiling.stage_memory(s.path):
+            yield s
+    except BaseException:
+        s.status = 'FAILED'
+        raise
+    finally:
+        s.wall_seconds = time.perf_counter() - wall_started
+        s.cpu_seconds = time.process_time() - cpu_started
+        s.peak_rss_mb = max(filter(None, [s.peak_rss_mb, _rss_peak_mb()]), default=None)
+        _open.pop()
+        if parent is not None:
+            parent.peak_rss_mb = max(filter(None, [parent.peak_rss_mb, s.peak_rss_mb]), default=None)
+        _finish(s)
+
+
+def _finish(s: Span):
+    record = s.record()
+    if _run is not None:
+        _run['spans'].append(record)
+    for hook in list(_hooks):
+        try:
+            hook(record)
+        except Exception as e:
+            logger.warning(f"Metrics hook {hook!r} failed on {s.path}: {e}")
+
+
+def count_rows(value):
+    """Rows in a stage result: frames, row counts, (rows, ...) tuples and dicts of frames."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, tuple) and value and isinstance(value[0], int):
+        return value[0]
+    if isinstance(value, dict):
+        counts = [len(v) for v in value.values() if isinstance(v, pd.DataFrame)]
+        return sum(counts) if counts else None
+    return None
+
+
+def instrument(name: str = None):
+    """Decorator: run the function as a span, rows from its first argument and its result."""
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, rows_in=count_rows(args[0]) if args else None) as s:
+                result = func(*args, **kwargs)
+                s.rows_out = count_rows(result)
+                return result
+
+        wrapper.__wrapped_by_metrics__ = True
+        return wrapper
+    return decorate
+
+
+def instrument_function(dotted_name: str, name: str = None):
+    """Wrap an existing function (e.g. 'etl.load.upsert_df') in a span, wherever etl imported it."""
+    module_name, _, attr = dotted_name.rpartition('.')
+    module = importlib.import_module(module_name)
+    original = getattr(module, attr)
+    if getattr(original, '__wrapped_by_metrics__', False):
+        return original
+    wrapped = instrument(name or attr)(original)
+    # `from etl.x import f` copies the reference, so patch every etl module holding it
+    for loaded_name, loaded in list(sys.modules.items()):
+        if loaded is None or not (loaded_name == 'etl' or loaded_name.startswith('etl.')):
+            continue
+        for key, value in list(vars(loaded).items()):
+            if value is original:
+                setattr(loaded, key, wrapped)
+    return wrapped
+
+
+def add_hook(callback):
+    """Call callback(record) with every finished span (e.g. to forward it to a metrics backend)."""
+    _hooks.append(callback)
+
+
+def remove_hook(callback):
+    if callback in _hooks:
+        _hooks.remove(callback)
+
+
+def start_run(run_id: str = None) -> str:
+    """Start collecting spans for one pipeline run; returns its run_id."""
+    global _run
+    _run = {'run_id': run_id or str(uuid.uuid4()), 'spans': []}
+    return _run['run_id']
+
+
+def _fold(records: list) -> list:
+    """One row per span path: times and rows summed, peak RSS maximised, first start kept."""
+    folded = {}
+    for record in records:
+        row = folded.get(record['span_path'])
+        if row is None:
+            folded[record['span_path']] = dict(record)
+            continue
+        row['calls'] += 1
+        for key in ('wall_seconds', 'cpu_seconds', 'rows_in', 'rows_out'):
+            if record[key] is not None:
+                row[key] = (row[key] or 0) + record[key]
+        row['peak_rss_mb'] = max(filter(None, [row['peak_rss_mb'], record['peak_rss_mb']]), default=None)
+        if record['status'] != 'SUCCESS':
+            row['status'] = record['status']
+    # Outer spans first, then in the order they started
+    return sorted(folded.values(), key=lambda r: r['started_at'])
+
+
+def finish_run(load_id: int = None, conn=None, jsonl_path: str = None) -> list:
+    """End the run: write its spans to etl_run_metrics (when conn and load_id are given) and the JSONL sink."""
+    global _run
+    if _run is None:
+        return []
+    run, _run = _run, None
+    records = [{'load_id': load_id, 'run_id': run['run_id'], **r} for r in _fold(run['spans'])]
+    if not records:
+        return records
+
+    jsonl_path = jsonl_path or METRICS_JSONL
+    if jsonl_path:
+        try:
+            with open(jsonl_path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + '\n')
+        except OSError as e:
+            logger.warning(f"Could not append run metrics to {jsonl_path}: {e}")
+
+    if conn is not None and load_id is not None:
+        write_metrics(records, conn)
+    return records
+
+
+def write_metrics(records: list, conn):
+    """Insert span rows into etl_run_metrics in one batch."""
+    from psycopg2.extras import execute_values
+
+    cursor = conn.cursor()
+    execute_values(
+        cursor,
+        f"INSERT INTO etl_run_metrics ({', '.join(METRIC_COLUMNS)}) VALUES %s",
+        [tuple(record[c] for c in METRIC_COLUMNS) for record in records]
+    )
+    conn.commit()
+    logger.info(f"Recorded {len(records)} run metric spans for load {records[0]['load_id']}")
@@ -0,0 +1,256 @@
+# etl/outliers.py
+"""Persisted per-product / per-category outlier baselines.
+
+detect_outliers used to fit a fresh Isolation Forest on every batch, so a
+small day learned from almost no data. Baselines are instead trained on the
+warehouse's sales history: robust median/MAD statistics of log quantity and
+log revenue per product, per category and overall. Batches are scored in
+one vectorized pass, each sale against the most specific baseline that has
+enough history (product → category → global).
+
+    python -m etl.outliers train [--days 90]
+    python -m etl.outliers show
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from etl.db import get_conn
+from etl.dim_cache import normalize_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.getenv("ECO_OUTLIER_MODEL_DIR", os.path.join(project_root, "models"))
+BASELINE_FILE = "outlier_baselines.parquet"
+
+# Robust z-score above which a sale is an outlier
+Z_THRESHOLD = float(os.getenv("ECO_OUTLIER_Z", 6))
+# History a product (or category) needs before it gets its own baseline
+MIN_GROUP_ROWS = int(os.getenv("ECO_OUTLIER_MIN_GROUP_ROWS", 30))
+# Days of fact_sales history used for training
+TRAIN_DAYS = int(os.getenv("ECO_OUTLIER_TRAIN_DAYS", 90))
+
+FEATURES = ['quantity', 'revenue']
+
+# MAD → sigma for normal data; when over half a group is identical the MAD is 0
+# and the mean absolute deviation (→ sigma via sqrt(pi/2)) is used instead
+MAD_TO_SIGMA = 1.4826
+MEAN_AD_TO_SIGMA = 1.2533
+# Minimum scale in log units (~5%), so near-constant groups do not flag every change
+SCALE_FLOOR = 0.05
+
+TRAINING_QUERY = """
+SELECT p.product_name, p.category, f.quantity_sold AS quantity, f.revenue
+FROM fact_sales f
+JOIN dim_product p ON p.product_id = f.product_id
+WHERE f.sale_timestamp >= NOW() - make_interval(days => %s)
+"""
+
+# Baselines already read in this process: (path, mtime) -> DataFrame
+_loaded = {}
+
+
+def _log_features(df: pd.DataFrame) -> pd.DataFrame:
+    values = df[FEATURES].apply(pd.to_numeric, errors='coerce').fillna(0).clip(lower=0)
+    return np.log1p(values.astype(float))
+
+
+def _group_stats(features: pd.DataFrame, keys: pd.Series) -> pd.DataFrame:
+    """rows / median / scale per feature for every key, all groups at once."""
+    grouped = features.groupby(keys, sort=False)
+    medians = grouped.median()
+    deviation = (features - medians.reindex(keys.to_numpy()).to_numpy()).abs()
+    dev_grouped = deviation.groupby(keys, sort=False)
+    mad = dev_grouped.median()
+    mean_ad = dev_grouped.mean()
+    scale = (MAD_TO_SIGMA * mad).where(mad > 0, MEAN_AD_TO_SIGMA * mean_ad).clip(lower=SCALE_FLOOR)
+
+    stats = pd.DataFrame({'rows': grouped.size()})
+    for feature in FEATURES:
+        stats[f'{feature}_median'] = medians[feature]
+        stats[f'{feature}_scale'] = scale[feature]
+    return stats
+
+
+def fit_baselines(df: pd.DataFrame) -> pd.DataFrame:
+    """Fit product, category and global baselines from sales with product_name, category, quantity, revenue."""
+    started = time.perf_counter()
+    df = df.dropna(subset=['product_name'])
+    features = _log_features(df)
+    products = normalize_text(df['product_name'])
+    categories = normalize_text(df['category'].fillna('unknown'))
+
+    product_stats = _group_stats(features, products)
+    # Each product's (most frequent) category, so new batches can fall back to it
+    product_stats['category'] = (
+        pd.DataFrame({'product': products, 'category': categories})
+        .groupby('product')['category'].agg(lambda c: c.mode().iat[0])
+    )
+    category_stats = _group_stats(features, categories)
+    global_stats = _group_stats(features, pd.Series('all', index=df.index))
+
+    baselines = pd.concat(
+        [product_stats.assign(level='product'),
+         category_stats.assign(level='category', category=category_stats.index),
+         global_stats.assign(level='global', category=None)]
+    ).rename_axis('key').reset_index()
+    baselines['fitted_at'] = pd.Timestamp.now().floor('s')
+
+    logger.info(
+        f"Fitted outlier baselines on {len(df)} sales in {time.perf_counter() - started:.2f}s "
+        f"({len(product_stats)} products, {len(category_stats)} categories)"
+    )
+    return baselines
+
+
+def fetch_training_sales(conn, days: int = None) -> pd.DataFrame:
+    """Recent fact_sales joined to their product version (name + category)."""
+    cursor = conn.cursor()
+    cursor.execute(TRAINING_QUERY, (days or TRAIN_DAYS,))
+    df = pd.DataFrame(cursor.fetchall(), columns=['product_name', 'category', 'quantity', 'revenue'])
+    cursor.close()
+    conn.commit()
+    return df
+
+
+def baseline_path(model_dir: str = None) -> str:
+    return os.path.join(model_dir or MODEL_DIR, BASELINE_FILE)
+
+
+def save_baselines(baselines: pd.DataFrame, model_dir: str = None) -> str:
+    """Persist baselines atomically; returns the path written."""
+    started = time.perf_counter()
+    path = baseline_path(model_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    baselines.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved outlier baselines to {path} in {time.perf_counter() - started:.2f}s")
+    return path
+
+
+def load_baselines(model_dir: str = None):
+    """Persisted baselines, or None when no model has been trained yet."""
+    path = baseline_path(model_dir)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if (path, mtime) not in _loaded:
+        started = time.perf_counter()
+        _loaded.clear()
+        _loaded[(path, mtime)] = pd.read_parquet(path)
+        logger.info(f"Loaded outlier baselines from {path} in {time.perf_counter() - started:.2f}s")
+    return _loaded[(path, mtime)]
+
+
+def _resolve(values: pd.Series, table: pd.DataFrame) -> np.ndarray:
+    """Positions of values in table['key'] (-1 where absent)."""
+    return pd.Index(table['key']).get_indexer(values.to_numpy())
+
+
+def robust_scores(df: pd.DataFrame, baselines: pd.DataFrame, df_products: pd.DataFrame = None) -> pd.Series:
+    """Largest robust z-score across features, each sale against its most specific usable baseline."""
+    features = _log_features(df)
+    # Baselines are resolved once per distinct product name, then broadcast through the codes
+    codes, uniques = pd.factorize(df['product_name'])
+    names = normalize_text(pd.Series(uniques))
+
+    by_level = {level: table.reset_index(drop=True) for level, table in baselines.groupby('level')}
+    products = by_level.get('product', baselines.iloc[:0])
+    categories = by_level.get('category', baselines.iloc[:0])
+    overall = by_level['global'].iloc[0]
+
+    name_product = _resolve(names, products)
+    known = name_product >= 0
+    name_category = pd.Series(None, index=names.index, dtype=object)
+    name_category[known] = products['category'].to_numpy(dtype=object)[name_product[known]]
+    if df_products is not None and {'product_name', 'category'} <= set(df_products.columns):
+        # Products not seen in training fall back to their catalog category
+        catalog = pd.Series(
+            normalize_text(df_products['category'].fillna('unknown')).to_numpy(),
+            index=normalize_text(df_products['product_name']).to_numpy()
+        )
+        catalog = catalog[~catalog.index.duplicated(keep='last')]
+        name_category = name_category.fillna(names.map(catalog))
+    name_category = _resolve(name_category.fillna(''), categories)
+
+    # Missing names (code -1) take the last slot: no product, no category
+    product_pos = np.append(name_product, -1)[codes]
+    category_pos = np.append(name_category, -1)[codes]
+
+    use_product = product_pos >= 0
+    use_product[use_product] = products['rows'].to_numpy()[product_pos[use_product]] >= MIN_GROUP_ROWS
+    use_category = (category_pos >= 0) & ~use_product
+    use_category[use_category] = categories['rows'].to_numpy()[category_pos[use_category]] >= MIN_GROUP_ROWS
+
+    z = np.zeros(len(df))
+    for feature in FEATURES:
+        median = np.full(len(df), overall[f'{feature}_median'])
+        scale = np.full(len(df), overall[f'{feature}_scale'])
+        for table, pos, use in ((categories, category_pos, use_category), (products, product_pos, use_product)):
+            median[use] = table[f'{feature}_median'].to_numpy()[pos[use]]
+            scale[use] = table[f'{feature}_scale'].to_numpy()[pos[use]]
+        z = np.maximum(z, np.abs(features[feature].to_numpy() - median) / scale)
+    return pd.Series(z, index=df.index)
+
+
+def flag_outliers(df: pd.DataFrame, baselines: pd.DataFrame, df_products: pd.DataFrame = None,
+                  threshold: float = None) -> pd.Series:
+    """Boolean outlier mask for a batch, with scoring throughput logged."""
+    started = time.perf_counter()
+    flags = robust_scores(df, baselines, df_products) > (threshold or Z_THRESHOLD)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    logger.info(f"Scored {len(df)} sales against outlier baselines in {elapsed:.3f}s ({len(df) / elapsed:,.0f} rows/s)")
+    return flags
+
+
+def train(conn=None, days: int = None, model_dir: str = None) -> pd.DataFrame:
+    """Refit baselines from warehouse history and persist them."""
+    close_conn = conn is None
+    conn = conn or get_conn()
+    try:
+        started = time.perf_counter()
+        sales = fetch_training_sales(conn, days)
+        logger.info(f"Fetched {len(sales)} training sales in {time.perf_counter() - started:.2f}s")
+    finally:
+        if close_conn:
+            conn.close()
+    if sales.empty:
+        logger.warning("No sales history to train outlier baselines on - keeping the current model")
+        return None
+    baselines = fit_baselines(sales)
+    save_baselines(baselines, model_dir)
+    return baselines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or inspect the persisted outlier baselines")
+    parser.add_argument("command", choices=["train", "show"])
+    parser.add_argument("--days", type=int, default=None,
+                        help=f"Days of sales history to train on (default: {TRAIN_DAYS})")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        return 0 if train(days=args.days) is not None else 1
+
+    baselines = load_baselines()
+    if baselines is None:
+        print(f"No outlier baselines at {baseline_path()}")
+        return 1
+    print(baselines.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+# etl/partitions.py
+"""Monthly range partitions of fact_sales (see migrations/0007).
+
+fact_sales is partitioned by RANGE (sale_timestamp): fact_sales_y2026m03
+holds [2026-03-01, 2026-04-01), and fact_sales_default catches rows no
+month covers. Before every fact load, ensure_for_sales() creates the months
+the batch touches plus ECO_PARTITION_MONTHS_AHEAD upcoming ones, so rows
+land in their own month rather than in the default partition (a backfill row
+from years ago creates its month only, not every month since). Rows already
+in the default partition for a month being created are moved into it. The
+DDL runs on its own pooled connection and commits there, leaving the load's
+transaction alone.
+
+Old months can be detached and archived: the partition becomes a plain
+table in the `archive` schema, optionally exported to a gzipped CSV and
+dropped. Rollups keep the archived months (a full `etl.rollups rebuild`
+would forget them).
+
+Only filters on sale_timestamp prune partitions; check_pruning() EXPLAINs a
+month-range query and reports which partitions the plan touches.
+
+    python -m etl.partitions ensure [--from 2024-01] [--to 2024-12]
+    python -m etl.partitions list
+    python -m etl.partitions archive --before 2024-01 [--export-dir DIR] [--drop]
+    python -m etl.partitions check-pruning [--from 2026-03] [--to 2026-03]
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import logging
+import argparse
+from datetime import date
+
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from etl.db import connection, get_conn
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARENT = 'fact_sales'
+DEFAULT_PARTITION = 'fact_sales_default'
+ARCHIVE_SCHEMA = os.getenv("ECO_PARTITION_ARCHIVE_SCHEMA", "archive")
+MONTHS_AHEAD = int(os.getenv("ECO_PARTITION_MONTHS_AHEAD", 2))
+# Partition DDL gives up rather than queue behind long-running transactions on fact_sales
+LOCK_TIMEOUT = os.getenv("ECO_PARTITION_LOCK_TIMEOUT", "30s")
+
+PARTITIONS_QUERY = """
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = %s::regclass
+ORDER BY c.relname
+"""
+
+# Month starts known to have a partition, per database (saves a catalog query per chunk)
+_known = {}
+
+
+def month_start(value) -> date:
+    return pd.Timestamp(value).to_period('M').start_time.date()
+
+
+def next_month(month: date) -> date:
+    return (pd.Timestamp(month) + pd.offsets.MonthBegin(1)).date()
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def list_partitions(conn) -> pd.DataFrame:
+    """name, lower/upper month bounds (None for the default) and estimated rows per partition."""
+    cursor = conn.cursor()
+    cursor.execute(PARTITIONS_QUERY, (PARENT,))
+    rows = []
+    for name, bound, estimate in cursor.fetchall():
+        lower = upper = None
+        if bound != 'DEFAULT':
+            # FOR VALUES FROM ('2026-03-01 00:00:00') TO ('2026-04-01 00:00:00')
+            values = bound.split("'")
+            lower, upper = pd.Timestamp(values[1]).date(), pd.Timestamp(values[3]).date()
+        rows.append({'partition': name, 'lower': lower, 'upper': upper, 'estimated_rows': max(estimate, 0)})
+    cursor.close()
+    return pd.DataFrame(rows, columns=['partition', 'lower', 'upper', 'estimated_rows'])
+
+
+def _months(first: date, last: date) -> list:
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def ensure_partitions(months) -> list:
+    """Create the monthly partitions for these months that do not exist yet; returns the names created.
+
+    Runs on a separate pooled connection, so the caller's transaction is neither committed nor rolled back.
+    """
+    months = sorted({month_start(m) for m in months})
+    with connection() as conn:
+        known = _known.setdefault(conn.dsn, set())
+        wanted = [m for m in months if m not in known]
+        if not wanted:
+            return []
+
+        covered = set(list_partitions(conn)['lower'].dropna())
+        known.update(covered)
+        created = []
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET LOCAL lock_timeout = %s", (LOCK_TIMEOUT,))
+            for month in wanted:
+                if month in covered:
+                    continue
+                _create_partition(cursor, month)
+                created.append(partition_name(month))
+            conn.commit()
+            known.update(wanted)
+        except Exception as e:
+            logger.error(f"Creating fact_sales partitions failed: {e}")
+            raise
+        finally:
+            cursor.close()
+    if created:
+        logger.info(f"Created fact_sales partitions: {', '.join(created)}")
+    return created
+
+
+def _create_partition(cursor, month: date):
+    name, lower, upper = partition_name(month), month, next_month(month)
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE sale_timestamp >= %s AND sale_timestamp < %s)",
+        (lower, upper)
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES FROM (%s) TO (%s)", (lower, upper))
+        return
+
+    # Attaching the month fails while the default partition holds its rows, so they move first
+    cursor.execute(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE sale_timestamp >= %s AND sale_timestamp < %s "
+        f"RETURNING *) INSERT INTO {name} SELECT * FROM moved",
+        (lower, upper)
+    )
+    moved = cursor.rowcount
+    cursor.execute(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", (lower, upper))
+    logger.info(f"Moved {moved} rows from {DEFAULT_PARTITION} into {name}")
+
+
+def ensure_for_sales(timestamps: pd.Series, months_ahead: int = None) -> list:
+    """Partitions for the months present in a batch's sale timestamps, plus the upcoming months."""
+    timestamps = pd.to_datetime(timestamps, errors='coerce').dropna()
+    month = month_start(pd.Timestamp.now())
+    months = [month]
+    for _ in range(MONTHS_AHEAD if months_ahead is None else months_ahead):
+        month = next_month(month)
+        months.append(month)
+    if not timestamps.empty:
+        months.extend(pd.DatetimeIndex(timestamps).to_period('M').unique().start_time.date)
+    return ensure_partitions(months)
+
+
+def remove_moved_sales(cursor, source: str) -> int:
+    """Delete fact rows whose sale_id is being reloaded under a different sale_timestamp.
+
+    The primary key is (sale_id, sale_timestamp), so without this a sale that
+    moved would be inserted again next to its old row. Runs in the caller's
+    transaction, before the upsert; source has sale_id and sale_timestamp.
+    """
+    cursor.execute(
+        f"DELETE FROM {PARENT} f USING (SELECT sale_id, sale_timestamp FROM {source}) incoming "
+        f"WHERE f.sale_id = incoming.sale_id AND f.sale_timestamp IS DISTINCT FROM incoming.sale_timestamp"
+    )
+    if cursor.rowcount:
+        logger.info(f"Removed {cursor.rowcount} fact rows whose sale_timestamp changed")
+    return cursor.rowcount
+
+
+def archive_partitions(conn, before, export_dir: str = None, drop: bool = False) -> list:
+    """Detach every month before `before`'s month, move it to the archive schema, optionally export and drop."""
+    cutoff = month_start(before)
+    partitions = list_partitions(conn)
+    old = partitions[partitions['upper'].map(lambda upper: upper is not None and upper <= cutoff)]
+    archived = []
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+        conn.commit()
+        for row in old.itertuples(index=False):
+            started = time.perf_counter()
+            cursor.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {row.partition}")
+            cursor.execute(f"ALTER TABLE {row.partition} SET SCHEMA {ARCHIVE_SCHEMA}")
+            table = f"{ARCHIVE_SCHEMA}.{row.partition}"
+            path = _export(cursor, table, row, export_dir) if export_dir else None
+            if drop:
+                cursor.execute(f"DROP TABLE {table}")
+            conn.commit()
+            archived.append(row.partition)
+            logger.info(
+                f"Archived {row.partition} to {path or table}{' (dropped)' if drop else ''} "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Archiving fact_sales partitions failed: {e}")
+        raise
+    finally:
+        cursor.close()
+        _known.pop(conn.dsn, None)
+    return archived
+
+
+def _export(cursor, table: str, row, export_dir: str) -> str:
+    """COPY a detached partition to <export_dir>/<partition>.csv.gz with a JSON manifest beside it."""
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.join(export_dir, f"{row.partition}.csv.gz")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        cursor.copy_expert(f"COPY {table} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+    os.replace(tmp_path, path)
+    cursor.execute(f"SELECT count(*), sum(revenue) FROM {table}")
+    rows, revenue = cursor.fetchone()
+    with open(f"{path[:-len('.csv.gz')]}.json", 'w', encoding='utf-8') as f:
+        json.dump({'partition': row.partition, 'lower': str(row.lower), 'upper': str(row.upper),
+                   'rows': rows, 'revenue': str(revenue or 0)}, f, indent=2)
+    return path
+
+
+def _plan_relations(plan: dict) -> set:
+    names = {plan['Relation Name']} if 'Relation Name' in plan else set()
+    for child in plan.get('Plans', []):
+        names |= _plan_relations(child)
+    return names
+
+
+def check_pruning(conn, first=None, last=None) -> dict:
+    """EXPLAIN a month-range aggregate and report the partitions it reads (expected: just those months)."""
+    first = month_start(first or pd.Timestamp.now())
+    last = month_start(last or first)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"EXPLAIN (FORMAT JSON) SELECT count(*), sum(revenue) FROM {PARENT} "
+        f"WHERE sale_timestamp >= %s AND sale_timestamp < %s",
+        (first, next_month(last))
+    )
+    plan = cursor.fetchone()[0][0]['Plan']
+    cursor.close()
+    conn.commit()
+
+    partitions = list_partitions(conn)
+    scanned = sorted(_plan_relations(plan) & set(partitions['partition']))
+    expected = sorted(set(partition_name(m) for m in _months(first, last)) & set(partitions['partition']))
+    return {
+        'range': f"[{first}, {next_month(last)})",
+        'partitions': len(partitions),
+        'scanned': scanned,
+        'pruned': len(partitions) - len(scanned),
+        'ok': set(scanned) <= set(expected),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of fact_sales")
+    parser.add_argument("command", choices=["ensure", "list", "archive", "check-pruning"])
+    parser.add_argument("--from", dest="first", default=None, help="First month (YYYY-MM)")
+    parser.add_argument("--to", dest="last", default=None, help="Last month (YYYY-MM)")
+    parser.add_argument("--months-ahead", type=int, default=None,
+                        help=f"Upcoming months to create with ensure (default: {MONTHS_AHEAD})")
+    parser.add_argument("--before", default=None, help="archive: every month before this one (YYYY-MM)")
+    parser.add_argument("--export-dir", default=None, help="archive: write each partition to DIR/<name>.csv.gz")
+    parser.add_argument("--drop", action="store_true", help="archive: drop the table once detached (and exported)")
+    args = parser.parse_args(argv)
+
+    conn = get_conn()
+    try:
+        if args.command == "ensure":
+            if args.first or args.last:
+                created = ensure_partitions(_months(args.first or args.last, month_start(args.last or args.first)))
+            else:
+                created = ensure_for_sales(pd.Series([], dtype='datetime64[ns]'), args.months_ahead)
+            print(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+        elif args.command == "list":
+            print(list_partitions(conn).to_string(index=False))
+        elif args.command == "archive":
+            if not args.before:
+                parser.error("archive needs --before YYYY-MM")
+            if args.drop and not args.export_dir:
+                logger.warning("Dropping archived partitions without --export-dir: their rows are deleted")
+            archived = archive_partitions(conn, args.before, args.export_dir, args.drop)
+            print(f"Archived {len(archived)} partitions" + (f": {', '.join(archived)}" if archived else ""))
+        else:
+            report = check_pruning(conn, args.first, args.last)
+            print(f"{report['range']}: scanned {', '.join(report['scanned']) or 'no partitions'} "
+                  f"({report['pruned']} of {report['partitions']} pruned)")
+            return 0 if report['ok'] else 1
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# etl/profiling.py
+"""Per-stage wall time and peak memory for the pipeline.
+
+Peak memory is measured with tracemalloc (NumPy and pandas buffers are
+traced too), which slows allocation-heavy code, so it is opt-in:
+ECO_PROFILE_MEMORY=1 or `python etl/pipeline.py --profile-memory`. Stages
+can be nested; an outer stage's peak includes its inner stages.
+"""
+import os
+import time
+import logging
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+PROFILE_MEMORY = os.getenv("ECO_PROFILE_MEMORY", "0") == "1"
+
+# Peaks seen so far by each open stage (innermost last)
+_open_stages = []
+
+
+def enable(enabled: bool = True):
+    """Switch memory profiling on or off for this process."""
+    global PROFILE_MEMORY
+    PROFILE_MEMORY = enabled
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """In-memory size of a DataFrame, including the strings behind object columns."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+@contextmanager
+def stage_memory(stage: str):
+    """Log wall time (and, when profiling, peak traced memory) of the enclosed block."""
+    started = time.perf_counter()
+    if not PROFILE_MEMORY:
+        yield
+        logger.info(f"Stage {stage}: {time.perf_counter() - started:.2f}s")
+        return
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if _open_stages:
+        _open_stages[-1]['peak'] = max(_open_stages[-1]['peak'], tracemalloc.get_traced_memory()[1])
+    start_current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    _open_stages.append({'peak': 0})
+    try:
+        yield
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(_open_stages.pop()['peak'], peak)
+        if _open_stages:
+            _open_stages[-1]['peak'] = max(_open_stages[-1]['peak'], peak)
+        if started_tracing:
+            tracemalloc.stop()
+        logger.info(
+            f"Stage {stage}: {time.perf_counter() - started:.2f}s, peak {peak / MB:.1f} MB "
+            f"({(peak - start_current) / MB:+.1f} MB over stage start, {(current - start_current) / MB:+.1f} MB retained)"
+        )
@@ -0,0 +1,301 @@
+# etl/realtime.py
+"""Resident micro-batch runner applying streamed price updates to dim_product.
+
+Between batch runs, price changes landing in staging/streaming_updates are
+picked up every ECO_REALTIME_POLL_SECONDS through the etl.streaming consumer
+(same consumer state and latest-update log run_etl reads) and committed within
+seconds instead of waiting for the next full products SCD pass:
+
+    poll   consume new update files (at most --max-updates per poll) and put
+           them on a bounded queue; while the queue is full polling waits, so
+           a slow database leaves files on disk instead of growing memory
+    apply  take a batch, gather more for up to --window seconds, keep the
+           latest valid price per product and write the new versions through
+           a narrow SCD Type 2 path: only the affected products' current rows
+           are locked, expired and re-inserted, with the batch load's row_hash
+
+Every committed micro-batch is recorded in etl_realtime_batches (see
+migrations/0010) with its file-landing -> commit latency (p50 / p95 / max).
+Updates for products not in dim_product yet are skipped; they stay in the
+latest-update log and are applied with the next batch run's products. A
+run_etl that overlaps the runner waits on the consumer lock (see etl.streaming)
+for the current poll instead of racing it.
+
+    python -m etl.realtime [--streaming-dir staging/streaming_updates] [--poll 1.0] [--window 2.0]
+                           [--max-updates 5000] [--queue 8] [--once]
+"""
+import os
+import sys
+import time
+import signal
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from etl import metrics
+from etl.db import connection, execute_prepared
+from etl.load import PRODUCT_TRACKED_COLUMNS
+from etl.streaming import consume_new_updates, LANDED_AT_COLUMN
+from etl.transform import row_hash
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STREAMING_DIR = os.getenv("ECO_STREAMING_DIR", "staging/streaming_updates")
+
+# Seconds between polls of the streaming directory
+POLL_SECONDS = float(os.getenv("ECO_REALTIME_POLL_SECONDS", 1.0))
+# Seconds a micro-batch keeps gathering queued updates before it is applied
+WINDOW_SECONDS = float(os.getenv("ECO_REALTIME_WINDOW_SECONDS", 2.0))
+# Update files per poll, and per micro-batch
+MAX_UPDATES = int(os.getenv("ECO_REALTIME_MAX_UPDATES", 5000))
+# Polled batches waiting for the writer before polling blocks (backpressure)
+QUEUE_BATCHES = int(os.getenv("ECO_REALTIME_QUEUE", 8))
+# Attempts per micro-batch before its updates are left to the next batch run
+APPLY_ATTEMPTS = int(os.getenv("ECO_REALTIME_APPLY_ATTEMPTS", 3))
+
+# Current versions of the updated products, locked until the batch commits
+CURRENT_PRODUCTS = """
+SELECT p.product_id, lower(btrim(p.product_name)) AS norm_key, p.category, p.carbon_footprint_rating, p.row_hash
+FROM dim_product p
+WHERE lower(btrim(p.product_name)) = ANY(%s::text[]) AND p.is_current = TRUE
+FOR UPDATE OF p
+"""
+
+EXPIRE_PRODUCTS = """
+UPDATE dim_product SET is_current = FALSE, effective_end = %s
+WHERE product_id = ANY(%s::integer[])
+"""
+
+# New versions copy the untracked-by-the-stream columns from the version they replace
+INSERT_PRODUCT_VERSIONS = """
+INSERT INTO dim_product (product_name, category, price, carbon_footprint_rating,
+                         effective_start, effective_end, is_current, row_hash)
+SELECT p.product_name, p.category, u.price, p.carbon_footprint_rating, %s, 'infinity', TRUE, u.row_hash
+FROM unnest(%s::integer[], %s::numeric[], %s::char(32)[]) AS u(product_id, price, row_hash)
+JOIN dim_product p ON p.product_id = u.product_id
+"""
+
+RECORD_BATCH = """
+INSERT INTO etl_realtime_batches (started_at, committed_at, updates, products, versions, unknown_products,
+                                  rejected, queue_depth, apply_seconds,
+                                  latency_p50_seconds, latency_p95_seconds, latency_max_seconds)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def coalesce_updates(updates: pd.DataFrame) -> tuple:
+    """(latest valid price per product, rows rejected) for one window of raw updates."""
+    if updates.empty or 'product_name' not in updates.columns or 'new_price' not in updates.columns:
+        return pd.DataFrame(columns=['norm_key', 'new_price', LANDED_AT_COLUMN]), len(updates)
+    price = pd.to_numeric(updates['new_price'], errors='coerce').round(2)
+    name = updates['product_name'].astype(str).str.strip()
+    # dim_product.price must be positive; unnamed updates cannot be matched
+    valid = updates['product_name'].notna() & name.ne('') & price.gt(0)
+    latest = pd.DataFrame({'norm_key': name.str.lower(), 'new_price': price,
+                           LANDED_AT_COLUMN: updates[LANDED_AT_COLUMN]})
+    latest = (
+        latest[valid]
+        .sort_values(LANDED_AT_COLUMN, kind='stable')
+        .drop_duplicates(subset=['norm_key'], keep='last')
+        .reset_index(drop=True)
+    )
+    return latest, int((~valid).sum())
+
+
+def apply_price_updates(latest: pd.DataFrame, conn) -> dict:
+    """Narrow SCD Type 2 for coalesced price updates: only their products' current rows are touched.
+
+    Commits on success; returns counts of versions written, unchanged and unknown products.
+    """
+    result = {'versions': 0, 'unchanged': 0, 'unknown': 0}
+    if latest.empty:
+        return result
+    cursor = conn.cursor()
+    try:
+        execute_prepared(cursor, 'eco_rt_current_products', CURRENT_PRODUCTS, (latest['norm_key'].tolist(),))
+        current = pd.DataFrame(cursor.fetchall(), columns=['product_id', 'norm_key', 'category',
+                                                           'carbon_footprint_rating', 'current_hash'])
+        merged = latest.merge(current, on='norm_key', how='left')
+        known = merged['product_id'].notna()
+        result['unknown'] = int((~known).sum())
+        merged = merged[known].copy()
+
+        merged['price'] = merged['new_price']
+        merged['carbon_footprint_rating'] = pd.to_numeric(merged['carbon_footprint_rating'])
+        # Same hash the batch SCD load writes, so the next run sees these versions as unchanged
+        merged['row_hash'] = row_hash(merged, PRODUCT_TRACKED_COLUMNS)
+        changed = merged[merged['row_hash'].ne(merged['current_hash'])]
+        result['unchanged'] = len(merged) - len(changed)
+
+        if not changed.empty:
+            ids = changed['product_id'].astype(int).tolist()
+            now = datetime.now()
+            execute_prepared(cursor, 'eco_rt_expire_products', EXPIRE_PRODUCTS, (now, ids))
+            execute_prepared(cursor, 'eco_rt_insert_products', INSERT_PRODUCT_VERSIONS,
+                             (now, ids, changed['price'].tolist(), changed['row_hash'].tolist()))
+            result['versions'] = len(changed)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return result
+
+
+class RealtimeRunner:
+    """Poll → bounded queue → windowed apply, until stopped (or after one pass with once=True)."""
+
+    def __init__(self, streaming_dir: str = None, poll_seconds: float = None, window_seconds: float = None,
+                 max_updates: int = None, queue_batches: int = None, once: bool = False):
+        self.streaming_dir = streaming_dir or STREAMING_DIR
+        self.poll_seconds = POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.window_seconds = WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.max_updates = max_updates or MAX_UPDATES
+        self.queue_batches = queue_batches or QUEUE_BATCHES
+        self.once = once
+        self.totals = {'batches': 0, 'updates': 0, 'versions': 0, 'dropped': 0, 'latency_max': 0.0}
+
+    async def run(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_batches)
+        self.stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # not the main thread, or no signal support on this platform
+        logger.info(f"Real-time runner on {self.streaming_dir}: poll {self.poll_seconds}s, "
+                    f"window {self.window_seconds}s, queue {self.queue_batches} batches")
+        await asyncio.gather(self.poll(), self.apply())
+        t = self.totals
+        logger.info(f"Real-time runner stopped: {t['batches']} batches, {t['updates']} updates, "
+                    f"{t['versions']} versions, {t['dropped']} updates left to the batch run, "
+                    f"max latency {t['latency_max']:.3f}s")
+        return t
+
+    async def poll(self):
+        try:
+            while not self.stopping.is_set():
+                updates = pd.DataFrame()
+                if os.path.isdir(self.streaming_dir):
+                    try:
+                        updates = await asyncio.to_thread(consume_new_updates, self.streaming_dir, self.max_updates)
+                    except Exception as e:
+                        logger.error(f"Polling {self.streaming_dir} failed: {e}")
+                if not updates.empty:
+                    if self.queue.full():
+                        logger.warning(f"Apply queue full ({self.queue.qsize()} batches) - polling paused")
+                    await self.queue.put(updates)
+                if self.once:
+                    break
+                if len(updates) >= self.max_updates:
+                    continue  # catching up on a backlog: poll again straight away
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.queue.put(None)
+
+    async def apply(self):
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            first = await self.queue.get()
+            if first is None:
+                break
+            frames, rows = [first], len(first)
+            deadline = loop.time() + self.window_seconds
+            while rows < self.max_updates:
+                try:
+                    more = await asyncio.wait_for(self.queue.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                if more is None:
+                    done = True
+                    break
+                frames.append(more)
+                rows += len(more)
+            await asyncio.to_thread(self._commit, pd.concat(frames, ignore_index=True), self.queue.qsize())
+
+    def _commit(self, updates: pd.DataFrame, queue_depth: int):
+        """Apply one micro-batch (retrying with backoff) and record it in etl_realtime_batches."""
+        started_at = datetime.now()
+        started = time.perf_counter()
+        latest, rejected = coalesce_updates(updates)
+        with metrics.span('realtime.apply_prices', rows_in=len(updates)) as span:
+            for attempt in range(1, APPLY_ATTEMPTS + 1):
+                try:
+                    with connection() as conn:
+                        result = apply_price_updates(latest, conn)
+                    committed = time.time()
+                    break
+                except Exception as e:
+                    if attempt == APPLY_ATTEMPTS:
+                        self.totals['dropped'] += len(updates)
+                        logger.error(f"Dropping micro-batch of {len(updates)} updates after {attempt} attempts "
+                                     f"(they stay in the latest-update log for the next batch run): {e}")
+                        return
+                    delay = min(8.0, 0.5 * 2 ** (attempt - 1))
+                    logger.warning(f"Micro-batch failed (attempt {attempt}/{APPLY_ATTEMPTS}), "
+                                   f"retrying in {delay:.1f}s: {e}")
+                    time.sleep(delay)
+            span.rows_out = result['versions']
+
+        committed_at = datetime.now()
+        apply_seconds = time.perf_counter() - started
+        # Landing -> commit of every update in the window, including coalesced ones
+        latency = (committed - pd.to_numeric(updates[LANDED_AT_COLUMN])).clip(lower=0)
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(RECORD_BATCH, (
+                    started_at, committed_at, len(updates), len(latest), result['versions'],
+                    result['unknown'], rejected, queue_depth, apply_seconds,
+                    float(latency.quantile(0.5)), float(latency.quantile(0.95)), float(latency.max())
+                ))
+                cursor.close()
+        except Exception as e:
+            logger.warning(f"Could not record micro-batch in etl_realtime_batches: {e}")
+
+        self.totals['batches'] += 1
+        self.totals['updates'] += len(updates)
+        self.totals['versions'] += result['versions']
+        self.totals['latency_max'] = max(self.totals['latency_max'], float(latency.max()))
+        logger.info(
+            f"Micro-batch: {len(updates)} updates -> {len(latest)} products, {result['versions']} new versions "
+            f"({result['unchanged']} unchanged, {result['unknown']} unknown, {rejected} rejected) in "
+            f"{apply_seconds:.3f}s; latency p50 {latency.quantile(0.5):.3f}s p95 {latency.quantile(0.95):.3f}s "
+            f"max {latency.max():.3f}s; {queue_depth} batches queued"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply streamed price updates to dim_product in micro-batches")
+    parser.add_argument("--streaming-dir", default=None, help=f"Update file directory (default: {STREAMING_DIR})")
+    parser.add_argument("--poll", type=float, default=None, help=f"Seconds between polls (default: {POLL_SECONDS})")
+    parser.add_argument("--window", type=float, default=None,
+                        help=f"Seconds a micro-batch gathers updates (default: {WINDOW_SECONDS})")
+    parser.add_argument("--max-updates", type=int, default=None,
+                        help=f"Update files per poll and per micro-batch (default: {MAX_UPDATES})")
+    parser.add_argument("--queue", type=int, default=None,
+                        help=f"Polled batches queued before polling waits (default: {QUEUE_BATCHES})")
+    parser.add_argument("--once", action="store_true", help="Apply what has landed, then exit")
+    args = parser.parse_args(argv)
+
+    runner = RealtimeRunner(args.streaming_dir, args.poll, args.window, args.max_updates, args.queue, args.once)
+    totals = asyncio.run(runner.run())
+    return 1 if totals['dropped'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+# etl/rollups.py
+"""Sales rollups kept in step with fact_sales (see migrations/0006).
+
+    rollup_sales_daily_product_location   date_id × product_id × location_id
+    rollup_sales_daily                    sale_date
+    rollup_sales_daily_category           sale_date × category
+    rollup_sales_daily_region             sale_date × region
+
+Every fact upsert calls apply_fact_delta() inside its transaction, just
+before the merge: the rows being loaded count once each, and the fact rows
+they replace (same sale_id) are subtracted, so reloads and corrections keep
+the totals right. The per-key delta is merged with INSERT ... ON CONFLICT
+DO UPDATE (adding to what is there); nothing is recomputed from fact_sales.
+
+    python -m etl.rollups rebuild [--from 2024-01-01] [--to 2024-12-31]
+    python -m etl.rollups verify
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from etl.db import get_conn
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Off skips the per-load delta merge (rollups then need a rebuild before they are read)
+ENABLED = os.getenv("ECO_ROLLUPS", "1") == "1"
+
+MEASURES = ['sales_count', 'quantity_sold', 'revenue', 'carbon_savings']
+
+# table -> grouping expressions (keyed by rollup column), joins from fact/delta rows `x`
+ROLLUPS = {
+    'rollup_sales_daily_product_location': {
+        'keys': {'date_id': 'x.date_id', 'product_id': 'x.product_id', 'location_id': 'x.location_id'},
+        'joins': "",
+    },
+    'rollup_sales_daily': {
+        'keys': {'sale_date': 'd.date'},
+        'joins': "JOIN dim_date d ON d.date_id = x.date_id",
+    },
+    'rollup_sales_daily_category': {
+        'keys': {'sale_date': 'd.date', 'category': "coalesce(p.category, 'Unknown')"},
+        'joins': "JOIN dim_date d ON d.date_id = x.date_id "
+                 "JOIN dim_product p ON p.product_id = x.product_id",
+    },
+    'rollup_sales_daily_region': {
+        'keys': {'sale_date': 'd.date', 'region': "coalesce(l.region, 'Unknown')"},
+        'joins': "JOIN dim_date d ON d.date_id = x.date_id "
+                 "JOIN dim_location l ON l.location_id = x.location_id",
+    },
+}
+
+DELTA_TABLE = '_rollup_delta'
+
+# Net change per fine-grained key: incoming rows add, the fact rows they replace subtract
+DELTA_QUERY = """
+WITH incoming AS (
+    SELECT sale_id, date_id, product_id, location_id, quantity_sold, revenue, carbon_savings
+    FROM {source}
+),
+changes AS (
+    SELECT date_id, product_id, location_id, 1 AS sales_count,
+           coalesce(quantity_sold, 0)::bigint AS quantity_sold,
+           coalesce(revenue, 0) AS revenue, coalesce(carbon_savings, 0) AS carbon_savings
+    FROM incoming
+    UNION ALL
+    SELECT f.date_id, f.product_id, f.location_id, -1,
+           -coalesce(f.quantity_sold, 0)::bigint, -coalesce(f.revenue, 0), -coalesce(f.carbon_savings, 0)
+    FROM fact_sales f
+    JOIN incoming i ON i.sale_id = f.sale_id
+)
+SELECT date_id, product_id, location_id,
+       sum(sales_count)::integer AS sales_count, sum(quantity_sold)::bigint AS quantity_sold,
+       sum(revenue) AS revenue, sum(carbon_savings) AS carbon_savings
+FROM changes
+GROUP BY date_id, product_id, location_id
+HAVING sum(sales_count) <> 0 OR sum(quantity_sold) <> 0 OR sum(revenue) <> 0 OR sum(carbon_savings) <> 0
+"""
+
+
+def _grouped(table: str, source: str, measure_sql: str, where: str = "") -> str:
+    """SELECT keys + measures of `table` aggregated from `source` rows aliased x."""
+    spec = ROLLUPS[table]
+    keys = list(spec['keys'].values())
+    group_by = ', '.join(str(i) for i in range(1, len(keys) + 1))
+    return (
+        f"SELECT {', '.join(keys)}, {measure_sql} "
+        f"FROM {source} x {spec['joins']} {where} "
+        f"GROUP BY {group_by}"
+    )
+
+
+DELTA_MEASURES = ("sum(x.sales_count)::integer, sum(x.quantity_sold)::bigint, "
+                  "sum(x.revenue), sum(x.carbon_savings)")
+FACT_MEASURES = ("count(*)::integer, sum(coalesce(x.quantity_sold, 0))::bigint, "
+                 "sum(coalesce(x.revenue, 0)), sum(coalesce(x.carbon_savings, 0))")
+
+
+def _merge_sql(table: str) -> str:
+    keys = list(ROLLUPS[table]['keys'])
+    cols = ', '.join(keys + MEASURES)
+    updates = ', '.join(f"{m} = r.{m} + EXCLUDED.{m}" for m in MEASURES)
+    # Fixed key order, so concurrent loads lock rollup rows in the same sequence
+    return (
+        f"INSERT INTO {table} AS r ({cols}) "
+        f"{_grouped(table, DELTA_TABLE, DELTA_MEASURES)} ORDER BY {', '.join(str(i) for i in range(1, len(keys) + 1))} "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}, updated_at = now()"
+    )
+
+
+def _prune_sql(table: str) -> str:
+    """Drop rows a delta emptied (sales moved to another key or day)."""
+    keys = ROLLUPS[table]['keys']
+    touched = f"SELECT DISTINCT {', '.join(keys.values())} FROM {DELTA_TABLE} x {ROLLUPS[table]['joins']} WHERE x.sales_count < 0"
+    return f"DELETE FROM {table} WHERE sales_count = 0 AND ({', '.join(keys)}) IN ({touched})"
+
+
+def apply_fact_delta(cursor, source: str) -> int:
+    """Merge the rollup delta for fact rows about to be upserted from `source`.
+
+    source is a table (or parenthesised subquery) with sale_id, date_id, product_id,
+    location_id, quantity_sold, revenue and carbon_savings, read before fact_sales
+    changes. Runs in the caller's transaction; returns the fine-grained keys touched.
+    """
+    started = time.perf_counter()
+    cursor.execute(f"DROP TABLE IF EXISTS {DELTA_TABLE}")
+    cursor.execute(f"CREATE TEMP TABLE {DELTA_TABLE} ON COMMIT DROP AS {DELTA_QUERY.format(source=source)}")
+    keys = cursor.rowcount
+    if keys:
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {DELTA_TABLE} WHERE sales_count < 0)")
+        replaced = cursor.fetchone()[0]
+        for table in ROLLUPS:
+            cursor.execute(_merge_sql(table))
+            if replaced:
+                cursor.execute(_prune_sql(table))
+    logger.info(f"Merged rollup deltas for {keys} date/product/location keys in {time.perf_counter() - started:.3f}s")
+    return keys
+
+
+def rebuild(conn=None, date_from: str = None, date_to: str = None):
+    """Recompute the rollups from fact_sales, for every day or just [date_from, date_to]."""
+    close_conn = conn is None
+    conn = conn or get_conn()
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        if date_from is None and date_to is None:
+            cursor.execute(f"TRUNCATE {', '.join(ROLLUPS)}")
+            where, params = "", ()
+        else:
+            between = "BETWEEN coalesce(%s::date, '-infinity') AND coalesce(%s::date, 'infinity')"
+            in_range = f"date_id IN (SELECT date_id FROM dim_date WHERE date {between})"
+            params = (date_from, date_to)
+            for table, spec in ROLLUPS.items():
+                condition = in_range if 'date_id' in spec['keys'] else f"sale_date {between}"
+                cursor.execute(f"DELETE FROM {table} WHERE {condition}", params)
+            where = f"WHERE x.{in_range}"
+        for table, spec in ROLLUPS.items():
+            cols = ', '.join(list(spec['keys']) + MEASURES)
+            cursor.execute(f"INSERT INTO {table} ({cols}) {_grouped(table, 'fact_sales', FACT_MEASURES, where)}", params)
+            logger.info(f"Rebuilt {table}: {cursor.rowcount} rows")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Rollup rebuild failed: {e}")
+        raise
+    finally:
+        cursor.close()
+        if close_conn:
+            conn.close()
+    logger.info(f"Rollup rebuild finished in {time.perf_counter() - started:.2f}s")
+
+
+def verify(conn=None) -> dict:
+    """Rows that differ between each rollup and a fresh aggregate of fact_sales (0 = in step)."""
+    close_conn = conn is None
+    conn = conn or get_conn()
+    cursor = conn.cursor()
+    try:
+        drift = {}
+        for table, spec in ROLLUPS.items():
+            stored = f"SELECT {', '.join(list(spec['keys']) + MEASURES)} FROM {table}"
+            fresh = _grouped(table, 'fact_sales', FACT_MEASURES)
+            cursor.execute(f"SELECT count(*) FROM (({stored} EXCEPT {fresh}) UNION ALL ({fresh} EXCEPT {stored})) diff")
+            drift[table] = cursor.fetchone()[0]
+        conn.commit()
+        return drift
+    finally:
+        cursor.close()
+        if close_conn:
+            conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild or check the sales rollup tables")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument("--from", dest="date_from", default=None, help="First sale date to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", default=None, help="Last sale date to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        rebuild(date_from=args.date_from, date_to=args.date_to)
+        return 0
+
+    drift = verify()
+    for table, rows in drift.items():
+        print(f"{table}: {'in step' if rows == 0 else f'{rows} rows differ'}")
+    return 0 if not any(drift.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# etl/seed.py
+"""Bulk, incremental seeding of the static dimensions (dim_date, dim_location).
+
+The calendar is built as one vectorized frame (YYYYMMDD keys, see
+migrations/0009, with ZA public holidays) and COPYed in. It only ever grows
+forward from the last seeded day - nothing is deleted, so fact_sales keys
+stay valid and reruns are no-ops. Locations come from a reference CSV and
+are merged on (city, region) through a COPYed temp table; rows that did
+not change are left alone, so dim_versions (and the lookup caches) only
+move when something did.
+
+    python -m etl.seed dates [--from 2020-01-01] [--to 2027-12-31]
+    python -m etl.seed locations [--file reference/locations.csv]
+    python -m etl.seed all
+"""
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+from datetime import date
+
+import holidays
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from etl.db import get_conn
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# First day of an empty calendar
+CALENDAR_START = os.getenv("ECO_CALENDAR_START", "2020-01-01")
+# The calendar runs to 31 December this many years after the current one
+CALENDAR_YEARS_AHEAD = int(os.getenv("ECO_CALENDAR_YEARS_AHEAD", 1))
+HOLIDAY_COUNTRY = os.getenv("ECO_HOLIDAY_COUNTRY", "ZA")
+
+LOCATIONS_FILE = os.getenv("ECO_LOCATIONS_FILE", os.path.join(project_root, "reference", "locations.csv"))
+
+DATE_COLUMNS = ['date_id', 'date', 'year', 'quarter', 'month', 'day', 'weekday', 'holiday_flag', 'holiday_name']
+LOCATION_COLUMNS = ['city', 'country', 'region', 'latitude', 'longitude']
+
+
+def default_calendar_end() -> date:
+    return date(date.today().year + CALENDAR_YEARS_AHEAD, 12, 31)
+
+
+def build_calendar(first, last) -> pd.DataFrame:
+    """dim_date rows for every day in [first, last]."""
+    days = pd.date_range(first, last, freq='D')
+    country_holidays = holidays.country_holidays(HOLIDAY_COUNTRY, years=range(days.year.min(), days.year.max() + 1)) \
+        if len(days) else {}
+    names = pd.Series(dict(country_holidays), dtype=object)
+    names.index = pd.to_datetime(names.index)
+    holiday_name = names.reindex(days).str.slice(0, 50)
+
+    return pd.DataFrame({
+        'date_id': days.year * 10000 + days.month * 100 + days.day,
+        'date': days.date,
+        'year': days.year,
+        'quarter': days.quarter,
+        'month': days.month,
+        'day': days.day,
+        'weekday': days.day_name(),
+        'holiday_flag': holiday_name.notna().to_numpy(),
+        'holiday_name': holiday_name.to_numpy(),
+    })
+
+
+def _copy(df: pd.DataFrame, table: str, cursor):
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep='\\N')
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+
+
+def seed_dates(conn=None, first=None, last=None) -> int:
+    """Extend dim_date forward to `last` (default: end of next year); returns days added.
+
+    An empty calendar starts at `first` (default ECO_CALENDAR_START). Days before
+    the current first day are never added.
+    """
+    close_conn = conn is None
+    conn = conn or get_conn()
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        # Concurrent seeders queue here instead of both appending the same days
+        cursor.execute("LOCK TABLE dim_date IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute("SELECT min(date), max(date) FROM dim_date")
+        seeded_first, seeded_last = cursor.fetchone()
+        last = pd.Timestamp(last or default_calendar_end()).date()
+        if seeded_last is None:
+            start = pd.Timestamp(first or CALENDAR_START).date()
+        else:
+            if first is not None and pd.Timestamp(first).date() < seeded_first:
+                logger.warning(f"dim_date starts at {seeded_first}; it is only extended forward")
+            start = seeded_last + pd.Timedelta(days=1)
+        if start > last:
+            conn.commit()
+            logger.info(f"dim_date already covers {seeded_first}..{seeded_last}")
+            return 0
+
+        calendar = build_calendar(start, last)
+        _copy(calendar[DATE_COLUMNS], 'dim_date', cursor)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Calendar seeding failed: {e}")
+        raise
+    finally:
+        cursor.close()
+        if close_conn:
+            conn.close()
+    logger.info(
+        f"Added {len(calendar)} days to dim_date ({start}..{last}, "
+        f"{int(calendar['holiday_flag'].sum())} holidays) in {time.perf_counter() - started:.2f}s"
+    )
+    return len(calendar)
+
+
+def read_locations(path: str = None) -> pd.DataFrame:
+    """Reference locations (city, country, region, latitude, longitude), one row per (city, region)."""
+    df = pd.read_csv(path or LOCATIONS_FILE)
+    missing = [c for c in ('city', 'region') if c not in df.columns]
+    if missing:
+        raise ValueError(f"Location file {path or LOCATIONS_FILE} has no {missing} column")
+    for column in LOCATION_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    df['country'] = df['country'].fillna('South Africa')
+    return df[LOCATION_COLUMNS].drop_duplicates(subset=['city', 'region'], keep='last')
+
+
+LOCATION_MERGE = """
+INSERT INTO dim_location AS l (city, country, region, latitude, longitude)
+SELECT city, country, region, latitude, longitude FROM _seed_locations
+ON CONFLICT (city, region) DO UPDATE SET
+    country = EXCLUDED.country, latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude
+"""
+
+# Reference rows that are new or differ from dim_location
+LOCATION_CHANGES = """
+SELECT count(*) FROM _seed_locations s
+LEFT JOIN dim_location l ON l.city = s.city AND l.region = s.region
+WHERE l.location_id IS NULL
+   OR (l.country, l.latitude, l.longitude) IS DISTINCT FROM (s.country, s.latitude, s.longitude)
+"""
+
+
+def seed_locations(conn=None, path: str = None) -> int:
+    """Insert new and update changed reference locations; returns rows written."""
+    locations = read_locations(path)
+    close_conn = conn is None
+    conn = conn or get_conn()
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE _seed_locations ON COMMIT DROP AS "
+            f"SELECT {', '.join(LOCATION_COLUMNS)} FROM dim_location WITH NO DATA"
+        )
+        _copy(locations, '_seed_locations', cursor)
+        cursor.execute(LOCATION_CHANGES)
+        changed = cursor.fetchone()[0]
+        if changed:
+            cursor.execute(LOCATION_MERGE)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Location seeding failed: {e}")
+        raise
+    finally:
+        cursor.close()
+        if close_conn:
+            conn.close()
+    logger.info(f"Seeded dim_location from {len(locations)} reference rows: {changed} new or changed "
+                f"in {time.perf_counter() - started:.2f}s")
+    return changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed dim_date and dim_location in bulk")
+    parser.add_argument("command", choices=["dates", "locations", "all"])
+    parser.add_argument("--from", dest="first", default=None,
+                        help=f"First day of an empty calendar (default: {CALENDAR_START})")
+    parser.add_argument("--to", dest="last", default=None,
+                        help=f"Last calendar day (default: {default_calendar_end()})")
+    parser.add_argument("--file", default=None, help=f"Reference locations CSV (default: {LOCATIONS_FILE})")
+    args = parser.parse_args(argv)
+
+    if args.command in ("dates", "all"):
+        seed_dates(first=args.first, last=args.last)
+    if args.command in ("locations", "all"):
+        seed_locations(path=args.file)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# etl/streaming.py
+"""Incremental consumer for real-time product updates in staging/streaming_updates.
+
+Each run only parses update files it has not consumed yet and folds them into
+a compacted Parquet log holding the latest update per product. Processed
+files are periodically moved out of the hot directory, so the cost of a run
+does not grow with the number of files that have piled up.
+
+A file counts as consumed by name and inode change time (st_ctime), not by an
+mtime watermark: files moved in with mv / os.rename or copied with their
+timestamps (etl/ingest.py) keep an old mtime, but renaming or creating them
+sets ctime. Files that fail to parse (half-written, malformed) are not
+consumed and are read again on the next run; after ECO_STREAM_READ_ATTEMPTS
+failures they are moved to quarantine/, and moving one back retries it.
+
+The resident runner (etl.realtime) and run_etl can consume the same directory
+at once; each consume holds an exclusive flock on _consumer.lock, so they take
+turns instead of overwriting each other's state and log.
+
+State kept in the streaming directory:
+    _consumer.lock           held by the consumer currently reading the directory
+    _consumer_state.json     consumed files awaiting compaction (name -> ctime) and read failures
+    _latest_updates.parquet  latest update per product_name
+    processed/               compacted update files
+    quarantine/              files that never parsed
+"""
+import os
+import json
+import fcntl
+import logging
+from contextlib import contextmanager
+
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = "_consumer.lock"
+STATE_FILE = "_consumer_state.json"
+LOG_FILE = "_latest_updates.parquet"
+PROCESSED_DIR = "processed"
+QUARANTINE_DIR = "quarantine"
+
+# Move processed files out of the hot directory once this many have accumulated
+COMPACT_EVERY = int(os.getenv("ECO_STREAM_COMPACT_EVERY", 100))
+
+# Failed reads of one file before it is quarantined (a half-written file parses on a later run)
+READ_ATTEMPTS = int(os.getenv("ECO_STREAM_READ_ATTEMPTS", 10))
+
+# Column recording when an update file landed (file ctime, epoch seconds)
+LANDED_AT_COLUMN = 'landed_at'
+
+
+@contextmanager
+def _consumer_lock(streaming_dir: str):
+    """Hold the directory's exclusive consumer lock, waiting for another consumer to finish."""
+    with open(os.path.join(streaming_dir, LOCK_FILE), 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info(f"Waiting for another consumer of {streaming_dir}")
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _load_state(streaming_dir: str) -> dict:
+    path = os.path.join(streaming_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {'consumed': {}, 'failures': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if 'consumed' not in state:
+        # Watermark state: its pending files were consumed, anything else left in the directory was not
+        state = {'consumed': {name: None for name in state.get('pending', [])}, 'failures': {}}
+    return state
+
+
+def _save_state(streaming_dir: str, state: dict):
+    path = os.path.join(streaming_dir, STATE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def new_update_files(streaming_dir: str, state: dict) -> list:
+    """(landed_at, name) of update files not consumed yet, in landing order."""
+    consumed = state['consumed']
+    found = []
+    with os.scandir(streaming_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json') or entry.name.startswith('_') or not entry.is_file():
+                continue
+            landed_at = entry.stat().st_ctime
+            if entry.name not in consumed or consumed[entry.name] not in (None, landed_at):
+                found.append((landed_at, entry.name))
+    return sorted(found)
+
+
+def read_update_files(streaming_dir: str, files: list) -> tuple:
+    """Parse update files (one JSON object each) into a frame with their landing time.
+
+    Returns (frame, names of the files that could not be read).
+    """
+    updates = []
+    failed = []
+    for landed_at, name in files:
+        file_path = os.path.join(streaming_dir, name)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                data[LANDED_AT_COLUMN] = landed_at
+                updates.append(data)
+            else:
+                logger.warning(f"Invalid JSON structure in {file_path}")
+                failed.append(name)
+        except Exception as e:
+            logger.error(f"Error reading streaming file {file_path}: {e}")
+            failed.append(name)
+    return pd.DataFrame(updates), failed
+
+
+def read_latest_updates(streaming_dir: str) -> pd.DataFrame:
+    """The compacted latest-update-per-product log (empty if nothing consumed yet)."""
+    path = os.path.join(streaming_dir, LOG_FILE)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_parquet(path)
+
+
+def _write_latest_updates(streaming_dir: str, latest: pd.DataFrame):
+    path = os.path.join(streaming_dir, LOG_FILE)
+    tmp_path = f"{path}.tmp"
+    latest.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _advance(state: dict, files: list):
+    """Mark files (landed_at, name) consumed."""
+    for landed_at, name in files:
+        state['consumed'][name] = landed_at
+        state['failures'].pop(name, None)
+
+
+def _record_failures(streaming_dir: str, state: dict, names: list):
+    """Count a failed read of each file; quarantine those out of attempts."""
+    quarantined = 0
+    for name in names:
+        attempts = state['failures'].get(name, 0) + 1
+        if attempts < READ_ATTEMPTS:
+            state['failures'][name] = attempts
+            continue
+        state['failures'].pop(name, None)
+        quarantine_dir = os.path.join(streaming_dir, QUARANTINE_DIR)
+        os.makedirs(quarantine_dir, exist_ok=True)
+        try:
+            os.replace(os.path.join(streaming_dir, name), os.path.join(quarantine_dir, name))
+            quarantined += 1
+        except FileNotFoundError:
+            pass
+    if quarantined:
+        logger.error(f"Quarantined {quarantined} unreadable streaming update files after {READ_ATTEMPTS} "
+                     f"attempts in {os.path.join(streaming_dir, QUARANTINE_DIR)}")
+
+
+def compact(streaming_dir: str, state: dict):
+    """Move consumed files out of the hot directory; their updates already live in the log."""
+    processed_dir = os.path.join(streaming_dir, PROCESSED_DIR)
+    os.makedirs(processed_dir, exist_ok=True)
+    moved = 0
+    for name in state['consumed']:
+        try:
+            os.replace(os.path.join(streaming_dir, name), os.path.join(processed_dir, name))
+            moved += 1
+        except FileNotFoundError:
+            pass
+    state['consumed'] = {}
+    logger.info(f"Compacted {moved} streaming update files into {processed_dir}")
+
+
+def consume_new_updates(streaming_dir: str, max_files: int = None) -> pd.DataFrame:
+    """Read only update files not consumed yet and fold them into the latest-update log.
+
+    Returns the raw new updates (one row per file, in landing order). With
+    max_files only the oldest that many are read; the rest wait for the next call.
+    Files that fail to parse stay unconsumed and are read again next time.
+    Holds the consumer lock throughout, so concurrent consumers run one after another.
+    """
+    with _consumer_lock(streaming_dir):
+        return _consume(streaming_dir, max_files)
+
+
+def _consume(streaming_dir: str, max_files: int = None) -> pd.DataFrame:
+    state = _load_state(streaming_dir)
+    files = new_update_files(streaming_dir, state)
+    if max_files:
+        files = files[:max_files]
+    if not files:
+        return pd.DataFrame()
+
+    new_updates, failed = read_update_files(streaming_dir, files)
+    if not new_updates.empty and 'product_name' in new_updates.columns:
+        latest = pd.concat([read_latest_updates(streaming_dir), new_updates], ignore_index=True)
+        latest = (
+            latest.sort_values(LANDED_AT_COLUMN, kind='stable')
+            .drop_duplicates(subset=['product_name'], keep='last')
+            .reset_index(drop=True)
+        )
+        _write_latest_updates(streaming_dir, latest)
+    logger.info(f"Consumed {len(files) - len(failed)} new streaming update files"
+                + (f" ({len(failed)} unreadable, retried next run)" if failed else ""))
+
+    # The log is written before files are marked consumed: a crash in between only re-reads them
+    failed_names = set(failed)
+    _advance(state, [f for f in files if f[1] not in failed_names])
+    _record_failures(streaming_dir, state, failed)
+    if len(state['consumed']) >= COMPACT_EVERY:
+        compact(streaming_dir, state)
+    _save_state(streaming_dir, state)
+    return new_updates
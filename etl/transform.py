@@ -1,22 +1,23 @@
 # etl/transform.py
+import hashlib
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
 import logging
 
+from etl import metrics, outliers
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def rename_to_schema_columns(df: pd.DataFrame, table_type: str) -> pd.DataFrame:
-    """Rename source columns to match PostgreSQL schema exactly."""
-    df = df.copy()
-    
+    """Rename source columns to match PostgreSQL schema exactly (in place; returns df)."""
     if table_type == 'products':
         rename_map = {
             'name': 'product_name',
             'carbon_rating': 'carbon_footprint_rating'
         }
-        df = df.rename(columns=rename_map)
+        df.rename(columns=rename_map, inplace=True)
         
         # Ensure all expected columns exist (fill with None if missing)
         expected = ['product_name', 'category', 'price', 'carbon_footprint_rating']
@@ -27,10 +28,10 @@ def rename_to_schema_columns(df: pd.DataFrame, table_type: str) -> pd.DataFrame:
     
     elif table_type == 'customers':
         rename_map = {'name': 'customer_name'}  # Your generate_data.py uses 'name'
-        df = df.rename(columns=rename_map)
+        df.rename(columns=rename_map, inplace=True)
         
-        # Clean join_date: convert invalid to None (prevents NaT in SCD)
-        if 'join_date' in df.columns:
+        # Clean join_date: convert invalid to None (prevents NaT in SCD); already parsed when typed at extract
+        if 'join_date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['join_date']):
             df['join_date'] = pd.to_datetime(df['join_date'], errors='coerce')
         
         expected = ['customer_name', 'email', 'loyalty_level', 'join_date']
@@ -46,26 +47,111 @@ def rename_to_schema_columns(df: pd.DataFrame, table_type: str) -> pd.DataFrame:
     return df
 
 
+def _parse_price(price: pd.Series) -> pd.Series:
+    """Numeric price from raw values like 'R120.00' (categoricals are parsed per category)."""
+    if pd.api.types.is_numeric_dtype(price):
+        return price
+    if isinstance(price.dtype, pd.CategoricalDtype):
+        parsed = _parse_price(pd.Series(price.cat.categories.astype(object))).to_numpy(dtype=float)
+        codes = price.cat.codes.to_numpy()
+        return pd.Series(np.where(codes >= 0, parsed[codes], np.nan), index=price.index)
+    return pd.to_numeric(price.astype(object).replace(r'[^\d.]', '', regex=True), errors='coerce')
+
+
 def clean_sales(df: pd.DataFrame) -> pd.DataFrame:
-    """Basic cleaning for sales data."""
+    """Basic cleaning for sales data (one filtering pass; returns a new frame)."""
     # Drop rows with critical missing values
-    df = df.dropna(subset=['sale_id', 'product_name', 'quantity'])
+    keep = df['sale_id'].notna() & df['product_name'].notna() & df['quantity'].notna()
 
-    # Deduplicate
-    df = df.drop_duplicates(subset=['sale_id'])
+    # Deduplicate (first occurrence among the rows kept so far)
+    keep &= ~df['sale_id'].where(keep).duplicated()
 
-    # Fix data types
-    df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce', downcast='integer')
-    df['price'] = pd.to_numeric(df['price'].replace(r'[^\d.]', '', regex=True), errors='coerce')
+    # Fix data types (no-ops for columns already typed at extract)
+    quantity = pd.to_numeric(df['quantity'], errors='coerce', downcast='integer')
+    price = _parse_price(df['price'])
+
+    df['quantity'] = quantity
+    df['price'] = price.astype(float)
 
     # Remove invalid rows
-    df = df[(df['quantity'] > 0) & (df['price'] > 0)].dropna(subset=['quantity', 'price'])
+    keep &= (quantity > 0).fillna(False) & (price > 0).fillna(False)
+    df = df[keep.to_numpy(dtype=bool)]
 
     logger.info(f"After cleaning sales: {len(df)} rows remaining")
     return df
 
 
-def enrich_sales(df_sales: pd.DataFrame, df_products: pd.DataFrame) -> pd.DataFrame:
+# n-gram width of the product name index used for partial-name matches
+PRODUCT_NGRAM = 3
+DEFAULT_CARBON_RATING = 5
+
+
+def _first_containing(name: str, index: dict):
+    """Position of the first catalog product whose name contains `name` (None if no match)."""
+    names = index['names']
+    if len(name) < PRODUCT_NGRAM:
+        return next((i for i, p_name in enumerate(names) if name in p_name), None)
+
+    grams = index['grams']
+    postings = sorted(
+        (grams.get(name[j:j + PRODUCT_NGRAM], ()) for j in range(len(name) - PRODUCT_NGRAM + 1)),
+        key=len
+    )
+    candidates = set(postings[0])
+    for posting in postings[1:]:
+        # A handful of candidates is cheaper to verify than to keep intersecting
+        if len(candidates) <= 8:
+            break
+        candidates &= posting
+
+    # Every n-gram matching is necessary, not sufficient - confirm in catalog order
+    return next((i for i in sorted(candidates) if name in names[i]), None)
+
+
+def build_product_index(df_products: pd.DataFrame) -> dict:
+    """Build the carbon-rating matcher once per run: exact-name map plus n-gram postings."""
+    catalog = df_products.drop_duplicates(subset=['product_name'], keep='last')
+    names = [str(p_name).strip().lower() for p_name in catalog['product_name']]
+
+    grams = {}
+    for i, p_name in enumerate(names):
+        for gram in {p_name[j:j + PRODUCT_NGRAM] for j in range(len(p_name) - PRODUCT_NGRAM + 1)}:
+            grams.setdefault(gram, set()).add(i)
+
+    index = {
+        'names': names,
+        'ratings': catalog['carbon_footprint_rating'].tolist(),
+        'grams': grams,
+    }
+    # An exact name still resolves to the first product containing it, as the substring scan did
+    exact = {}
+    for p_name in names:
+        if p_name not in exact:
+            exact[p_name] = _first_containing(p_name, index)
+    index['exact'] = exact
+    return index
+
+
+def lookup_carbon_ratings(product_names: pd.Series, index: dict) -> pd.Series:
+    """Carbon rating of the first catalog product containing each (normalized) sale product name."""
+    # Resolve each distinct sale name once, then broadcast back through the factorized codes
+    codes, uniques = pd.factorize(product_names)
+    exact = index['exact']
+    no_match = len(index['ratings'])
+
+    positions = np.empty(len(uniques) + 1, dtype=np.int64)
+    for i, value in enumerate(uniques):
+        norm_name = str(value).strip().lower()
+        pos = exact[norm_name] if norm_name in exact else _first_containing(norm_name, index)
+        positions[i] = no_match if pos is None else pos
+    positions[-1] = no_match  # factorize codes missing names as -1
+
+    # Unmatched and missing names take the default rating (last slot)
+    ratings = pd.Series(index['ratings'] + [DEFAULT_CARBON_RATING]).to_numpy()
+    return pd.Series(ratings[positions[codes]], index=product_names.index)
+
+
+def enrich_sales(df_sales: pd.DataFrame, df_products: pd.DataFrame, product_index: dict = None) -> pd.DataFrame:
     """Calculate revenue and carbon savings using renamed product_name."""
     if df_products is None or 'product_name' not in df_products.columns:
         logger.warning("No valid products DataFrame for enrichment - skipping carbon savings")
@@ -73,19 +159,11 @@ def enrich_sales(df_sales: pd.DataFrame, df_products: pd.DataFrame) -> pd.DataFr
         df_sales['carbon_savings'] = 0  # fallback
         return df_sales
 
-    # Create lookup dictionary using product_name (after renaming)
-    products_map = df_products.set_index('product_name')[['carbon_footprint_rating']].to_dict('index')
-    
-    def get_carbon_rating(product_name):
-        if pd.isna(product_name):
-            return 5
-        norm_name = str(product_name).strip().lower()
-        for p_name, info in products_map.items():
-            if norm_name in str(p_name).strip().lower():
-                return info['carbon_footprint_rating']
-        return 5  # default if no match
-
-    df_sales['carbon_footprint_rating'] = df_sales['product_name'].apply(get_carbon_rating)
+    # Matcher index over product_name (after renaming), built once per run
+    if product_index is None:
+        product_index = build_product_index(df_products)
+
+    df_sales['carbon_footprint_rating'] = lookup_carbon_ratings(df_sales['product_name'], product_index)
     df_sales['revenue'] = df_sales['quantity'] * df_sales['price']
     df_sales['carbon_savings'] = df_sales['quantity'] * (10 - df_sales['carbon_footprint_rating'])
 
@@ -93,17 +171,43 @@ def enrich_sales(df_sales: pd.DataFrame, df_products: pd.DataFrame) -> pd.DataFr
     return df_sales
 
 
-def detect_outliers(df: pd.DataFrame, contamination=0.02) -> pd.DataFrame:
-    """Remove outliers using Isolation Forest."""
-    if len(df) < 10:
-        logger.warning("Too few rows for outlier detection - skipping")
-        return df
+OUTLIER_FEATURES = ['quantity', 'revenue']
+
 
-    features = ['quantity', 'revenue']
+def fit_outlier_model(df: pd.DataFrame, contamination=0.02) -> IsolationForest:
+    """Fit the Isolation Forest used to score later batches/chunks."""
     model = IsolationForest(contamination=contamination, random_state=42)
-    preds = model.fit_predict(df[features].fillna(0))
+    model.fit(df[OUTLIER_FEATURES].fillna(0))
+    return model
+
+
+def detect_outliers(df: pd.DataFrame, contamination=0.02, model: IsolationForest = None,
+                    baselines: pd.DataFrame = None, df_products: pd.DataFrame = None) -> pd.DataFrame:
+    """Remove outliers: persisted per-product baselines when trained, else an Isolation Forest.
 
-    clean_df = df[preds != -1].copy()
+    The forest is fitted on this batch unless a model is given.
+    """
+    if model is None:
+        baselines = baselines if baselines is not None else outliers.load_baselines()
+        if baselines is not None:
+            if df.empty:
+                return df
+            flags = outliers.flag_outliers(df, baselines, df_products)
+            clean_df = df[~flags.to_numpy()]
+            logger.info(f"Removed {len(df) - len(clean_df)} outliers (robust z > {outliers.Z_THRESHOLD:g})")
+            return clean_df
+
+        if len(df) < 10:
+            logger.warning("Too few rows for outlier detection - skipping")
+            return df
+        model = IsolationForest(contamination=contamination, random_state=42)
+        preds = model.fit_predict(df[OUTLIER_FEATURES].fillna(0))
+    else:
+        if df.empty:
+            return df
+        preds = model.predict(df[OUTLIER_FEATURES].fillna(0))
+
+    clean_df = df[preds != -1]
     logger.info(f"Removed {len(df) - len(clean_df)} outliers ({contamination*100:.1f}% target)")
     return clean_df
 
@@ -121,22 +225,106 @@ def transform_all(data: dict) -> dict:
     
     # Sales transformation
     if 'sales' in transformed:
-        df_sales = clean_sales(transformed['sales'])
+        with metrics.span('clean_sales', rows_in=len(transformed['sales'])) as span:
+            df_sales = clean_sales(transformed['sales'])
+            span.rows_out = len(df_sales)
         df_products = transformed.get('products')
-        df_sales = enrich_sales(df_sales, df_products)
-        df_sales = detect_outliers(df_sales)
+        with metrics.span('enrich_sales', rows_in=len(df_sales)) as span:
+            df_sales = enrich_sales(df_sales, df_products)
+            span.rows_out = len(df_sales)
+        with metrics.span('detect_outliers', rows_in=len(df_sales)) as span:
+            df_sales = detect_outliers(df_sales, df_products=df_products)
+            span.rows_out = len(df_sales)
         transformed['sales'] = df_sales
 
     logger.info(f"Transformation complete. Sales rows: {len(transformed.get('sales', pd.DataFrame()))}")
     return transformed
 
 
+def transform_sales_chunks(chunks, df_products: pd.DataFrame = None, contamination=0.02):
+    """Stream sales chunks through clean → enrich → outliers, one chunk in memory at a time.
+
+    Whole-dataset stages are made chunk-aware:
+    - de-duplication keeps the first occurrence of a sale_id across all chunks
+      through a set of the sale_ids seen so far, so that set (not the rows)
+      grows with the input and each chunk's check costs O(chunk);
+    - chunks are scored against the persisted outlier baselines; without them an
+      Isolation Forest is fitted on the first chunk with enough rows and then
+      scores every later chunk, instead of refitting per chunk.
+    """
+    product_index = None
+    if df_products is not None and 'product_name' in df_products.columns:
+        product_index = build_product_index(df_products)
+
+    seen_ids = set()
+    baselines = outliers.load_baselines()
+    model = None
+    for chunk in chunks:
+        with metrics.span('clean_sales', rows_in=len(chunk)) as span:
+            chunk = clean_sales(chunk)
+            span.rows_out = len(chunk)
+
+        ids = chunk['sale_id'].tolist()
+        repeated = np.fromiter((i in seen_ids for i in ids), dtype=bool, count=len(ids))
+        if repeated.any():
+            logger.info(f"Dropping {int(repeated.sum())} sale_ids already seen in earlier chunks")
+            chunk = chunk[~repeated]
+            ids = chunk['sale_id'].tolist()
+        seen_ids.update(ids)
+
+        with metrics.span('enrich_sales', rows_in=len(chunk)) as span:
+            chunk = enrich_sales(chunk, df_products, product_index)
+            span.rows_out = len(chunk)
+
+        with metrics.span('detect_outliers', rows_in=len(chunk)) as span:
+            if baselines is not None:
+                chunk = detect_outliers(chunk, baselines=baselines, df_products=df_products)
+            else:
+                if model is None and len(chunk) >= 10:
+                    model = fit_outlier_model(chunk, contamination)
+                    logger.info(f"Fitted streaming outlier model on first chunk ({len(chunk)} rows)")
+                if model is not None:
+                    chunk = detect_outliers(chunk, contamination, model=model)
+            span.rows_out = len(chunk)
+
+        yield chunk
+
+
+def _canonical_text(series: pd.Series) -> pd.Series:
+    """Render a tracked column the way Postgres renders it in the row_hash backfill."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Render each category once, then broadcast through the codes
+        categories = _canonical_text(pd.Series(series.cat.categories)).to_numpy(dtype=object)
+        codes = series.cat.codes.to_numpy()
+        return pd.Series(np.where(codes >= 0, categories[codes], ''), index=series.index, dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        text = series.dt.strftime('%Y-%m-%d')
+    elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        # Matches to_char(value, 'FM9999999990.00') so ints, floats and numerics agree
+        text = series.astype(float).round(2).map('{:.2f}'.format)
+    else:
+        text = series.astype(object).astype(str).str.strip()
+    return text.where(series.notna(), '')
+
+
+def row_hash(df: pd.DataFrame, columns: list) -> pd.Series:
+    """Stable md5 of the given columns; NULL/NaN hash the same as each other, never as a change."""
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    parts = [_canonical_text(df[c]) for c in columns]
+    joined = parts[0].str.cat(parts[1:], sep='|') if len(parts) > 1 else parts[0]
+    return pd.Series(
+        [hashlib.md5(value.encode('utf-8')).hexdigest() for value in joined],
+        index=df.index, dtype=object
+    )
+
+
 def prepare_scd_df(df: pd.DataFrame, business_key: str, tracked_columns: list) -> pd.DataFrame:
-    """Prepare dataframe for SCD Type 2 detection (optional hash for change detection)."""
+    """Prepare dataframe for SCD Type 2 detection (normalized key + change hash)."""
     df = df.copy()
     df['business_key'] = df[business_key].astype(str).str.strip().str.lower()
-    # Optional: hash for quick change detection (not used in current SCD but good to have)
-    df['change_hash'] = df[tracked_columns].apply(lambda row: hash(tuple(row)), axis=1)
+    # Same hash handle_scd_type2 persists in the dimension's row_hash column
+    df['change_hash'] = row_hash(df, tracked_columns)
     return df
 
 
@@ -5,6 +5,7 @@ import os
 import random
 from datetime import datetime, timedelta
 import argparse
+import time
 import numpy as np
 
 # -------------------------------
@@ -25,21 +26,208 @@ CITIES = ["Johannesburg", "Cape Town", "Durban", "Pretoria", "Bloemfontein", "Gq
 
 LOYALTY_LEVELS = ["Bronze", "Silver", "Gold", "Green Hero"]
 
+FIRST_NAMES = ["Lesego", "Thabo", "Amahle", "Sipho", "Nomsa", "Lungelo", "Zanele", "Kagiso", "Refilwe", "Mpho"]
+LAST_NAMES = ["Mokoena", "Nkosi", "Dlamini", "Naidoo", "van der Merwe"]
+EMAIL_DOMAINS = ["gmail.com", "outlook.com", "yahoo.co.za", "example.co.za", "mweb.co.za"]
+
+# Load-test defect rates (same defects as the daily sample)
+QUANTITIES = np.array([1, 2, 3, 5, 10])
+QUANTITY_WEIGHTS = np.array([0.5, 0.2, 0.15, 0.1, 0.05])
+OUTLIER_RATE = 0.025          # crazy-high quantities
+R_PRICE_RATE = 0.15           # prices written as 'R120.00'
+DUPLICATE_RATE = 1 / 12       # repeated sale rows
+MISSING_EMAIL_RATE = 0.002    # customers without an email
+# Rows generated (and written) at a time, so memory stays flat for any --rows
+CHUNK_ROWS = 1_000_000
+# Customers files larger than this are written as CSV (Excel tops out at ~1M rows and is slow)
+XLSX_MAX_ROWS = 50_000
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Generate sample Eco-Commerce data")
-    parser.add_argument("--date", type=str, default=None, help="Date in YYYY-MM-DD (default: today)")
+    parser.add_argument("--date", type=str, default=None, help="Date in YYYY-MM-DD (default: today); first day with --days")
+    # Load-test mode (enabled by --rows): vectorized, reproducible, any volume
+    parser.add_argument("--rows", type=int, default=None,
+                        help="Total sales rows across all days (enables the load-test generator)")
+    parser.add_argument("--days", type=int, default=1, help="Number of daily raw_data/<date>/ folders")
+    parser.add_argument("--products", type=int, default=len(PRODUCTS), help="Catalog size")
+    parser.add_argument("--customers", type=int, default=10_000, help="Customer population")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same files)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Sales rows generated per write")
+    parser.add_argument("--stream-updates", type=int, default=0,
+                        help="Also write this many streaming price-update JSON files")
+    parser.add_argument("--stream-dir", type=str, default="staging/streaming_updates")
+    parser.add_argument("--stream-rate", type=float, default=0,
+                        help="Update files per second (0 = as fast as possible)")
+    parser.add_argument("--output-dir", type=str, default="raw_data")
     return parser.parse_args()
 
-def main():
-    args = parse_args()
-    if args.date:
+
+def parse_sim_date(value):
+    if value:
         try:
-            sim_date = datetime.strptime(args.date, "%Y-%m-%d")
+            return datetime.strptime(value, "%Y-%m-%d")
         except ValueError:
             print("Invalid date format. Using today.")
-            sim_date = datetime.now()
-    else:
-        sim_date = datetime.now()
+    return datetime.now()
+
+
+def build_catalog(n_products: int, rng) -> pd.DataFrame:
+    """The real catalog first, then synthetic products (zero-padded names, so none contains another)."""
+    catalog = pd.DataFrame(PRODUCTS[:n_products])
+    extra = n_products - len(catalog)
+    if extra > 0:
+        categories = sorted({p["category"] for p in PRODUCTS})
+        ids = np.arange(len(catalog), n_products)
+        category = np.array(categories, dtype=object)[rng.integers(0, len(categories), extra)]
+        width = len(str(n_products))
+        catalog = pd.concat([catalog, pd.DataFrame({
+            "name": [f"Eco {c} Model {i:0{width}d}" for c, i in zip(category, ids)],
+            "category": category,
+            "price": np.round(rng.lognormal(np.log(250), 0.8, extra).clip(20, 20_000), 2),
+            "carbon_rating": rng.integers(1, 6, extra),
+        })], ignore_index=True)
+    return catalog
+
+
+def build_customers(n_customers: int, sim_date, rng) -> pd.DataFrame:
+    ids = np.arange(n_customers)
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n_customers)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), n_customers)]
+    domain = np.array(EMAIL_DOMAINS, dtype=object)[rng.integers(0, len(EMAIL_DOMAINS), n_customers)]
+    names = first + " " + last
+    # The id keeps emails unique at any population size
+    emails = pd.Series(names).str.lower().str.replace(" ", ".", regex=False) + "." + pd.Series(ids).astype(str) + "@" + domain
+    emails[rng.random(n_customers) < MISSING_EMAIL_RATE] = None
+    join_days = rng.integers(10, 731, n_customers)
+    join_dates = (np.datetime64(sim_date.date()) - join_days.astype("timedelta64[D]")).astype(str)
+    return pd.DataFrame({
+        "customer_name": names,
+        "email": emails,
+        "loyalty_level": np.array(LOYALTY_LEVELS, dtype=object)[rng.integers(0, len(LOYALTY_LEVELS), n_customers)],
+        "join_date": join_dates,
+    })
+
+
+def sales_chunk(n_rows, day, first_sale_id, catalog, emails, rng) -> pd.DataFrame:
+    """n_rows sales for one day (plus duplicate rows), sampled column-wise."""
+    # Skewed popularity: a few products sell far more than the long tail
+    popularity = 1 / np.arange(1, len(catalog) + 1)
+    product = rng.choice(len(catalog), n_rows, p=popularity / popularity.sum())
+
+    quantity = rng.choice(QUANTITIES, n_rows, p=QUANTITY_WEIGHTS)
+    outliers = rng.random(n_rows) < OUTLIER_RATE
+    quantity[outliers] = rng.integers(500, 2001, int(outliers.sum()))
+
+    prices = catalog["price"].to_numpy(dtype=float)
+    plain = np.array([str(p) for p in prices], dtype=object)
+    r_prefixed = np.array([f"R{p:.2f}" for p in prices], dtype=object)
+    price = np.where(rng.random(n_rows) < R_PRICE_RATE, r_prefixed[product], plain[product])
+
+    minutes = rng.integers(0, 24 * 60, n_rows).astype("timedelta64[m]")
+    timestamps = np.datetime_as_string(np.datetime64(day.date(), "m") + minutes, unit="s")
+
+    chunk = pd.DataFrame({
+        "sale_id": first_sale_id + rng.permutation(n_rows),
+        "date": day.strftime("%Y-%m-%d"),
+        "sale_timestamp": timestamps,
+        "product_name": catalog["name"].to_numpy(dtype=object)[product],
+        "quantity": quantity,
+        "price": price,
+        "customer_email": emails[rng.integers(0, len(emails), n_rows)],
+        "city": np.array(CITIES, dtype=object)[rng.integers(0, len(CITIES), n_rows)],
+    })
+
+    # ~8% duplicate rows, shuffled in
+    dupes = chunk.iloc[rng.choice(n_rows, int(n_rows * DUPLICATE_RATE), replace=False)]
+    chunk = pd.concat([chunk, dupes], ignore_index=True)
+    return chunk.iloc[rng.permutation(len(chunk))]
+
+
+def write_stream_updates(n_updates, catalog, stream_dir, rate, rng):
+    """High-rate feed of single-update JSON files, as the real-time consumer expects."""
+    os.makedirs(stream_dir, exist_ok=True)
+    product = rng.integers(0, len(catalog), n_updates)
+    change = rng.uniform(0.8, 1.2, n_updates)
+    new_price = np.round(catalog["price"].to_numpy(dtype=float)[product] * change, 2)
+    names = catalog["name"].to_numpy(dtype=object)
+    started = time.perf_counter()
+    run_tag = datetime.now().strftime("%Y%m%d%H%M%S")
+    for i in range(n_updates):
+        if rate > 0:
+            # Pace to the requested rate without drifting
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        update = {"product_name": names[product[i]], "new_price": float(new_price[i]),
+                  "timestamp": datetime.now().isoformat()}
+        path = os.path.join(stream_dir, f"update_{run_tag}_{i:09d}.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(update, f)
+        os.replace(f"{path}.tmp", path)  # the consumer never sees a half-written file
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {n_updates} streaming updates to {stream_dir} in {elapsed:.1f}s ({n_updates / max(elapsed, 1e-9):,.0f}/s)")
+
+
+def generate_load_test(args):
+    """Vectorized multi-day generator for load testing (same layout and defects as the daily sample)."""
+    rng = np.random.default_rng(args.seed)
+    start = parse_sim_date(args.date)
+    catalog = build_catalog(args.products, rng)
+    customers = build_customers(args.customers, start, rng)
+    emails = customers["email"].fillna("").to_numpy(dtype=object)
+
+    rows_per_day = np.full(args.days, args.rows // args.days)
+    rows_per_day[: args.rows % args.days] += 1
+    # New customers arrive day by day; each day's file holds that day's sign-ups
+    customer_splits = np.array_split(np.arange(args.customers), args.days)
+    if args.customers < args.days:
+        raise SystemExit("--customers must be at least --days")
+
+    started = time.perf_counter()
+    next_sale_id = 100000
+    for d in range(args.days):
+        day = start + timedelta(days=d)
+        day_str = day.strftime("%Y-%m-%d")
+        folder = os.path.join(args.output_dir, day_str)
+        os.makedirs(folder, exist_ok=True)
+
+        sales_path = os.path.join(folder, f"sales_{day_str}.csv")
+        written = 0
+        for chunk_start in range(0, int(rows_per_day[d]), args.chunk_rows):
+            n_rows = min(args.chunk_rows, int(rows_per_day[d]) - chunk_start)
+            # Sales only reference customers that have signed up by this day
+            chunk = sales_chunk(n_rows, day, next_sale_id, catalog, emails[: customer_splits[d][-1] + 1], rng)
+            chunk.to_csv(sales_path, mode="w" if chunk_start == 0 else "a", header=chunk_start == 0, index=False)
+            next_sale_id += n_rows
+            written += len(chunk)
+
+        with open(os.path.join(folder, f"products_{day_str}.json"), "w", encoding="utf-8") as f:
+            json.dump(catalog.to_dict(orient="records"), f, indent=2, default=float)
+
+        day_customers = customers.iloc[customer_splits[d]]
+        if len(day_customers) > XLSX_MAX_ROWS:
+            day_customers.to_csv(os.path.join(folder, f"customers_{day_str}.csv"), index=False)
+        else:
+            day_customers.to_excel(os.path.join(folder, f"customers_{day_str}.xlsx"), index=False, sheet_name="Customers")
+
+        print(f"{day_str}: {written} sales rows, {len(catalog)} products, {len(day_customers)} customers → {folder}")
+
+    elapsed = time.perf_counter() - started
+    print(f"Generated {int(rows_per_day.sum())} sales over {args.days} days in {elapsed:.1f}s "
+          f"({rows_per_day.sum() / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    if args.stream_updates:
+        write_stream_updates(args.stream_updates, catalog, args.stream_dir, args.stream_rate, rng)
+
+
+def main():
+    args = parse_args()
+    if args.rows is not None:
+        generate_load_test(args)
+        return
+
+    sim_date = parse_sim_date(args.date)
 
     today_str = sim_date.strftime("%Y-%m-%d")
     folder = f"raw_data/{today_str}"
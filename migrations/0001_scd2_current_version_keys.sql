@@ -0,0 +1,18 @@
+-- 0001: allow SCD Type 2 history on dim_product / dim_customer
+--
+-- The business keys were UNIQUE across all versions, so inserting a new
+-- version of a changed product or customer always failed. Uniqueness now
+-- only applies to the current version of each key.
+
+BEGIN;
+
+ALTER TABLE public.dim_product DROP CONSTRAINT IF EXISTS unique_product_name;
+ALTER TABLE public.dim_customer DROP CONSTRAINT IF EXISTS dim_customer_email_key;
+ALTER TABLE public.dim_customer DROP CONSTRAINT IF EXISTS unique_email;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_dim_product_current_name
+    ON public.dim_product USING btree (product_name) WHERE (is_current = true);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_dim_customer_current_email
+    ON public.dim_customer USING btree (email) WHERE (is_current = true);
+
+COMMIT;
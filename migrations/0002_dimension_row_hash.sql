@@ -0,0 +1,28 @@
+-- 0002: persisted change hash for SCD Type 2 dimensions
+--
+-- handle_scd_type2 compares (business_key, row_hash) instead of pulling the
+-- whole current dimension. The backfill below must render values exactly as
+-- etl.transform.row_hash does: tracked columns in load_all order, NULL as '',
+-- text trimmed, numbers as 'FM9999999990.00', dates as 'YYYY-MM-DD', joined
+-- with '|'.
+
+BEGIN;
+
+ALTER TABLE public.dim_product ADD COLUMN IF NOT EXISTS row_hash character(32);
+ALTER TABLE public.dim_customer ADD COLUMN IF NOT EXISTS row_hash character(32);
+
+UPDATE public.dim_product
+SET row_hash = md5(concat_ws('|',
+        coalesce(btrim(category), ''),
+        coalesce(to_char(price, 'FM9999999990.00'), ''),
+        coalesce(to_char(carbon_footprint_rating, 'FM9999999990.00'), '')))
+WHERE row_hash IS NULL;
+
+UPDATE public.dim_customer
+SET row_hash = md5(concat_ws('|',
+        coalesce(btrim(customer_name), ''),
+        coalesce(btrim(loyalty_level), ''),
+        coalesce(to_char(join_date, 'YYYY-MM-DD'), '')))
+WHERE row_hash IS NULL;
+
+COMMIT;
@@ -0,0 +1,41 @@
+-- 0003: per-dimension version counter for the fact-load key cache
+--
+-- Any statement that writes to a dimension (handle_scd_type2, the populate
+-- scripts, manual fixes) bumps its version, so etl.dim_cache only refetches
+-- dimensions that actually changed.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.dim_versions (
+    table_name character varying(63) PRIMARY KEY,
+    version bigint DEFAULT 1 NOT NULL,
+    updated_at timestamp without time zone DEFAULT clock_timestamp() NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION public.bump_dim_version() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    INSERT INTO public.dim_versions AS v (table_name, version, updated_at)
+    VALUES (TG_TABLE_NAME, 1, clock_timestamp())
+    ON CONFLICT (table_name) DO UPDATE
+        SET version = v.version + 1, updated_at = clock_timestamp();
+    RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+    dim text;
+BEGIN
+    FOREACH dim IN ARRAY ARRAY['dim_date', 'dim_product', 'dim_customer', 'dim_location'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%1$s_version ON public.%1$I', dim);
+        EXECUTE format(
+            'CREATE TRIGGER trg_%1$s_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.%1$I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.bump_dim_version()', dim);
+        INSERT INTO public.dim_versions (table_name) VALUES (dim) ON CONFLICT DO NOTHING;
+    END LOOP;
+END;
+$$;
+
+COMMIT;
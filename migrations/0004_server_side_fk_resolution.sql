@@ -0,0 +1,30 @@
+-- 0004: staging table and normalized-key indexes for server-side FK resolution
+--
+-- load_all(fk_mode='server') COPYs raw sales into stg_fact_sales and resolves
+-- surrogate keys with one INSERT ... SELECT. Lookups join on
+-- lower(btrim(key)), so each dimension gets a matching expression index.
+-- The staging table is UNLOGGED: it is truncated inside every load and never
+-- needs to survive a crash.
+
+BEGIN;
+
+CREATE UNLOGGED TABLE IF NOT EXISTS public.stg_fact_sales (
+    sale_id integer NOT NULL,
+    sale_date date,
+    sale_timestamp timestamp without time zone,
+    product_name text,
+    customer_email text,
+    city text,
+    quantity_sold integer,
+    revenue numeric(10,2),
+    carbon_savings numeric(10,2)
+);
+
+CREATE INDEX IF NOT EXISTS idx_dim_product_current_name_norm
+    ON public.dim_product USING btree (lower(btrim(product_name))) WHERE (is_current = true);
+CREATE INDEX IF NOT EXISTS idx_dim_customer_current_email_norm
+    ON public.dim_customer USING btree (lower(btrim(email))) WHERE (is_current = true);
+CREATE INDEX IF NOT EXISTS idx_dim_location_city_norm
+    ON public.dim_location USING btree (lower(btrim(city)));
+
+COMMIT;
@@ -0,0 +1,28 @@
+-- 0005: per-span run metrics keyed by load
+--
+-- run_etl records wall time, CPU time, peak RSS and rows in/out for every
+-- stage and sub-step (etl.metrics) and writes them here in one batch at the
+-- end of the run, under the metadata_loads row of that run. Failed runs get
+-- a FAILED metadata_loads row so their spans are kept too.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.etl_run_metrics (
+    metric_id bigserial PRIMARY KEY,
+    load_id integer NOT NULL REFERENCES public.metadata_loads(load_id) ON DELETE CASCADE,
+    run_id uuid NOT NULL,
+    span_path character varying(200) NOT NULL,
+    depth smallint NOT NULL,
+    calls integer DEFAULT 1 NOT NULL,
+    started_at timestamp without time zone NOT NULL,
+    wall_seconds double precision NOT NULL,
+    cpu_seconds double precision NOT NULL,
+    peak_rss_mb numeric(10,1),
+    rows_in bigint,
+    rows_out bigint,
+    status character varying(20) DEFAULT 'SUCCESS'::character varying NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_etl_run_metrics_load_id ON public.etl_run_metrics USING btree (load_id);
+
+COMMIT;
@@ -0,0 +1,56 @@
+-- 0006: sales rollups maintained incrementally by the fact load
+--
+-- etl.rollups keeps these in step with fact_sales: every fact upsert merges
+-- the delta of the rows it loads (minus the fact rows they replace) in the
+-- same transaction. The finest grain is date × product × location; the
+-- daily, daily × category and daily × region tables are keyed on the
+-- calendar date so the dashboard reads them without touching fact_sales.
+-- No foreign keys: the tables are derived and rebuilt with
+-- `python -m etl.rollups rebuild` after backfills.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.rollup_sales_daily_product_location (
+    date_id integer NOT NULL,
+    product_id integer NOT NULL,
+    location_id integer NOT NULL,
+    sales_count integer DEFAULT 0 NOT NULL,
+    quantity_sold bigint DEFAULT 0 NOT NULL,
+    revenue numeric(14,2) DEFAULT 0 NOT NULL,
+    carbon_savings numeric(14,2) DEFAULT 0 NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL,
+    PRIMARY KEY (date_id, product_id, location_id)
+);
+
+CREATE TABLE IF NOT EXISTS public.rollup_sales_daily (
+    sale_date date NOT NULL PRIMARY KEY,
+    sales_count integer DEFAULT 0 NOT NULL,
+    quantity_sold bigint DEFAULT 0 NOT NULL,
+    revenue numeric(14,2) DEFAULT 0 NOT NULL,
+    carbon_savings numeric(14,2) DEFAULT 0 NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS public.rollup_sales_daily_category (
+    sale_date date NOT NULL,
+    category character varying(50) NOT NULL,
+    sales_count integer DEFAULT 0 NOT NULL,
+    quantity_sold bigint DEFAULT 0 NOT NULL,
+    revenue numeric(14,2) DEFAULT 0 NOT NULL,
+    carbon_savings numeric(14,2) DEFAULT 0 NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL,
+    PRIMARY KEY (sale_date, category)
+);
+
+CREATE TABLE IF NOT EXISTS public.rollup_sales_daily_region (
+    sale_date date NOT NULL,
+    region character varying(50) NOT NULL,
+    sales_count integer DEFAULT 0 NOT NULL,
+    quantity_sold bigint DEFAULT 0 NOT NULL,
+    revenue numeric(14,2) DEFAULT 0 NOT NULL,
+    carbon_savings numeric(14,2) DEFAULT 0 NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL,
+    PRIMARY KEY (sale_date, region)
+);
+
+COMMIT;
@@ -0,0 +1,87 @@
+-- 0007: range-partition fact_sales by month of sale_timestamp
+--
+-- The heap table is swapped for a table partitioned by RANGE (sale_timestamp)
+-- with one partition per month holding existing rows (fact_sales_y2026m03
+-- covers [2026-03-01, 2026-04-01)) and a DEFAULT partition for anything
+-- outside them. The primary key must include the partition key, so it
+-- becomes (sale_id, sale_timestamp); the loaders keep sale_id unique by
+-- removing a sale's old row when its timestamp moves it to another month.
+-- Upcoming months are created by etl.partitions before every fact load.
+--
+-- Rows are copied in one transaction while fact_sales is locked: run it in
+-- a maintenance window on large warehouses.
+
+BEGIN;
+
+LOCK TABLE public.fact_sales IN ACCESS EXCLUSIVE MODE;
+
+ALTER TABLE public.fact_sales RENAME TO fact_sales_unpartitioned;
+-- Free the index names for the partitioned table
+ALTER TABLE public.fact_sales_unpartitioned DROP CONSTRAINT fact_sales_pkey;
+DROP INDEX IF EXISTS public.idx_fact_sales_customer_id;
+DROP INDEX IF EXISTS public.idx_fact_sales_date;
+DROP INDEX IF EXISTS public.idx_fact_sales_date_id;
+DROP INDEX IF EXISTS public.idx_fact_sales_date_product;
+DROP INDEX IF EXISTS public.idx_fact_sales_location_id;
+DROP INDEX IF EXISTS public.idx_fact_sales_product;
+DROP INDEX IF EXISTS public.idx_fact_sales_product_id;
+
+CREATE TABLE public.fact_sales (
+    sale_id integer DEFAULT nextval('public.fact_sales_sale_id_seq'::regclass) NOT NULL,
+    date_id integer NOT NULL,
+    product_id integer NOT NULL,
+    customer_id integer NOT NULL,
+    location_id integer NOT NULL,
+    quantity_sold integer NOT NULL,
+    revenue numeric(10,2) NOT NULL,
+    carbon_savings numeric(10,2) NOT NULL,
+    sale_timestamp timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT fact_sales_carbon_savings_check CHECK ((carbon_savings >= (0)::numeric)),
+    CONSTRAINT fact_sales_quantity_sold_check CHECK ((quantity_sold > 0)),
+    CONSTRAINT fact_sales_revenue_check CHECK ((revenue >= (0)::numeric))
+) PARTITION BY RANGE (sale_timestamp);
+
+CREATE TABLE public.fact_sales_default PARTITION OF public.fact_sales DEFAULT;
+
+DO $$
+DECLARE
+    month_start date;
+BEGIN
+    FOR month_start IN
+        SELECT DISTINCT date_trunc('month', sale_timestamp)::date
+        FROM public.fact_sales_unpartitioned
+        ORDER BY 1
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.fact_sales FOR VALUES FROM (%L) TO (%L)',
+            'fact_sales_' || to_char(month_start, '"y"YYYY"m"MM'),
+            month_start, (month_start + interval '1 month')::date
+        );
+    END LOOP;
+END
+$$;
+
+INSERT INTO public.fact_sales SELECT * FROM public.fact_sales_unpartitioned;
+
+-- Keys are added after the copy: one index build and one FK validation query
+-- each, instead of per-row maintenance and per-row RI checks
+ALTER TABLE public.fact_sales ADD CONSTRAINT fact_sales_pkey PRIMARY KEY (sale_id, sale_timestamp);
+CREATE INDEX idx_fact_sales_customer_id ON public.fact_sales USING btree (customer_id);
+CREATE INDEX idx_fact_sales_date ON public.fact_sales USING btree (date_id);
+CREATE INDEX idx_fact_sales_date_id ON public.fact_sales USING btree (date_id);
+CREATE INDEX idx_fact_sales_date_product ON public.fact_sales USING btree (date_id, product_id);
+CREATE INDEX idx_fact_sales_location_id ON public.fact_sales USING btree (location_id);
+CREATE INDEX idx_fact_sales_product ON public.fact_sales USING btree (product_id);
+CREATE INDEX idx_fact_sales_product_id ON public.fact_sales USING btree (product_id);
+ALTER TABLE public.fact_sales ADD CONSTRAINT fact_sales_customer_id_fkey FOREIGN KEY (customer_id) REFERENCES public.dim_customer(customer_id) ON DELETE RESTRICT;
+ALTER TABLE public.fact_sales ADD CONSTRAINT fact_sales_date_id_fkey FOREIGN KEY (date_id) REFERENCES public.dim_date(date_id) ON DELETE RESTRICT;
+ALTER TABLE public.fact_sales ADD CONSTRAINT fact_sales_location_id_fkey FOREIGN KEY (location_id) REFERENCES public.dim_location(location_id) ON DELETE RESTRICT;
+ALTER TABLE public.fact_sales ADD CONSTRAINT fact_sales_product_id_fkey FOREIGN KEY (product_id) REFERENCES public.dim_product(product_id) ON DELETE RESTRICT;
+
+-- The sequence is owned by the old column and would be dropped with it
+ALTER SEQUENCE public.fact_sales_sale_id_seq OWNED BY public.fact_sales.sale_id;
+DROP TABLE public.fact_sales_unpartitioned;
+
+ANALYZE public.fact_sales;
+
+COMMIT;
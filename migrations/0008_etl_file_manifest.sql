@@ -0,0 +1,34 @@
+-- 0008: content-hash manifest of staged files
+--
+-- etl.file_manifest identifies every staged file by the blake2b of its bytes
+-- plus its size, and extract_all skips files whose row here is LOADED before
+-- parsing anything, so a file that lands again (under any name) or a run
+-- retried after ingest.sh archived staging is not upserted twice. Streaming
+-- loads record rows_read after every committed chunk; a retried run resumes
+-- the file there. Rows read / loaded and extract / load seconds are kept per
+-- file for audit.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.etl_file_manifest (
+    content_hash character(40) NOT NULL,
+    size_bytes bigint NOT NULL,
+    file_name character varying(255) NOT NULL,
+    source character varying(20),
+    status character varying(20) DEFAULT 'LOADING'::character varying NOT NULL,
+    attempts integer DEFAULT 0 NOT NULL,
+    rows_read bigint DEFAULT 0 NOT NULL,
+    rows_loaded bigint DEFAULT 0 NOT NULL,
+    extract_seconds double precision,
+    load_seconds double precision,
+    load_id integer REFERENCES public.metadata_loads(load_id) ON DELETE SET NULL,
+    first_seen_at timestamp without time zone DEFAULT now() NOT NULL,
+    started_at timestamp without time zone,
+    finished_at timestamp without time zone,
+    error_message text,
+    PRIMARY KEY (content_hash, size_bytes)
+);
+
+CREATE INDEX IF NOT EXISTS idx_etl_file_manifest_load_id ON public.etl_file_manifest USING btree (load_id);
+
+COMMIT;
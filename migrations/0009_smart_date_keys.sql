@@ -0,0 +1,49 @@
+-- 0009: dim_date.date_id becomes the YYYYMMDD smart key (2026-03-01 -> 20260301)
+--
+-- Fact loads compute date_id from the sale date (etl.dim_cache.date_ids)
+-- instead of fetching dim_date and joining on it; dates outside dim_date's
+-- first..last range are rejected rather than mapped to id 1 (which was the
+-- first calendar day, not an "unknown" member). The serial sequence goes
+-- away and a CHECK keeps every key in step with its date.
+--
+-- Existing fact_sales and rollup_sales_daily_product_location rows are
+-- remapped through the old ids. Serial ids (a few thousand) never collide
+-- with eight-digit keys, so the in-place updates cannot trip the primary
+-- keys. fact_sales is rewritten row by row: run it in a maintenance window
+-- on large warehouses, then VACUUM ANALYZE fact_sales.
+
+BEGIN;
+
+LOCK TABLE public.dim_date, public.fact_sales, public.rollup_sales_daily_product_location IN ACCESS EXCLUSIVE MODE;
+
+ALTER TABLE public.fact_sales DROP CONSTRAINT fact_sales_date_id_fkey;
+
+CREATE TEMP TABLE date_id_map ON COMMIT DROP AS
+SELECT date_id AS old_id, to_char(date, 'YYYYMMDD')::integer AS new_id
+FROM public.dim_date;
+ALTER TABLE date_id_map ADD PRIMARY KEY (old_id);
+
+UPDATE public.fact_sales f SET date_id = m.new_id
+FROM date_id_map m
+WHERE f.date_id = m.old_id AND m.new_id <> m.old_id;
+
+UPDATE public.rollup_sales_daily_product_location r SET date_id = m.new_id
+FROM date_id_map m
+WHERE r.date_id = m.old_id AND m.new_id <> m.old_id;
+
+UPDATE public.dim_date d SET date_id = m.new_id
+FROM date_id_map m
+WHERE d.date_id = m.old_id AND m.new_id <> m.old_id;
+
+ALTER TABLE public.dim_date ALTER COLUMN date_id DROP DEFAULT;
+DROP SEQUENCE IF EXISTS public.dim_date_date_id_seq;
+ALTER TABLE public.dim_date ADD CONSTRAINT dim_date_date_id_check
+    CHECK (date_id = (EXTRACT(year FROM date) * 10000 + EXTRACT(month FROM date) * 100 + EXTRACT(day FROM date))::integer);
+
+ALTER TABLE public.fact_sales ADD CONSTRAINT fact_sales_date_id_fkey
+    FOREIGN KEY (date_id) REFERENCES public.dim_date(date_id) ON DELETE RESTRICT;
+
+ANALYZE public.dim_date;
+ANALYZE public.rollup_sales_daily_product_location;
+
+COMMIT;
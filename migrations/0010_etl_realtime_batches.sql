@@ -0,0 +1,30 @@
+-- 0010: one row per micro-batch committed by the real-time price runner
+--
+-- etl.realtime applies streamed price updates to dim_product between batch
+-- runs. Each committed micro-batch records how many update files it read,
+-- the products they coalesced to, the SCD versions written, the queue depth
+-- behind it and the file-landing -> commit latency of its updates
+-- (p50 / p95 / max), so the runner's lag can be watched from the warehouse.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.etl_realtime_batches (
+    batch_id serial PRIMARY KEY,
+    started_at timestamp without time zone NOT NULL,
+    committed_at timestamp without time zone NOT NULL,
+    updates integer NOT NULL,
+    products integer NOT NULL,
+    versions integer NOT NULL,
+    unknown_products integer DEFAULT 0 NOT NULL,
+    rejected integer DEFAULT 0 NOT NULL,
+    queue_depth integer DEFAULT 0 NOT NULL,
+    apply_seconds double precision,
+    latency_p50_seconds double precision,
+    latency_p95_seconds double precision,
+    latency_max_seconds double precision
+);
+
+CREATE INDEX IF NOT EXISTS idx_etl_realtime_batches_committed_at
+    ON public.etl_realtime_batches USING btree (committed_at);
+
+COMMIT;
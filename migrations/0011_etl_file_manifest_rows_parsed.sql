@@ -0,0 +1,19 @@
+-- 0011: keep the parse count apart from the resume offset in etl_file_manifest
+--
+-- rows_read is the resume offset: source rows of the file committed so far,
+-- written only by the streaming loader after each committed chunk (and set
+-- to all of them once a batch load commits). Rows parsed by a batch extract
+-- now go to rows_parsed, so a failed batch run can no longer leave its parse
+-- count behind as an offset that a streaming retry would skip past.
+-- FAILED rows written by batch runs before this migration (no per-chunk
+-- load time recorded) are reset to 0; re-reading committed rows is safe,
+-- the fact upsert is idempotent.
+
+BEGIN;
+
+ALTER TABLE public.etl_file_manifest ADD COLUMN IF NOT EXISTS rows_parsed bigint;
+
+UPDATE public.etl_file_manifest SET rows_read = 0
+WHERE status = 'FAILED' AND load_seconds IS NULL;
+
+COMMIT;
@@ -0,0 +1,24 @@
+-- 0012: data_quality_log, written by etl.pipeline.write_quality_rows
+--
+-- The pipeline used to create this table on first write (pandas to_sql with
+-- if_exists='append'); it now inserts its quality rows in one batch with
+-- execute_values, which needs the table to exist. Warehouses that already
+-- have the to_sql-created table keep it and gain the logged_at timestamp.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.data_quality_log (
+    log_id serial PRIMARY KEY,
+    table_name character varying(50) NOT NULL,
+    total_rows bigint,
+    null_counts bigint,
+    duplicate_counts bigint,
+    status character varying(20),
+    logged_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+ALTER TABLE public.data_quality_log ADD COLUMN IF NOT EXISTS logged_at timestamp without time zone DEFAULT now() NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_data_quality_log_logged_at ON public.data_quality_log USING btree (logged_at);
+
+COMMIT;